@@ -0,0 +1,10 @@
+"""
+ASGI entry point, an alternative to the sync gunicorn workers of app.py:
+
+    uvicorn asgi:app --workers 2
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker -w 2
+"""
+from app import app as wsgi_app
+from portfolio.asgi import asgi_app
+
+app = asgi_app(wsgi_app)
@@ -0,0 +1,59 @@
+"""
+WSGI entry point for load tests: the real app wired to an in-process
+FakeSupabase seeded from BENCH_POSTS / BENCH_PROJECTS.
+
+    gunicorn -w 2 'benchmarks.bench_app:build_app()'
+    uvicorn --factory --workers 2 benchmarks.bench_app:build_asgi_app
+"""
+import os
+import tempfile
+
+from benchmarks.fake_supabase import ANON_KEY, JWT_SECRET, SERVICE_KEY, URL, FakeSupabase, sign_token
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("MAIL_RECIPIENT", "owner@example.com")
+os.environ.setdefault("MAIL_QUEUE_PATH", os.path.join(tempfile.gettempdir(), f"bench-mail-{os.getpid()}.db"))
+os.environ.setdefault("RATELIMIT_ENABLED", "false")
+os.environ["SUPABASE_URL"] = URL
+os.environ["SUPABASE_KEY"] = ANON_KEY
+os.environ["SUPABASE_SERVICE_ROLE_KEY"] = SERVICE_KEY
+os.environ["SUPABASE_JWT_SECRET"] = JWT_SECRET
+
+from portfolio.app import create_app  # noqa: E402
+
+ADMIN_SESSION = {
+    "_user_id": "bench-admin",
+    "_fresh": True,
+    "user_details": {"id": "bench-admin", "username": "admin@example.com", "role": "admin"},
+}
+
+
+def build_app(posts=None, projects=None, latency=None):
+    """Create the app and route its Supabase clients to a seeded fake."""
+    posts = int(os.environ.get("BENCH_POSTS", 100)) if posts is None else posts
+    projects = int(os.environ.get("BENCH_PROJECTS", 20)) if projects is None else projects
+    latency = float(os.environ.get("BENCH_LATENCY", 0)) if latency is None else latency
+    fake = FakeSupabase(latency=latency)
+    fake.seed_posts(posts)
+    fake.seed_projects(projects)
+    fake.insert("admins", {"user_id": ADMIN_SESSION["_user_id"]})
+    fake.install()
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+    # Keep queued contact mail on disk; there is no SMTP server to drain to
+    app.config["MAIL_QUEUE_AUTOSTART"] = False
+    app.extensions["fake_supabase"] = fake
+    return app
+
+
+def build_asgi_app(posts=None, projects=None, latency=None):
+    """build_app() behind the ASGI adapter, for uvicorn --factory."""
+    from portfolio.asgi import asgi_app
+    return asgi_app(build_app(posts, projects, latency))
+
+
+def admin_cookie(app):
+    """Signed session cookie value for a logged-in admin, with a day-long Supabase token."""
+    session = dict(ADMIN_SESSION, supabase_token=sign_token(ADMIN_SESSION["_user_id"], ttl=86400))
+    return app.session_interface.get_signing_serializer(app).dumps(session)
+
@@ -0,0 +1,161 @@
+"""
+Throughput of sync gunicorn workers vs the ASGI mode under many concurrent clients.
+
+Both modes serve benchmarks.bench_app with the same number of worker
+processes: plain sync workers (`gunicorn app:app`), or uvicorn workers
+running asgi.py. Supabase is simulated with --latency seconds per call,
+and the repo and page caches are off, so every request waits on
+"Supabase". /admin makes two reads, which the ASGI mode runs concurrently.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_asgi [--clients 50,200,1000] [--duration 10]
+        [--latency 0.05] [--workers 2] [--routes /admin,/blogs] [--mode sync|asgi|both]
+
+The load generator is a single asyncio process, so at high client counts it
+can become the bottleneck itself; compare the two modes on the same machine.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_routes import ROOT, _children, _free_port, _peak_rss_mb, percentile  # noqa: E402
+
+# label -> (path, needs admin session)
+ROUTES = {
+    "/admin": ("/admin", True),
+    "/blogs": ("/blogs", False),
+    "/portfolio.html": ("/portfolio.html", False),
+}
+SERVERS = {
+    "sync": ["-w", "{workers}", "benchmarks.bench_app:build_app()"],
+    "asgi": ["-w", "{workers}", "-k", "uvicorn.workers.UvicornWorker", "benchmarks.bench_app:build_asgi_app()"],
+}
+
+
+def _raise_fd_limit(needed: int) -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+
+def start_server(mode: str, args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    import httpx
+
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT, BENCH_POSTS=str(args.posts), BENCH_PROJECTS=str(args.projects),
+               BENCH_LATENCY=str(args.latency), REPO_CACHE_BACKEND="off", PAGE_CACHE="off",
+               ACCESS_LOG="off", LOG_LEVEL="WARNING", ASGI_THREADS=str(args.threads))
+    command = [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{port}", "--log-level", "warning",
+               "--backlog", "4096", "--timeout", "120", "--keep-alive", "75"]
+    command += [part.format(workers=args.workers) for part in SERVERS[mode]]
+    proc = subprocess.Popen(command, cwd=ROOT, env=env)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while True:
+        try:
+            if httpx.get(base + "/test").status_code == 200:
+                return proc, base
+        except httpx.TransportError:
+            pass
+        if time.time() > deadline or proc.poll() is not None:
+            proc.terminate()
+            raise RuntimeError(f"{mode} server did not start")
+        time.sleep(0.2)
+
+
+async def load(base: str, path: str, cookie: str, clients: int, duration: float) -> Dict[str, float]:
+    """clients concurrent loops hitting path for duration seconds."""
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    headers = {"Cookie": cookie} if cookie else {}
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60, headers=headers) as client:
+        stop_at = time.perf_counter() + duration
+
+        async def user() -> None:
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "errors": errors,
+    }
+
+
+def run(mode: str, args: argparse.Namespace, cookie: str) -> List[Dict[str, float]]:
+    proc, base = start_server(mode, args)
+    rows = []
+    try:
+        for label in args.routes.split(","):
+            path, admin = ROUTES[label]
+            for clients in args.clients:
+                asyncio.run(load(base, path, cookie if admin else "", min(clients, 10), 1))
+                stats = asyncio.run(load(base, path, cookie if admin else "", clients, args.duration))
+                rss = [r for r in (_peak_rss_mb(pid) for pid in _children(proc.pid)) if r is not None]
+                stats.update(mode=mode, route=label, clients=clients, peak_rss_mb=max(rss) if rss else 0.0)
+                rows.append(stats)
+                print(f"{mode:<5} {label:<16} {clients:>7} {stats['rps']:>8.0f} {stats['p50_ms']:>8.1f}"
+                      f" {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['peak_rss_mb']:>12.1f}"
+                      f" {stats['errors']:>6}", flush=True)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("sync", "asgi", "both"), default="both")
+    parser.add_argument("--clients", default="50,200,1000", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated Supabase latency (s)")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes in either mode")
+    parser.add_argument("--threads", type=int, default=64, help="ASGI_THREADS for the asgi mode")
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--routes", default="/admin,/blogs")
+    args = parser.parse_args()
+    args.clients = [int(c) for c in args.clients.split(",")]
+
+    os.environ.setdefault("SECRET_KEY", "bench")
+    _raise_fd_limit(max(args.clients) * 2 + 256)
+    from benchmarks.bench_app import admin_cookie, build_app
+    # Same SECRET_KEY in both processes, so a locally signed cookie is valid
+    cookie = f"session={admin_cookie(build_app(posts=0, projects=0))}"
+
+    print(f"{'mode':<5} {'route':<16} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          f" {'peak RSS MB':>12} {'errors':>6}")
+    modes = ("sync", "asgi") if args.mode == "both" else (args.mode,)
+    for mode in modes:
+        run(mode, args, cookie)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
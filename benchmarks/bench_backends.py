@@ -0,0 +1,108 @@
+"""
+List/detail latency of the SQLite backend vs Supabase (FakeSupabase over HTTP).
+
+Both backends are seeded with the same rows and queried through their repo
+classes with the repo cache off, so the numbers are raw backend cost.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_backends [--posts 1000] [--projects 50]
+        [--repeat 200] [--latency 0.0]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_routes import percentile  # noqa: E402
+from benchmarks.fake_supabase import ANON_KEY, URL, FakeSupabase  # noqa: E402
+
+
+def _sample(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), percentile(samples, 95)
+
+
+def _seed_sqlite(db, fake):
+    conn = db.connect()
+    with conn:
+        conn.executemany(
+            "insert into blog_posts (id, title, content, created_at) values (:id, :title, :content, :created_at)",
+            fake.tables["blog_posts"])
+        conn.executemany(
+            "insert into projects (id, title, description, github_url, image_url, tech_stack, created_at)"
+            " values (:id, :title, :description, :github_url, :image_url, :tech_stack, :created_at)",
+            fake.tables["projects"])
+
+
+def run(posts, projects, repeat, latency):
+    from flask import Flask
+    from portfolio.sqlite_repo import SQLiteBlogRepo, SQLiteDatabase, SQLiteProjectRepo
+    from portfolio.supabase_repo import BlogRepo, ProjectRepo, SupabaseContext
+
+    fake = FakeSupabase(latency=latency)
+    fake.seed_posts(posts)
+    fake.seed_projects(projects)
+    fake.install()
+    ctx = SupabaseContext(URL, ANON_KEY)
+
+    tmp = tempfile.TemporaryDirectory()
+    db = SQLiteDatabase(os.path.join(tmp.name, "bench.db"))
+    _seed_sqlite(db, fake)
+
+    backends = {
+        "supabase": (ProjectRepo(ctx, cache=None), BlogRepo(ctx, cache=None)),
+        "sqlite": (SQLiteProjectRepo(db, tmp.name), SQLiteBlogRepo(db)),
+    }
+    rng = random.Random(0)
+    post_ids = [rng.randint(1, max(posts, 1)) for _ in range(repeat)]
+    project_ids = [rng.randint(1, max(projects, 1)) for _ in range(repeat)]
+
+    # Supabase repos read the caller's session token, so they need a request context
+    app = Flask(__name__)
+    app.secret_key = "bench"
+    request_context = app.test_request_context()
+    request_context.push()
+
+    print(f"{posts} posts, {projects} projects, {repeat} calls each, latency {latency * 1000:.0f} ms")
+    print(f"{'operation':<20} {'backend':<9} {'p50 ms':>8} {'p95 ms':>8}")
+    for backend, (project_repo, blog_repo) in backends.items():
+        posts_iter, projects_iter = iter(post_ids * 2), iter(project_ids * 2)
+        operations = {
+            "list_projects_page": lambda: project_repo.list_projects_page(None),
+            "list_posts_page": lambda: blog_repo.list_posts_page(None),
+            "list_posts": blog_repo.list_posts,
+            "get_project": lambda: project_repo.get_project(next(projects_iter)),
+            "get_post": lambda: blog_repo.get_post(next(posts_iter)),
+        }
+        for name, fn in operations.items():
+            fn()
+            p50, p95 = _sample(fn, repeat if name != "list_posts" else max(repeat // 20, 3))
+            print(f"{name:<20} {backend:<9} {p50:>8.3f} {p95:>8.3f}")
+    request_context.pop()
+    tmp.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated Supabase latency (s)")
+    args = parser.parse_args()
+    os.environ.setdefault("SECRET_KEY", "bench")
+    run(args.posts, args.projects, args.repeat, args.latency)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+"""
+Compressed size and CPU cost of the rendered pages, per encoding and load tier.
+
+Each route is fetched once uncompressed from the real app (FakeSupabase
+behind it), then compressed with every available encoding at the level of
+each tier in portfolio.compression.LEVELS, as the middleware would.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_compression [--posts 100] [--repeat 20]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+ROUTES = ("/", "/portfolio.html", "/blogs", "/blogs/1", "/admin/blogs")
+TIERS = ("idle", "busy", "saturated")
+
+
+def run(posts, repeat):
+    os.environ["COMPRESSION"] = "off"
+    os.environ["PAGE_CACHE"] = "off"
+    from benchmarks.bench_app import admin_cookie, build_app
+    from portfolio.compression import LEVELS, _Encoder, available_encodings
+
+    app = build_app(posts=posts)
+    client = app.test_client()
+    client.set_cookie("session", admin_cookie(app))
+
+    print(f"{'route':<16} {'bytes':>8} | {'encoding':<5} {'tier':<10} {'level':>5} {'bytes':>8} {'ratio':>6} {'cpu ms':>7}")
+    for route in ROUTES:
+        body = client.get(route).data
+        for encoding in available_encodings():
+            for tier, level in zip(TIERS, LEVELS[encoding]):
+                samples = []
+                out = b""
+                for _ in range(repeat):
+                    started = time.thread_time()
+                    encoder = _Encoder(encoding, level)
+                    out = encoder.compress(body) + encoder.finish()
+                    samples.append((time.thread_time() - started) * 1000)
+                print(f"{route:<16} {len(body):>8,} | {encoding:<5} {tier:<10} {level:>5} {len(out):>8,} "
+                      f"{len(body) / max(1, len(out)):>6.1f} {statistics.median(samples):>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.posts, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+"""
+Response size and latency of blog listings: full select("*") vs keyset pages.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pagination [--sizes 10,1000,50000] [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.fake_supabase import ANON_KEY, URL, FakeSupabase  # noqa: E402
+
+
+def _timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(samples)
+
+
+def run(sizes, repeat):
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ["SUPABASE_URL"] = URL
+    os.environ["SUPABASE_KEY"] = ANON_KEY
+    os.environ["REPO_CACHE_BACKEND"] = "off"
+    os.environ["PAGE_CACHE"] = "off"
+
+    from portfolio.app import create_app
+    from portfolio.supabase_repo import BlogRepo, get_supabase_context_from_env
+    from portfolio.supabase_pool import registry
+
+    app = create_app()
+    client = app.test_client()
+    print(f"{'posts':>7} | {'full payload':>13} {'full ms':>8} | {'page payload':>13} {'page ms':>8} | {'/blogs bytes':>12} {'/blogs ms':>9}")
+    for size in sizes:
+        registry.reset()
+        fake = FakeSupabase()
+        fake.seed_posts(size)
+        fake.install()
+        repo = BlogRepo(get_supabase_context_from_env(), cache=None)
+
+        before = fake.bytes_out
+        _, full_ms = _timed(repo._fetch_posts, repeat)
+        full_bytes = (fake.bytes_out - before) // repeat
+
+        before = fake.bytes_out
+        _, page_ms = _timed(lambda: repo._fetch_posts_page(None, 20), repeat)
+        page_bytes = (fake.bytes_out - before) // repeat
+
+        resp, http_ms = _timed(lambda: client.get("/blogs"), repeat)
+        print(f"{size:>7} | {full_bytes:>13,} {full_ms:>8.1f} | {page_bytes:>13,} {page_ms:>8.1f} | {len(resp.data):>12,} {http_ms:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10,1000,50000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
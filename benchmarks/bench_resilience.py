@@ -0,0 +1,105 @@
+"""
+Tail latency and outage behaviour of repo reads under the Supabase call policy.
+
+Two scenarios against FakeSupabase, each with and without the policy:
+
+- tail: --calls reads of one page of posts at --latency each, where a
+  --slow share of requests stalls for --stall seconds. Reported as
+  p50/p95/p99, with hedging (SUPABASE_HEDGE_AFTER) and without.
+- outage: Supabase hangs for --hang seconds on every request. Reported as
+  the time --outage-calls reads take to give up, with no deadline or
+  breaker ("none": httpx's own timeout, which --hang stands in for) and
+  with the defaults.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_resilience [--calls 400] [--slow 0.05] [--stall 1.0] [--hang 4.0]
+"""
+import os
+import sys
+import logging
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.fake_supabase import ANON_KEY, URL, FakeSupabase
+from portfolio.resilience import policy
+from portfolio.supabase_repo import BlogRepo, SupabaseContext
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def tail(repo, fake, calls, slow, stall, hedge_after):
+    policy.configure(hedge_after=hedge_after)
+    fake.stall = stall
+    rng = random.Random(1)
+    samples = []
+    for _ in range(calls):
+        fake.stall_next = 1 if rng.random() < slow else 0
+        started = time.perf_counter()
+        repo.list_posts_page()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def outage(repo, fake, calls, hang, guarded):
+    if guarded:
+        policy.configure()
+    else:
+        policy.configure(read_timeout=3600, read_retries=0, breaker_threshold=10 ** 9)
+    fake.stall_next, fake.stall = 10 ** 9, hang
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        repo.list_posts_page()
+        samples.append((time.perf_counter() - started) * 1000)
+    fake.stall_next = 0
+    return samples
+
+
+def run(calls, latency, slow, stall, hedge_after, hang, outage_calls):
+    # Every failed read logs a traceback
+    logging.getLogger("portfolio").setLevel(logging.CRITICAL)
+    fake = FakeSupabase(latency=latency)
+    fake.seed_posts(200)
+    fake.install()
+    repo = BlogRepo(SupabaseContext(URL, ANON_KEY), cache=None)
+    repo.list_posts_page()  # warm the pooled client
+
+    print(f"tail: {calls} reads, {latency * 1000:.0f} ms each, {slow:.0%} stall {stall * 1000:.0f} ms")
+    print(f"{'hedging':<22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'hedges':>7}")
+    for label, hedge in (("off", None), (f"after {hedge_after * 1000:.0f} ms", hedge_after)):
+        samples = tail(repo, fake, calls, slow, stall, hedge)
+        print(f"{label:<22} {statistics.median(samples):>8.1f} {_percentile(samples, 0.95):>8.1f} "
+              f"{_percentile(samples, 0.99):>8.1f} {max(samples):>8.1f} {policy.stats()['hedges']:>7}")
+
+    print(f"\noutage: every request hangs for {hang:.1f} s, {outage_calls} reads")
+    print(f"{'policy':<22} {'first ms':>9} {'median ms':>10} {'total s':>8} {'rejected':>9}")
+    for label, guarded in (("none", False), ("defaults", True)):
+        samples = outage(repo, fake, outage_calls, hang, guarded)
+        print(f"{label:<22} {samples[0]:>9.1f} {statistics.median(samples):>10.1f} {sum(samples) / 1000:>8.2f} "
+              f"{policy.stats()['breaker_rejections']:>9}")
+    policy.configure()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--slow", type=float, default=0.05)
+    parser.add_argument("--stall", type=float, default=1.0)
+    parser.add_argument("--hedge-after", type=float, default=0.05)
+    parser.add_argument("--hang", type=float, default=4.0)
+    parser.add_argument("--outage-calls", type=int, default=8)
+    args = parser.parse_args()
+    run(args.calls, args.latency, args.slow, args.stall, args.hedge_after, args.hang, args.outage_calls)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,307 @@
+"""
+Load test for the public and admin routes against FakeSupabase.
+
+Drives each route through the WSGI app in-process and/or through gunicorn,
+reporting requests/sec, p50/p95/p99 latency and peak RSS. Results can be
+saved as a baseline and later checked against it.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_routes [--mode wsgi|gunicorn|both] [--posts 1000]
+        [--projects 50] [--requests 200] [--concurrency N] [--workers 2]
+        [--save-baseline | --check [--threshold 0.25]]
+
+Every run also measures /test, a route that does no work, as a yardstick of
+machine speed. --check scales the baseline by how fast /test ran then vs now,
+so a baseline recorded on another machine still flags relative regressions.
+Regenerate baselines.json with --save-baseline after intended changes.
+"""
+import os
+import sys
+import json
+import math
+import time
+import socket
+import argparse
+import resource
+import subprocess
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+# p95 movements smaller than this are timer noise, not regressions
+MIN_P95_DELTA_MS = 1.0
+CONTACT_FORM = {"user_name": "Ada", "email": "ada@example.com", "subject": "Hi", "text": "Hello there"}
+
+# (label, method, path, needs admin session, expected status)
+ROUTES = [
+    ("/", "GET", "/", False, 200),
+    ("/portfolio.html", "GET", "/portfolio.html", False, 200),
+    ("/blogs", "GET", "/blogs", False, 200),
+    ("/blogs/<id>", "GET", "/blogs/1", False, 200),
+    ("/admin", "GET", "/admin", True, 200),
+    ("/admin/projects", "GET", "/admin/projects", True, 200),
+    ("/submited_form", "POST", "/submited_form", False, 302),
+]
+# Measured on every run; compare() scales baselines by its throughput
+CALIBRATION = ("/test", "GET", "/test", False, 200)
+
+Sender = Callable[[str, str, bool], int]
+
+
+def percentile(sorted_ms: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sample."""
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[max(0, math.ceil(pct / 100 * len(sorted_ms)) - 1)]
+
+
+def drive(make_sender: Callable[[], Sender], method: str, path: str, admin: bool, expected: int,
+          requests: int, concurrency: int) -> Dict[str, float]:
+    """Fire requests across concurrency threads; one sender per thread."""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    def worker(count: int) -> None:
+        send = make_sender()
+        local, failed = [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            status = send(method, path, admin)
+            local.append((time.perf_counter() - started) * 1000)
+            if status != expected:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in per_thread if n]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "errors": errors[0],
+    }
+
+
+# ---------- WSGI (in-process) ----------
+def run_wsgi(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    from benchmarks.bench_app import admin_cookie, build_app
+
+    app = build_app(posts=args.posts, projects=args.projects, latency=args.latency)
+    cookie = admin_cookie(app)
+
+    def make_sender() -> Sender:
+        anonymous, admin_client = app.test_client(), app.test_client()
+        admin_client.set_cookie(app.config["SESSION_COOKIE_NAME"], cookie)
+
+        def send(method: str, path: str, admin: bool) -> int:
+            client = admin_client if admin else anonymous
+            data = CONTACT_FORM if method == "POST" else None
+            return client.open(path, method=method, data=data).status_code
+        return send
+
+    results = {}
+    for label, method, path, admin, expected in _selected(args):
+        drive(make_sender, method, path, admin, expected, args.warmup, 1)
+        stats = drive(make_sender, method, path, admin, expected, args.requests, args.concurrency)
+        stats["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        results[label] = stats
+    return results
+
+
+# ---------- gunicorn ----------
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as fh:
+            return [int(p) for p in fh.read().split()]
+    except OSError:
+        return []
+
+
+def _peak_rss_mb(pid: int) -> Optional[float]:
+    """VmHWM (peak resident set) of a process, in MB; None off Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def run_gunicorn(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    import httpx
+    from benchmarks.bench_app import admin_cookie, build_app
+
+    port = _free_port()
+    env = dict(os.environ, BENCH_POSTS=str(args.posts), BENCH_PROJECTS=str(args.projects),
+               BENCH_LATENCY=str(args.latency), PYTHONPATH=ROOT)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "-b", f"127.0.0.1:{port}",
+         "--log-level", "warning", "benchmarks.bench_app:build_app()"],
+        cwd=ROOT, env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                if httpx.get(base + "/test").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.time() > deadline or proc.poll() is not None:
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.2)
+
+        # Same SECRET_KEY in both processes, so a locally signed cookie is valid
+        cookie = f"session={admin_cookie(build_app(posts=0, projects=0))}"
+
+        def make_sender() -> Sender:
+            client = httpx.Client(base_url=base, follow_redirects=False)
+
+            def send(method: str, path: str, admin: bool) -> int:
+                headers = {"Cookie": cookie} if admin else {}
+                data = CONTACT_FORM if method == "POST" else None
+                return client.request(method, path, data=data, headers=headers).status_code
+            return send
+
+        results = {}
+        for label, method, path, admin, expected in _selected(args):
+            drive(make_sender, method, path, admin, expected, args.warmup, 1)
+            stats = drive(make_sender, method, path, admin, expected, args.requests, args.concurrency)
+            rss = [r for r in (_peak_rss_mb(pid) for pid in _children(proc.pid)) if r is not None]
+            stats["peak_rss_mb"] = max(rss) if rss else 0.0
+            results[label] = stats
+        return results
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+# ---------- Baselines ----------
+def _selected(args: argparse.Namespace) -> List[Tuple[str, str, str, bool, int]]:
+    if not args.routes:
+        return [CALIBRATION] + ROUTES
+    wanted = set(args.routes.split(","))
+    return [CALIBRATION] + [r for r in ROUTES if r[0] in wanted]
+
+
+def machine_speed(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> float:
+    """How much faster this machine served the calibration route than the baseline's did (1.0 if unknown)."""
+    now, then = current.get(CALIBRATION[0]), baseline.get(CALIBRATION[0])
+    if not now or not then or not now["rps"] or not then["rps"]:
+        return 1.0
+    return now["rps"] / then["rps"]
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """Return human-readable regressions of current vs baseline, scaled by machine_speed()."""
+    speed = machine_speed(current, baseline)
+    problems = []
+    for label, stats in current.items():
+        base = baseline.get(label)
+        if not base or label == CALIBRATION[0]:
+            continue
+        expected_rps, expected_p95 = base["rps"] * speed, base["p95_ms"] / speed
+        if stats["rps"] < expected_rps * (1 - threshold):
+            problems.append(f"{label}: {stats['rps']:.0f} req/s vs {expected_rps:.0f} expected from the baseline")
+        if (stats["p95_ms"] > expected_p95 * (1 + threshold)
+                and stats["p95_ms"] - expected_p95 > MIN_P95_DELTA_MS):
+            problems.append(f"{label}: p95 {stats['p95_ms']:.1f} ms vs {expected_p95:.1f} ms expected from the baseline")
+        if stats["errors"]:
+            problems.append(f"{label}: {stats['errors']} unexpected responses")
+    return problems
+
+
+def _print(mode: str, results: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n[{mode}]")
+    print(f"{'route':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak RSS MB':>12} {'errors':>6}")
+    for label, s in results.items():
+        print(f"{label:<16} {s['rps']:>8.0f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}"
+              f" {s['peak_rss_mb']:>12.1f} {s['errors']:>6}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("wsgi", "gunicorn", "both"), default="wsgi")
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated Supabase latency (s)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int,
+                        help="client threads (default 1 in-process, where the GIL serialises them; 4 for gunicorn)")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--routes", help="comma-separated route labels, e.g. /,/blogs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 on regression vs baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed fractional regression")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SECRET_KEY", "bench")
+    runners = {"wsgi": run_wsgi, "gunicorn": run_gunicorn}
+    modes = ("wsgi", "gunicorn") if args.mode == "both" else (args.mode,)
+    concurrency = args.concurrency
+    params = {"posts": args.posts, "projects": args.projects, "latency": args.latency, "workers": args.workers}
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            stored = json.load(fh)
+
+    failed = False
+    for mode in modes:
+        args.concurrency = concurrency or (1 if mode == "wsgi" else 4)
+        params = dict(params, concurrency=args.concurrency)
+        results = runners[mode](args)
+        _print(mode, results)
+        if args.save_baseline:
+            stored[mode] = {"params": params, "routes": {
+                label: {k: round(v, 2) for k, v in stats.items()} for label, stats in results.items()}}
+        elif args.check:
+            entry = stored.get(mode)
+            if not entry:
+                print(f"No {mode} baseline in {args.baseline}; run with --save-baseline first")
+                failed = True
+                continue
+            if entry.get("params") != params:
+                print(f"Warning: {mode} baseline was recorded with {entry.get('params')}")
+            print(f"{mode}: this machine runs at {machine_speed(results, entry['routes']):.2f}x the baseline's speed")
+            problems = compare(results, entry["routes"], args.threshold)
+            for problem in problems:
+                print(f"REGRESSION {mode} {problem}")
+            failed = failed or bool(problems)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump(stored, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"\nSaved baseline to {args.baseline}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+"""
+Search index build time, size, load time and query latency.
+
+Generates a synthetic corpus with a Zipf-distributed vocabulary (so some
+terms appear in nearly every document and most in very few), builds the
+index, saves and reloads it, then times queries of common, rare and mixed
+terms.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_search [--docs 50000] [--words 300] [--queries 500]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_routes import percentile  # noqa: E402
+from portfolio.search import SearchIndex  # noqa: E402
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "zi", "pe", "sa", "do", "fu", "gi", "ha", "jo"]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + "x")
+    return sorted(words)
+
+
+def corpus(docs, words_per_doc, rng):
+    vocab = vocabulary(20000, rng)
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocab))))
+    for i in range(docs):
+        body = rng.choices(vocab, cum_weights=cumulative, k=words_per_doc)
+        title = rng.choices(vocab, cum_weights=cumulative, k=5)
+        yield {"id": i + 1, "title": " ".join(title), "content": " ".join(body),
+               "created_at": f"2024-01-01T00:00:{i % 60:02d}+00:00"}, vocab
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50000)
+    parser.add_argument("--words", type=int, default=300, help="words per document")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rows, vocab = [], None
+    for row, vocab in corpus(args.docs, args.words, rng):
+        rows.append(row)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search_index.pickle")
+        index = SearchIndex(path)
+        started = time.perf_counter()
+        index.build("bench", [], rows)
+        build_s = time.perf_counter() - started
+        size_mb = os.path.getsize(path) / 1e6
+
+        warm = SearchIndex(path)
+        started = time.perf_counter()
+        warm.load()
+        load_s = time.perf_counter() - started
+        print(f"{args.docs} docs: build {build_s:.1f} s, file {size_mb:.1f} MB, load {load_s * 1000:.0f} ms,"
+              f" {len(warm.doc_ids)} terms")
+
+        kinds = {
+            "top-20 term": lambda: rng.choice(vocab[:20]),
+            "rank 100-500": lambda: rng.choice(vocab[100:500]),
+            "rank 5000+": lambda: rng.choice(vocab[5000:]),
+            "2 terms mixed": lambda: f"{rng.choice(vocab[:200])} {rng.choice(vocab[200:5000])}",
+            "3 terms 100-500": lambda: " ".join(rng.choice(vocab[100:500]) for _ in range(3)),
+            "3 top-50 terms": lambda: " ".join(rng.choice(vocab[:50]) for _ in range(3)),
+        }
+        print(f"{'query':<18} {'first ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for label, make in kinds.items():
+            queries = [make() for _ in range(args.queries)]
+            started = time.perf_counter()
+            warm.search(queries[0])
+            first = (time.perf_counter() - started) * 1000
+            samples = []
+            for q in queries:
+                started = time.perf_counter()
+                warm.search(q)
+                samples.append((time.perf_counter() - started) * 1000)
+            samples.sort()
+            print(f"{label:<18} {first:>9.2f} {statistics.median(samples):>8.3f} {percentile(samples, 95):>8.3f}"
+                  f" {percentile(samples, 99):>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+"""
+Cold start of gunicorn workers: time to first byte and memory per worker.
+
+Starts benchmarks.bench_app under gunicorn in three configurations:
+
+- lazy:     each worker loads the app itself and compiles templates on
+            first use (GUNICORN_PRELOAD=off, TEMPLATE_CACHE=off)
+- bytecode: as lazy, but compiled templates come from a prebuilt
+            bytecode cache on disk
+- preload:  the master loads the app and compiles every template before
+            forking (gunicorn.conf.py), with the bytecode cache
+
+For each, it reports the time from launching gunicorn to the first byte of
+`/`, the first-request TTFB of each page (a worker's first render of a
+template includes compiling it), and, after every page was rendered by
+every worker, mean RSS and PSS per worker and the PSS of master plus
+workers. PSS splits shared pages between the processes that map them, so
+it shows the copy-on-write sharing that RSS hides.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup [--workers 4] [--runs 3] [--configs lazy,bytecode,preload]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_routes import ROOT, _children, _free_port  # noqa: E402
+
+PAGES = ["/", "/about.html", "/portfolio.html", "/contact.html", "/blogs", "/blogs/1"]
+CONFIGS = {
+    "lazy": {"GUNICORN_PRELOAD": "off", "TEMPLATE_CACHE": "off"},
+    "bytecode": {"GUNICORN_PRELOAD": "off", "TEMPLATE_CACHE": "on"},
+    "preload": {"GUNICORN_PRELOAD": "on", "TEMPLATE_CACHE": "on"},
+}
+
+
+def _memory_mb(pid: int) -> Dict[str, float]:
+    """Current RSS and PSS of a process in MB (Linux /proc)."""
+    out = {"rss": 0.0, "pss": 0.0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as fh:
+            for line in fh:
+                if line.startswith("Rss:"):
+                    out["rss"] = int(line.split()[1]) / 1024
+                elif line.startswith("Pss:"):
+                    out["pss"] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return out
+
+
+def _ttfb_ms(client, path: str) -> Optional[float]:
+    started = time.perf_counter()
+    with client.stream("GET", path) as response:
+        if response.status_code != 200:
+            return None
+        return (time.perf_counter() - started) * 1000
+
+
+def measure(name: str, args: argparse.Namespace, cache_dir: str) -> Dict[str, float]:
+    import httpx
+
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT, BENCH_POSTS=str(args.posts), BENCH_PROJECTS=str(args.projects),
+               REPO_CACHE_BACKEND="off", PAGE_CACHE="off", ACCESS_LOG="off", LOG_LEVEL="WARNING",
+               TEMPLATE_CACHE_DIR=cache_dir, **CONFIGS[name])
+    launched = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "-b", f"127.0.0.1:{port}",
+         "--log-level", "warning", "benchmarks.bench_app:build_app()"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while True:
+                try:
+                    if _ttfb_ms(client, "/") is not None:
+                        break
+                except httpx.TransportError:
+                    pass
+                if proc.poll() is not None or time.perf_counter() - launched > 60:
+                    raise RuntimeError(f"{name}: gunicorn did not start")
+                time.sleep(0.01)
+            boot_ms = (time.perf_counter() - launched) * 1000
+            # Sync workers close each connection, so requests spread over the workers
+            first = [t for t in (_ttfb_ms(client, p) for p in PAGES[1:]) if t is not None]
+            for _ in range(args.workers * 3):
+                for page in PAGES:
+                    _ttfb_ms(client, page)
+            warm = [t for t in (_ttfb_ms(client, p) for p in PAGES) if t is not None]
+        workers = [_memory_mb(pid) for pid in _children(proc.pid)]
+        master = _memory_mb(proc.pid)
+        return {
+            "boot_to_first_byte_ms": boot_ms,
+            "first_hit_ttfb_ms": statistics.mean(first) if first else 0.0,
+            "warm_ttfb_ms": statistics.mean(warm) if warm else 0.0,
+            "worker_rss_mb": statistics.mean(w["rss"] for w in workers) if workers else 0.0,
+            "worker_pss_mb": statistics.mean(w["pss"] for w in workers) if workers else 0.0,
+            "total_pss_mb": master["pss"] + sum(w["pss"] for w in workers),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def build_bytecode_cache(cache_dir: str) -> None:
+    env = dict(os.environ, PYTHONPATH=ROOT, TEMPLATE_CACHE="on", TEMPLATE_CACHE_DIR=cache_dir, LOG_LEVEL="WARNING")
+    env.setdefault("SECRET_KEY", "bench")
+    subprocess.run([sys.executable, "-m", "flask", "--app", "portfolio.app:create_app", "build-templates"],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3, help="median over this many launches per config")
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--configs", default="lazy,bytecode,preload")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="jinja-cache-")
+    try:
+        build_bytecode_cache(cache_dir)
+        columns = ["boot_to_first_byte_ms", "first_hit_ttfb_ms", "warm_ttfb_ms",
+                   "worker_rss_mb", "worker_pss_mb", "total_pss_mb"]
+        print(f"{'config':<10}" + "".join(f"{c:>24}" for c in columns))
+        for name in args.configs.split(","):
+            runs: List[Dict[str, float]] = [measure(name, args, cache_dir) for _ in range(args.runs)]
+            print(f"{name:<10}" + "".join(f"{statistics.median(r[c] for r in runs):>24.1f}" for c in columns),
+                  flush=True)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+"""
+Time to first byte and peak memory of the listing pages, buffered vs streamed.
+
+Each mode runs in its own process against FakeSupabase seeded with --rows
+posts and projects. For every route the peak RSS is reset
+(/proc/self/clear_refs) before the request, so "peak MB" is the high-water
+mark reached while serving it, above the RSS the process had before.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_streaming [--rows 10000] [--latency 0.02] [--repeat 3]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+ROUTES = ("/admin", "/admin/blogs", "/admin/projects", "/blogs")
+MODES = ("buffered", "streamed")
+
+
+def _status_kb(field):
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _reset_peak():
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def child(mode, rows, latency, repeat):
+    os.environ["STREAM_TEMPLATES"] = "on" if mode == "streamed" else "off"
+    os.environ["PAGE_CACHE"] = "off"
+    os.environ["REPO_CACHE_BACKEND"] = "off"
+    os.environ["COMPRESSION"] = "off"
+    from benchmarks.bench_app import admin_cookie, build_app
+
+    app = build_app(posts=rows, projects=rows, latency=latency)
+    client = app.test_client()
+    client.set_cookie("session", admin_cookie(app))
+    results = {}
+    for route in ROUTES:
+        client.get(route)  # warm: templates, clients, token checks
+        ttfb, total, peak, size = [], [], [], 0
+        for _ in range(repeat):
+            before = _status_kb("VmRSS")
+            exact = _reset_peak()
+            started = time.perf_counter()
+            response = client.get(route, buffered=False)
+            chunks = iter(response.response)
+            first = next(chunks, b"")
+            ttfb.append((time.perf_counter() - started) * 1000)
+            size = len(first) + sum(len(chunk) for chunk in chunks)
+            response.close()
+            total.append((time.perf_counter() - started) * 1000)
+            peak.append((_status_kb("VmHWM") - before) / 1024 if exact else float("nan"))
+        results[route] = {"ttfb_ms": statistics.median(ttfb), "total_ms": statistics.median(total),
+                          "peak_mb": max(peak), "bytes": size}
+    print(json.dumps(results))
+
+
+def run(rows, latency, repeat):
+    by_mode = {}
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_streaming", "--child", mode, "--rows", str(rows),
+             "--latency", str(latency), "--repeat", str(repeat)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        by_mode[mode] = json.loads(out.strip().splitlines()[-1])
+    print(f"{rows} posts and {rows} projects, {latency * 1000:.0f} ms per Supabase request")
+    print(f"{'route':<16} {'mode':<9} {'ttfb ms':>9} {'total ms':>9} {'peak MB':>8} {'bytes':>10}")
+    for route in ROUTES:
+        for mode in MODES:
+            r = by_mode[mode][route]
+            print(f"{route:<16} {mode:<9} {r['ttfb_ms']:>9.1f} {r['total_ms']:>9.1f} {r['peak_mb']:>8.1f} {r['bytes']:>10,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.rows, args.latency, args.repeat)
+    else:
+        run(args.rows, args.latency, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+"""
+gunicorn settings, read automatically when gunicorn starts in this directory.
+
+The app is loaded once in the master and every template compiled there,
+so forked workers share that memory copy-on-write and start warm. Threads
+do not survive a fork, so the master stops its mail queue worker and each
+worker starts its own. Each worker also re-installs the SIGHUP settings
+reload handler (workers reset signals after the fork) and opens its
+Supabase connection before it accepts requests.
+GUNICORN_PRELOAD=off loads the app in each worker instead (e.g. with
+--reload).
+"""
+import gc
+import os
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "on").lower() in ("on", "true", "1")
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from portfolio.mail_queue import stop_worker
+    from portfolio.warmup import flask_app_of, warm_templates
+
+    app = flask_app_of(server.app.wsgi())
+    if app is not None:
+        warm_templates(app)
+        # The master serves no requests; the workers drain the outbox
+        stop_worker(app)
+    # Move everything loaded so far out of the collector's view: collections in
+    # the workers would otherwise write to (and so copy) these shared pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    from portfolio.mail_queue import get_worker
+    from portfolio.settings import install_reload_handler
+    from portfolio.warmup import flask_app_of, warm_connections
+
+    app = flask_app_of(worker.wsgi)
+    if app is not None:
+        # The worker reset SIGHUP to its default (exit) after the fork
+        install_reload_handler(app)
+        get_worker(app)
+        warm_connections(app)
@@ -1,3 +1,7 @@
+-- Baseline: the schema as of the introduction of numbered migrations.
+-- Every statement is idempotent, so it also applies cleanly to databases
+-- created from the old supabase_schema.sql.
+
 -- Projects table
 create table if not exists public.projects (
   id bigserial primary key,
@@ -13,6 +17,48 @@ create table if not exists public.projects (
 -- Enable RLS
 alter table public.projects enable row level security;
 
+-- Resized image variants, e.g. {"webp": {"320": url, "640": url}, "avif": {...}}
+alter table public.projects add column if not exists image_variants jsonb default '{}'::jsonb;
+
+-- Blog posts table
+create table if not exists public.blog_posts (
+  id bigserial primary key,
+  title text not null,
+  content text not null,
+  created_at timestamptz default now()
+);
+
+-- Server-computed excerpt so list views never ship full post bodies
+alter table public.blog_posts
+  add column if not exists excerpt text
+  generated always as (
+    case when length(content) > 200 then left(content, 200) || '…' else content end
+  ) stored;
+
+-- Keyset pagination indexes (newest first)
+create index if not exists blog_posts_created_at_id_idx on public.blog_posts (created_at desc, id desc);
+
+-- Row change time: the local read replica (REPLICA=on) syncs rows newer than its last watermark
+alter table public.projects add column if not exists updated_at timestamptz default now();
+alter table public.blog_posts add column if not exists updated_at timestamptz default now();
+
+create or replace function public.set_updated_at() returns trigger
+language plpgsql as $$
+begin
+  new.updated_at = now();
+  return new;
+end $$;
+
+drop trigger if exists projects_set_updated_at on public.projects;
+create trigger projects_set_updated_at before update on public.projects
+  for each row execute function public.set_updated_at();
+drop trigger if exists blog_posts_set_updated_at on public.blog_posts;
+create trigger blog_posts_set_updated_at before update on public.blog_posts
+  for each row execute function public.set_updated_at();
+
+create index if not exists projects_updated_at_id_idx on public.projects (updated_at, id);
+create index if not exists blog_posts_updated_at_id_idx on public.blog_posts (updated_at, id);
+
 -- Admin governance via an explicit admins table (no service role in app, pure RLS by user id)
 create table if not exists public.admins (
   user_id uuid primary key
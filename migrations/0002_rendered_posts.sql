@@ -0,0 +1,22 @@
+-- Posts are rendered once when written (portfolio/rendering.py): Markdown to
+-- HTML, a plain-text excerpt, word count and reading time are stored next to
+-- the source. Existing rows keep render_version 0 until `flask render-posts`
+-- re-renders them.
+
+-- The excerpt was generated from the raw source; it becomes a plain column
+-- the app writes (existing values are kept)
+do $$
+begin
+  if exists (
+    select 1 from information_schema.columns
+    where table_schema = 'public' and table_name = 'blog_posts'
+      and column_name = 'excerpt' and is_generated = 'ALWAYS'
+  ) then
+    alter table public.blog_posts alter column excerpt drop expression;
+  end if;
+end $$;
+
+alter table public.blog_posts add column if not exists content_html text;
+alter table public.blog_posts add column if not exists word_count integer;
+alter table public.blog_posts add column if not exists reading_minutes integer;
+alter table public.blog_posts add column if not exists render_version integer not null default 0;
@@ -0,0 +1,86 @@
+"""
+One asyncio event loop per process for outbound I/O.
+
+Views stay synchronous. When a view needs several independent reads, it
+hands their coroutines to run_concurrently(), which runs them together on
+the I/O loop and blocks only the calling thread until all of them finish.
+Under the ASGI adapter (portfolio/asgi.py) the loop is the server's own, so
+every in-flight request's Supabase calls share one loop and one connection
+pool. Under sync gunicorn workers, a daemon thread runs the loop.
+"""
+import os
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from typing import Any, Awaitable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IOLoop:
+    """The process's I/O event loop; a fork starts a fresh one in the child."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Use a loop that is already running, e.g. the ASGI server's."""
+        if self._loop is loop and self._pid == os.getpid():
+            return
+        with self._lock:
+            self._loop, self._thread, self._pid = loop, None, os.getpid()
+
+    def get(self) -> asyncio.AbstractEventLoop:
+        """The running loop, starting a background thread for it on first use."""
+        loop = self._loop
+        if loop is not None and self._pid == os.getpid() and not loop.is_closed():
+            return loop
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="io-loop", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+                logger.debug("Started I/O loop thread")
+            return self._loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run coro on the loop and wait for its result from a synchronous caller."""
+        loop = self.get()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()  # type: ignore[attr-defined]
+            raise RuntimeError("IOLoop.run() called from the I/O loop itself; await the coroutine instead")
+        # The task starts in a copy of the caller's context, so request-scoped
+        # state (Flask's request and session, metrics timings) is visible to it
+        future = asyncio.run_coroutine_threadsafe(coro, loop)  # type: ignore[arg-type]
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"I/O did not finish within {timeout} s") from None
+
+
+io_loop = IOLoop()
+
+
+async def _gather(awaitables: List[Optional[Awaitable[Any]]]) -> List[Any]:
+    async def resolve(item: Optional[Awaitable[Any]]) -> Any:
+        return None if item is None else await item
+    return list(await asyncio.gather(*(resolve(a) for a in awaitables)))
+
+
+def run_concurrently(*awaitables: Optional[Awaitable[Any]], timeout: Optional[float] = None) -> List[Any]:
+    """
+    Await several coroutines at once and return their results in order.
+    None stands for "nothing to do" and yields None, so optional repos can be
+    passed as `repo.alist_posts() if repo is not None else None`.
+    """
+    return io_loop.run(_gather(list(awaitables)), timeout)
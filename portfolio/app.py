@@ -3,25 +3,31 @@ from flask import Flask
 from supabase import create_client, Client
 from flask_login import LoginManager
 from flask_wtf import CSRFProtect
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from flask_mail import Mail
 from typing import Union
-import logging
-from logging.handlers import RotatingFileHandler
 
 from . import routes
 from . import auth
 from .models import User, login_manager
 from .utils import mail
+from .mail_queue import init_mail_queue
+from .ratelimit import init_rate_limiting
+from .assets import init_assets
+from .metrics import init_metrics
+from .settings import init_settings
+from .replica import init_replica
+from .search import init_search
+from .facets import init_facets
+from .logs import init_logging
+from .warmup import init_templates
+from .tokens import init_tokens
+from .rendering import init_rendering
+from .compression import init_compression
+from .streaming import init_streaming
+from .resilience import init_resilience
 
 # Initialize extensions at the top level
 csrf = CSRFProtect()
-limiter = Limiter(
-    get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://",
-)
 
 
 def create_app():
@@ -39,6 +45,30 @@ def create_app():
     app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
     app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
     app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER')
+    app.config['MAIL_QUEUE'] = os.environ.get('MAIL_QUEUE', 'on')
+    app.config['MAIL_QUEUE_PATH'] = os.environ.get('MAIL_QUEUE_PATH')
+    app.config['MAIL_QUEUE_BATCH_SIZE'] = int(os.environ.get('MAIL_QUEUE_BATCH_SIZE', 20))
+    app.config['MAIL_QUEUE_MAX_ATTEMPTS'] = int(os.environ.get('MAIL_QUEUE_MAX_ATTEMPTS', 5))
+    app.config['MAIL_QUEUE_RETRY_DELAY'] = float(os.environ.get('MAIL_QUEUE_RETRY_DELAY', 30))
+    app.config['MAIL_QUEUE_AUTOSTART'] = os.environ.get('MAIL_QUEUE_AUTOSTART', 'on').lower() in ['on', 'true', '1']
+
+    # Uploads: Werkzeug rejects larger request bodies with 413 before they are parsed
+    app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 8 * 1024 * 1024))
+    app.config['MAX_IMAGE_BYTES'] = int(os.environ.get('MAX_IMAGE_BYTES', 5 * 1024 * 1024))
+
+    # Static assets: hashed, precompressed copies under static/dist/
+    app.config['ASSETS'] = os.environ.get('ASSETS', 'on')
+    app.config['ASSETS_AUTO_BUILD'] = os.environ.get('ASSETS_AUTO_BUILD', 'on')
+
+    # Instrumentation: Server-Timing headers and Prometheus text at /metrics
+    app.config['METRICS'] = os.environ.get('METRICS', 'on')
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', 'true').lower() in ['true', 'on', '1']
+
+    # Search: inverted index persisted next to the other instance files
+    app.config['SEARCH'] = os.environ.get('SEARCH', 'on')
+    app.config['SEARCH_INDEX_PATH'] = os.environ.get('SEARCH_INDEX_PATH')
+    app.config['FACET_INDEX_PATH'] = os.environ.get('FACET_INDEX_PATH')
 
     # Database configuration
     database_url = os.environ.get('DATABASE_URL')
@@ -51,33 +81,68 @@ def create_app():
         
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Logging: JSON lines on stdout, written by a background thread
+    app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+    app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'json')
+    app.config['LOG_QUEUE_SIZE'] = os.environ.get('LOG_QUEUE_SIZE', '10000')
+    app.config['LOG_SAMPLE'] = os.environ.get('LOG_SAMPLE', '')
+    app.config['ACCESS_LOG'] = os.environ.get('ACCESS_LOG', 'on').lower() in ['on', 'true', '1']
+    # Templates: compiled code cached on disk; no per-render mtime checks unless asked
+    app.config['TEMPLATE_CACHE'] = os.environ.get('TEMPLATE_CACHE', 'on')
+    app.config['TEMPLATE_CACHE_DIR'] = os.environ.get('TEMPLATE_CACHE_DIR')
+    app.config['TEMPLATES_AUTO_RELOAD'] = os.environ.get(
+        'TEMPLATES_AUTO_RELOAD', os.environ.get('FLASK_DEBUG', 'false')).lower() in ['true', 'on', '1']
+    # Listing pages stream as their rows are read (see streaming.py)
+    app.config['STREAM_TEMPLATES'] = os.environ.get('STREAM_TEMPLATES', 'on')
+    app.config['STREAM_CHUNK_SIZE'] = int(os.environ.get('STREAM_CHUNK_SIZE', 16 * 1024))
+    # View threads per process when served through asgi.py
+    app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 64))
+    # Local checks of the Supabase session token
+    app.config['SUPABASE_JWT_SECRET'] = os.environ.get('SUPABASE_JWT_SECRET')
+    app.config['ADMIN_CACHE_TTL'] = float(os.environ.get('ADMIN_CACHE_TTL', 300))
+    app.config['TOKEN_REFRESH_MARGIN'] = float(os.environ.get('TOKEN_REFRESH_MARGIN', 300))
+    # Response compression (br/zstd/gzip) for pages rendered per request
+    app.config['COMPRESSION'] = os.environ.get('COMPRESSION', 'on')
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    app.config['COMPRESSION_STREAM_SIZE'] = int(os.environ.get('COMPRESSION_STREAM_SIZE', 256 * 1024))
+    # Deadlines, retries, hedging and the circuit breaker for Supabase calls
+    app.config['SUPABASE_READ_TIMEOUT'] = float(os.environ.get('SUPABASE_READ_TIMEOUT', 3.0))
+    app.config['SUPABASE_WRITE_TIMEOUT'] = float(os.environ.get('SUPABASE_WRITE_TIMEOUT', 10.0))
+    app.config['SUPABASE_READ_RETRIES'] = int(os.environ.get('SUPABASE_READ_RETRIES', 2))
+    app.config['SUPABASE_HEDGE_AFTER'] = float(os.environ.get('SUPABASE_HEDGE_AFTER') or 0) or None
+    app.config['SUPABASE_BREAKER_THRESHOLD'] = int(os.environ.get('SUPABASE_BREAKER_THRESHOLD', 5))
+    app.config['SUPABASE_BREAKER_COOLDOWN'] = float(os.environ.get('SUPABASE_BREAKER_COOLDOWN', 30.0))
+    init_logging(app)
+
+    # Parsed once here; views read current_settings(), SIGHUP reloads
+    init_settings(app)
+
     # Initialize extensions with the app object
+    init_metrics(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
+    init_tokens(app)
+    init_resilience(app)
     csrf.init_app(app)
-    limiter.init_app(app)
+    init_rate_limiting(app)
     mail.init_app(app)
+    init_mail_queue(app)
+    init_replica(app)
+    init_search(app)
+    init_facets(app)
+    init_assets(app)
+    init_templates(app)
+    init_rendering(app)
+    init_streaming(app)
+    init_compression(app)
 
-    from .supabase_client import supabase
-    app.supabase = supabase
+    # Import error handlers before the blueprint they attach to is registered
+    from portfolio import errors
 
     # Register blueprints
     app.register_blueprint(routes.bp)
     app.register_blueprint(auth.auth_bp)
 
-    # Import and register error handlers
-    from portfolio import errors
-
-    # Logging
-    # In production, log to stdout
-    if not any(isinstance(h, logging.StreamHandler) for h in app.logger.handlers):
-        stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'))
-        stream_handler.setLevel(logging.INFO)
-        app.logger.addHandler(stream_handler)
-
-    app.logger.setLevel(logging.INFO)
     app.logger.info('Portfolio startup')
 
     return app
@@ -0,0 +1,203 @@
+"""
+Serve the Flask app from an ASGI server such as uvicorn.
+
+    uvicorn asgi:app --workers 2
+
+Views run on a bounded thread pool, ASGI_THREADS per process (default
+64). The server's event loop also serves as the I/O loop (see aio.py), so
+the async Supabase calls of every in-flight request share one loop and one
+connection pool. A thread that waits on them does nothing else until they
+finish. One process can therefore keep many more requests waiting on
+Supabase than a sync gunicorn worker, which serves a single request.
+"""
+import sys
+import asyncio
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+
+from .aio import io_loop
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREADS = 64
+# Request bodies above this size are spooled to a temporary file
+MAX_BODY_IN_MEMORY = 1024 * 1024
+
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+
+class WsgiToAsgi:
+    """ASGI application that runs a WSGI app on a thread pool."""
+
+    def __init__(self, wsgi_app: Callable[..., Any], threads: int = DEFAULT_THREADS):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            # No websocket routes; refuse the handshake
+            await send({"type": "websocket.close", "code": 1000})
+            return
+        loop = asyncio.get_running_loop()
+        io_loop.attach(loop)
+        max_size = getattr(self.wsgi_app, "config", {}).get("MAX_CONTENT_LENGTH")
+        body, size = await self._read_body(receive, max_size)
+        try:
+            if max_size is not None and size > max_size:
+                await send({"type": "http.response.start", "status": 413,
+                            "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+                await send({"type": "http.response.body", "body": b"Request Entity Too Large"})
+                return
+            await loop.run_in_executor(self.executor, self._run, self._environ(scope, body, size), send, loop)
+        finally:
+            body.close()
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                io_loop.attach(asyncio.get_running_loop())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                # Waiting here would block the loop that running requests send through
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive: Receive, max_size: Optional[int] = None) -> Tuple[Any, int]:
+        """Buffer the request body; stop once it grows past max_size."""
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY)
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                break
+            body.write(chunk)
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+        return body, size
+
+    @staticmethod
+    def _environ(scope: Dict[str, Any], body: Any, size: int) -> Dict[str, Any]:
+        root_path = scope.get("root_path", "")
+        path = scope["path"]
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ: Dict[str, Any] = {
+            "REQUEST_METHOD": scope["method"],
+            # PEP 3333: paths are bytes decoded as latin-1
+            "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+            "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            # The whole body is buffered, so the app may read it to EOF
+            "wsgi.input_terminated": True,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for raw_name, raw_value in scope.get("headers", []):
+            name = raw_name.decode("latin-1").upper().replace("-", "_")
+            if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                name = "HTTP_" + name
+            value = raw_value.decode("latin-1")
+            environ[name] = f"{environ[name]},{value}" if name in environ else value
+        # A chunked request carries no Content-Length; give the app the buffered size
+        environ.setdefault("CONTENT_LENGTH", str(size))
+        return environ
+
+    def _run(self, environ: Dict[str, Any], send: Send, loop: asyncio.AbstractEventLoop) -> None:
+        """Call the WSGI app on a pool thread, handing each message to the server loop."""
+        started: List[Any] = []
+        pending: List[bytes] = []
+        sized: List[bool] = [True]
+
+        def send_sync(message: Message) -> None:
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def flush_start() -> None:
+            if started and started[0] is not None:
+                send_sync(started[0])
+                started[0] = None
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Optional[Any] = None) -> Any:
+            if exc_info is not None and started and started[0] is None:
+                raise exc_info[1].with_traceback(exc_info[2])
+            message = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+            }
+            started[:] = [message]
+            sized[0] = any(k.lower() == "content-length" for k, _ in headers)
+            return write
+
+        def write(data: bytes) -> None:
+            flush_start()
+            send_sync({"type": "http.response.body", "body": data, "more_body": True})
+
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                # Hold back one chunk, so a buffered response goes out as start + one final body;
+                # streamed responses (no Content-Length) pass each chunk on as it comes
+                for chunk in result:
+                    if not chunk:
+                        continue
+                    if pending:
+                        flush_start()
+                        send_sync({"type": "http.response.body", "body": pending.pop(), "more_body": True})
+                    if sized[0]:
+                        pending.append(chunk)
+                    else:
+                        flush_start()
+                        send_sync({"type": "http.response.body", "body": chunk, "more_body": True})
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        except Exception:
+            logger.exception("Unhandled error in WSGI app")
+            try:
+                if not started or started[0] is not None:
+                    send_sync({"type": "http.response.start", "status": 500,
+                               "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+                    send_sync({"type": "http.response.body", "body": b"Internal Server Error"})
+                else:
+                    # Headers are out; end the truncated body
+                    send_sync({"type": "http.response.body", "body": b""})
+            except Exception:
+                logger.debug("Could not finish the failed response", exc_info=True)
+            return
+        flush_start()
+        send_sync({"type": "http.response.body", "body": pending.pop() if pending else b""})
+
+
+def asgi_app(app: Flask) -> WsgiToAsgi:
+    """Wrap app for an ASGI server, sized by ASGI_THREADS."""
+    return WsgiToAsgi(app, threads=int(app.config.get("ASGI_THREADS") or DEFAULT_THREADS))
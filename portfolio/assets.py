@@ -0,0 +1,313 @@
+import os
+import re
+import io
+import sys
+import gzip
+import json
+import hashlib
+import logging
+import mimetypes
+import posixpath
+from typing import Dict, Iterable, List, Optional, Set
+
+from flask import Flask, current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+try:
+    from fontTools import subset as ft_subset
+except ImportError:  # optional: fonts are fingerprinted but not subset without it
+    ft_subset = None
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+FONTAWESOME_CSS = "fontawesome-free-6.2.1-web/css/all.css"
+FONTAWESOME_FONTS = "fontawesome-free-6.2.1-web/webfonts/"
+COMPRESSIBLE = {".css", ".js", ".svg", ".ttf", ".json", ".txt", ".html"}
+# Skip variants that would not pay for the extra file
+MIN_COMPRESS_BYTES = 512
+ONE_YEAR = 365 * 24 * 3600
+# Bump when build_assets() output changes for the same sources
+BUILD_VERSION = "1"
+
+mimetypes.add_type("font/woff2", ".woff2")
+mimetypes.add_type("font/ttf", ".ttf")
+
+_ICON_RE = re.compile(r"\bfa-([a-z0-9-]+)")
+# Top-level glyph rules such as ".fa-github:before {\n  content: "\f09b"; }"
+_GLYPH_RULE_RE = re.compile(
+    r"((?:\.fa-[a-z0-9-]+::?before,?\s*)+)\{\s*content:\s*\"((?:\\[0-9a-f]+|[^\"])*)\";?\s*\}\s*",
+    re.IGNORECASE,
+)
+_URL_RE = re.compile(r"url\((['\"]?)([^'\")]+)\1\)")
+
+
+def used_icon_names(sources: Iterable[str]) -> Set[str]:
+    """Collect every fa-* token referenced by the given template/JS sources."""
+    names: Set[str] = set()
+    for text in sources:
+        names.update(_ICON_RE.findall(text))
+    return names
+
+
+def subset_fontawesome_css(css: str, used: Set[str]):
+    """Drop glyph rules for icons nobody references.
+
+    Returns (css, codepoints) where codepoints are the glyphs still in use.
+    """
+    codepoints: Set[int] = set()
+
+    def keep(match: "re.Match[str]") -> str:
+        names = re.findall(r"\.fa-([a-z0-9-]+)", match.group(1))
+        if not any(name in used for name in names):
+            return ""
+        for escape in re.findall(r"\\([0-9a-f]+)", match.group(2), re.IGNORECASE):
+            codepoints.add(int(escape, 16))
+        return match.group(0)
+
+    return _GLYPH_RULE_RE.sub(keep, css), codepoints
+
+
+def subset_font(data: bytes, codepoints: Set[int], flavor: Optional[str]) -> bytes:
+    if ft_subset is None or not codepoints:
+        return data
+    if flavor == "woff2" and brotli is None:
+        return data
+    options = ft_subset.Options()
+    options.flavor = flavor
+    options.layout_features = ["*"]
+    font = ft_subset.load_font(io.BytesIO(data), options)
+    subsetter = ft_subset.Subsetter(options)
+    subsetter.populate(unicodes=sorted(codepoints))
+    subsetter.subset(font)
+    out = io.BytesIO()
+    ft_subset.save_font(font, out, options)
+    return out.getvalue()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _hashed_name(logical: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    stem, ext = posixpath.splitext(logical)
+    return f"{DIST_DIR}/{stem}.{digest}{ext}"
+
+
+def _emit(static_folder: str, logical: str, data: bytes, manifest: Dict[str, str]) -> None:
+    hashed = _hashed_name(logical, data)
+    target = os.path.join(static_folder, *hashed.split("/"))
+    if not os.path.exists(target):
+        _write_atomic(target, data)
+        ext = posixpath.splitext(logical)[1].lower()
+        if ext in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+            _write_atomic(target + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write_atomic(target + ".br", brotli.compress(data, quality=11))
+    manifest[logical] = hashed
+
+
+def _rewrite_css_urls(css: str, logical: str, manifest: Dict[str, str]) -> str:
+    base = posixpath.dirname(logical)
+    hashed_base = posixpath.dirname(_hashed_name(logical, b""))
+
+    def repl(match: "re.Match[str]") -> str:
+        quote, ref = match.group(1), match.group(2)
+        if ref.startswith(("data:", "http:", "https:", "/", "#")):
+            return match.group(0)
+        clean = re.split(r"[?#]", ref, maxsplit=1)[0]
+        suffix = ref[len(clean):]
+        target = manifest.get(posixpath.normpath(posixpath.join(base, clean)))
+        if target is None:
+            return match.group(0)
+        return f"url({quote}{posixpath.relpath(target, hashed_base)}{suffix}{quote})"
+
+    return _URL_RE.sub(repl, css)
+
+
+def _static_files(static_folder: str) -> List[str]:
+    """Logical paths of every source file under static/, dist/ excluded."""
+    files = []
+    for root, dirs, names in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder)
+        if rel_root.split(os.sep)[0] == DIST_DIR:
+            dirs[:] = []
+            continue
+        for name in names:
+            files.append(posixpath.normpath(posixpath.join(rel_root.replace(os.sep, "/"), name)))
+    return sorted(files)
+
+
+def _template_files(template_folder: str) -> List[str]:
+    return sorted(os.path.join(root, n) for root, _, names in os.walk(template_folder)
+                  for n in names if n.endswith(".html"))
+
+
+def source_fingerprint(static_folder: str, template_folder: str) -> str:
+    """Digest of every input to build_assets(); templates count because they pick the icons."""
+    digest = hashlib.sha256(BUILD_VERSION.encode("ascii"))
+    inputs = [(f, os.path.join(static_folder, *f.split("/"))) for f in _static_files(static_folder)]
+    inputs += [(os.path.relpath(path, template_folder), path) for path in _template_files(template_folder)]
+    for name, path in inputs:
+        digest.update(name.encode("utf-8") + b"\0")
+        with open(path, "rb") as fh:
+            digest.update(hashlib.sha256(fh.read()).digest())
+    return digest.hexdigest()
+
+
+def build_assets(static_folder: str, template_folder: str) -> Dict[str, str]:
+    """
+    Fingerprint every static file into static/dist/, subset Font Awesome to the
+    icons the templates use, and write .gz/.br siblings for text assets.
+    Returns the manifest (logical path -> hashed path), saved in
+    static/dist/manifest.json together with the source_fingerprint() it was
+    built from.
+    """
+    files = _static_files(static_folder)
+
+    sources = []
+    for path in _template_files(template_folder):
+        with open(path, encoding="utf-8") as fh:
+            sources.append(fh.read())
+    sources.extend(
+        open(os.path.join(static_folder, f), encoding="utf-8").read() for f in files if f.endswith(".js")
+    )
+    used = used_icon_names(sources)
+
+    def read(logical: str) -> bytes:
+        with open(os.path.join(static_folder, *logical.split("/")), "rb") as fh:
+            return fh.read()
+
+    codepoints: Set[int] = set()
+    fa_css = None
+    if FONTAWESOME_CSS in files:
+        fa_css, codepoints = subset_fontawesome_css(read(FONTAWESOME_CSS).decode("utf-8"), used)
+
+    manifest: Dict[str, str] = {}
+    # Non-CSS first so stylesheets can point at the hashed fonts/images
+    for logical in sorted(f for f in files if not f.endswith(".css")):
+        data = read(logical)
+        if logical.startswith(FONTAWESOME_FONTS) and logical.endswith((".woff2", ".ttf")):
+            flavor = "woff2" if logical.endswith(".woff2") else None
+            # Re-encode woff2 from the TTF master; some shipped woff2 files don't decode cleanly
+            master = posixpath.splitext(logical)[0] + ".ttf"
+            try:
+                data = subset_font(read(master) if master in files else data, codepoints, flavor)
+            except Exception as exc:
+                logger.warning("Font subsetting failed for %s (%s); shipping the full font", logical, exc)
+        _emit(static_folder, logical, data, manifest)
+
+    for logical in sorted(f for f in files if f.endswith(".css")):
+        css = fa_css if logical == FONTAWESOME_CSS else read(logical).decode("utf-8")
+        _emit(static_folder, logical, _rewrite_css_urls(css, logical, manifest).encode("utf-8"), manifest)
+
+    stored = {"sources": source_fingerprint(static_folder, template_folder), "files": manifest}
+    _write_atomic(
+        os.path.join(static_folder, DIST_DIR, MANIFEST_NAME),
+        json.dumps(stored, indent=1, sort_keys=True).encode("utf-8"),
+    )
+    return manifest
+
+
+def load_manifest(static_folder: str, fingerprint: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """The saved manifest; None when there is none, or it was built from other sources than fingerprint."""
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as fh:
+            stored = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    # Manifests written before fingerprints were stored are a flat mapping; treat them as stale
+    if not isinstance(stored, dict) or not isinstance(stored.get("files"), dict):
+        return None
+    if fingerprint is not None and stored.get("sources") != fingerprint:
+        return None
+    return stored["files"]
+
+
+def _encodings_on_disk(static_folder: str, manifest: Dict[str, str]) -> Dict[str, Set[str]]:
+    found: Dict[str, Set[str]] = {}
+    for hashed in manifest.values():
+        full = os.path.join(static_folder, *hashed.split("/"))
+        found[hashed] = {enc for enc, suffix in (("br", ".br"), ("gzip", ".gz")) if os.path.exists(full + suffix)}
+    return found
+
+
+def send_static(filename: str):
+    """Static view: hashed files get immutable caching and precompressed bodies."""
+    app = current_app
+    if not filename.startswith(DIST_DIR + "/"):
+        return app.send_static_file(filename)
+    available = app.extensions.get("asset_encodings", {}).get(filename, set())
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding = None
+    for candidate in ("br", "gzip"):
+        if candidate in available and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+    path = filename + {"br": ".br", "gzip": ".gz"}.get(encoding, "")
+    resp = send_from_directory(app.static_folder, path, mimetype=mimetype, max_age=ONE_YEAR)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    if available:
+        resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def init_assets(app: Flask) -> None:
+    """Serve fingerprinted assets and make url_for('static', ...) emit hashed URLs."""
+    if str(app.config.get("ASSETS", "on")).lower() in ("off", "false", "0"):
+        return
+    template_folder = os.path.join(app.root_path, app.template_folder)
+    auto_build = str(app.config.get("ASSETS_AUTO_BUILD", "on")).lower() not in ("off", "false", "0")
+    manifest = None
+    try:
+        manifest = load_manifest(app.static_folder, source_fingerprint(app.static_folder, template_folder))
+    except OSError:
+        logger.exception("Could not fingerprint static sources")
+    if manifest is None and auto_build:
+        try:
+            manifest = build_assets(app.static_folder, template_folder)
+        except Exception:
+            logger.exception("Static asset build failed; serving unhashed files")
+    elif manifest is None:
+        manifest = load_manifest(app.static_folder)
+        if manifest is not None:
+            logger.warning("static/%s was built from older sources; run `flask build-assets`", DIST_DIR)
+    if not manifest:
+        return
+    app.extensions["asset_manifest"] = manifest
+    app.extensions["asset_encodings"] = _encodings_on_disk(app.static_folder, manifest)
+    app.view_functions["static"] = send_static
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == "static":
+            hashed = manifest.get(values.get("filename", ""))
+            if hashed:
+                values["filename"] = hashed
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Fingerprint and precompress static files into static/dist/."""
+        result = build_assets(app.static_folder, template_folder)
+        print(f"Built {len(result)} assets into {os.path.join(app.static_folder, DIST_DIR)}")
+
+
+if __name__ == "__main__":
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    result = build_assets(os.path.join(package_dir, "static"), os.path.join(package_dir, "templates"))
+    print(f"Built {len(result)} assets")
+    sys.exit(0)
@@ -1,62 +1,64 @@
 from flask import Blueprint, request, redirect, flash, render_template, session
-from flask_login import login_user, logout_user, login_required
+from flask_login import login_user, login_required
 import logging
-from .supabase_client import supabase
 from .models import User
-from .supabase_repo import get_supabase_context_from_env, get_backend_mode
+from .settings import current_settings
+from .ratelimit import limiter, login_limit
+from .tokens import SESSION_KEYS, clear_auth_session, get_token_manager
 
+logger = logging.getLogger(__name__)
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit(login_limit, methods=['POST'])
 def login():
     """Supabase-only login; permit only admins to proceed to the app."""
     if request.method == 'POST':
         email = request.form.get('email')
         password = request.form.get('password')
-        logging.info(f"Login attempt for email: {email}")
+        logger.info("Login attempt for email: %s", email)
         try:
-            if get_backend_mode() == 'supabase' and supabase is None:
-                logging.error("Supabase is not configured")
+            ctx = current_settings().supabase
+            if ctx is None:
+                logger.error("Supabase is not configured")
                 raise RuntimeError("Supabase is not configured")
 
-            sres = supabase.auth.sign_in_with_password({
+            sres = ctx.auth_client().auth.sign_in_with_password({
                 "email": email,
                 "password": password
             })
-            logging.info(f"Supabase sign-in successful for email: {email}")
+            logger.info("Supabase sign-in successful for email: %s", email)
 
             try:
                 session["supabase_token"] = sres.session.access_token
+                session["supabase_refresh_token"] = sres.session.refresh_token
             except Exception as e:
-                logging.warning(f"Could not set supabase_token in session for {email}: {e}")
-                session.pop("supabase_token", None)
+                logger.warning("Could not set supabase_token in session for %s: %s", email, e)
+                for key in SESSION_KEYS:
+                    session.pop(key, None)
 
             is_admin = False
-            try:
-                ctx = get_supabase_context_from_env()
-                client = ctx.user_client() if ctx else None
-                if client is not None:
-                    admin_check = client.table('admins').select('user_id').eq('user_id', sres.user.id).single().execute()
-                    is_admin = bool(admin_check.data)
-                    logging.info(f"Admin check for {email}: {is_admin}")
-                else:
-                    logging.warning(f"Could not get user client for {email}")
-            except Exception as e:
-                logging.error(f"Error during admin check for {email}: {e}")
-                is_admin = False
+            manager = get_token_manager()
+            token = session.get("supabase_token")
+            if manager is not None and token:
+                # Cached per user id; a miss queries the admins table with the user's token
+                is_admin = manager.is_admin(sres.user.id, token)
+                logger.info("Admin check for %s: %s", email, is_admin)
+            else:
+                logger.warning("Could not check admin membership for %s", email)
 
             if not is_admin:
                 flash('You are not authorized to access admin.', 'danger')
-                logging.warning(f"Unauthorized login attempt for {email}")
+                logger.warning("Unauthorized login attempt for %s", email)
                 return render_template('login.html')
 
             user = User(id=sres.user.id, username=email, role='admin')
             session['user_details'] = {'id': user.id, 'username': user.username, 'role': user.role}
             login_user(user)
-            logging.info(f"User {email} logged in successfully as admin.")
+            logger.info("User %s logged in successfully as admin.", email)
             return redirect('/admin')
         except Exception as e:
-            logging.error(f"Login failed for {email}: {e}")
+            logger.error("Login failed for %s: %s", email, e)
             flash('Invalid email or password', 'danger')
     return render_template('login.html')
 
@@ -68,7 +70,5 @@ def register():
 @auth_bp.route('/logout', methods=['POST'])
 @login_required
 def logout():
-    session.pop("supabase_token", None)
-    session.pop('user_details', None)
-    logout_user()
+    clear_auth_session()
     return redirect('/login')
\ No newline at end of file
@@ -0,0 +1,287 @@
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (value, stored_at) as returned by every backend
+Entry = Tuple[Any, float]
+
+
+class MemoryBackend:
+    """In-process LRU store bounded by entry count."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, stored_at: float) -> None:
+        with self._lock:
+            self._data[key] = (value, stored_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteBackend:
+    """
+    File-backed store shared by every worker on the host, so an admin write
+    in one gunicorn worker invalidates the cached listings for all of them.
+    Values must be JSON-serializable.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self.evictions = 0
+        conn = self._conn()
+        conn.execute(
+            "create table if not exists cache ("
+            " key text primary key, value text not null, stored_at real not null)"
+        )
+        conn.execute("create index if not exists cache_stored_at on cache (stored_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited from the gunicorn master must not be used after the fork
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Entry]:
+        row = self._conn().execute(
+            "select value, stored_at from cache where key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            "insert or replace into cache (key, value, stored_at) values (?, ?, ?)",
+            (key, json.dumps(value, default=str), stored_at),
+        )
+        # Drop the oldest rows once over the bound
+        cur = conn.execute(
+            "delete from cache where key in ("
+            " select key from cache order by stored_at desc limit -1 offset ?)",
+            (self.max_entries,),
+        )
+        if cur.rowcount and cur.rowcount > 0:
+            self.evictions += cur.rowcount
+
+    def delete_prefix(self, prefix: str) -> None:
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self._conn().execute(
+            "delete from cache where key like ? escape '\\'", (escaped + "%",)
+        )
+
+    def clear(self) -> None:
+        self._conn().execute("delete from cache")
+
+
+class RepoCache:
+    """
+    Read-through cache in front of the repositories.
+
+    Entries younger than ``ttl`` are served directly. With stale-while-revalidate
+    enabled, entries younger than ``ttl + stale_ttl`` are still served while a
+    single background thread refreshes them, and a failing loader falls back to
+    the last good value instead of an empty page.
+    """
+
+    def __init__(self, backend: Any, ttl: float = 60.0, stale_ttl: float = 0.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing: set = set()
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale_hits": 0, "refreshes": 0, "load_errors": 0}
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lookup(self, key: str) -> Tuple[Optional[Entry], str]:
+        """The stored entry and whether it is 'fresh', 'stale' (servable) or a 'miss'."""
+        entry = self.backend.get(key)
+        if entry is not None:
+            age = time.time() - entry[1]
+            if age < self.ttl:
+                self._bump("hits")
+                return entry, "fresh"
+            if age < self.ttl + self.stale_ttl:
+                self._bump("stale_hits")
+                return entry, "stale"
+        self._bump("misses")
+        return entry, "miss"
+
+    def _load_failed(self, key: str, entry: Optional[Entry]) -> Any:
+        """Fallback value after a failed load; re-raises when there is none."""
+        self._bump("load_errors")
+        if entry is not None and self.stale_ttl > 0:
+            logger.warning("Loader for %s failed; serving stale value", key, exc_info=True)
+            return entry[0]
+        raise
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling loader on a miss.
+
+        Exceptions from loader propagate unless a stale value can be served.
+        """
+        entry, state = self._lookup(key)
+        if state == "stale":
+            self._refresh_async(key, loader)
+        if state != "miss":
+            return entry[0]  # type: ignore[index]
+        try:
+            value = loader()
+        except Exception:
+            return self._load_failed(key, entry)
+        self.backend.set(key, value, time.time())
+        return value
+
+    async def aget_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """get_or_load for coroutine loaders; stale entries are refreshed in a task on the same loop."""
+        entry, state = self._lookup(key)
+        if state == "stale":
+            self._refresh_task(key, loader)
+        if state != "miss":
+            return entry[0]  # type: ignore[index]
+        try:
+            value = await loader()
+        except Exception:
+            return self._load_failed(key, entry)
+        self.backend.set(key, value, time.time())
+        return value
+
+    def _refresh_async(self, key: str, loader: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run() -> None:
+            try:
+                value = loader()
+                self.backend.set(key, value, time.time())
+                self._bump("refreshes")
+            except Exception:
+                self._bump("load_errors")
+                logger.warning("Background refresh of %s failed", key, exc_info=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"cache-refresh:{key}", daemon=True).start()
+
+    def _refresh_task(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def run() -> None:
+            try:
+                value = await loader()
+                self.backend.set(key, value, time.time())
+                self._bump("refreshes")
+            except Exception:
+                self._bump("load_errors")
+                logger.warning("Background refresh of %s failed", key, exc_info=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(run())
+        # The loop holds tasks weakly; keep this one until it is done
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def invalidate(self, prefix: str) -> None:
+        self.backend.delete_prefix(prefix)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, evictions=getattr(self.backend, "evictions", 0))
+
+
+def build_cache_from_env() -> Optional[RepoCache]:
+    """Build the repo cache from REPO_CACHE_* env vars; None when disabled.
+
+    - REPO_CACHE_BACKEND: 'memory' (default), 'sqlite:///path/to/cache.db' or 'off'
+    - REPO_CACHE_TTL: seconds an entry is fresh (default 60)
+    - REPO_CACHE_STALE_TTL: extra seconds a stale entry may be served (default 300)
+    - REPO_CACHE_MAX_ENTRIES: size bound (default 256)
+    """
+    spec = (os.environ.get("REPO_CACHE_BACKEND") or "memory").strip()
+    if spec.lower() in ("off", "none", "0"):
+        return None
+    ttl = float(os.environ.get("REPO_CACHE_TTL", 60))
+    stale_ttl = float(os.environ.get("REPO_CACHE_STALE_TTL", 300))
+    max_entries = int(os.environ.get("REPO_CACHE_MAX_ENTRIES", 256))
+    if spec.startswith("sqlite:///"):
+        backend: Any = SQLiteBackend(spec[len("sqlite:///"):], max_entries=max_entries)
+    else:
+        backend = MemoryBackend(max_entries=max_entries)
+    return RepoCache(backend, ttl=ttl, stale_ttl=stale_ttl)
+
+
+_repo_cache: Optional[RepoCache] = None
+_repo_cache_built = False
+_build_lock = threading.Lock()
+
+
+def get_repo_cache() -> Optional[RepoCache]:
+    """Process-wide repo cache, built from the environment on first use."""
+    global _repo_cache, _repo_cache_built
+    if not _repo_cache_built:
+        with _build_lock:
+            if not _repo_cache_built:
+                _repo_cache = build_cache_from_env()
+                _repo_cache_built = True
+    return _repo_cache
+
+
+def set_repo_cache(cache: Optional[RepoCache]) -> None:
+    """Replace the process-wide repo cache (tests, config reloads)."""
+    global _repo_cache, _repo_cache_built
+    with _build_lock:
+        _repo_cache = cache
+        _repo_cache_built = True
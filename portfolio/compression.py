@@ -0,0 +1,362 @@
+"""
+Response compression as WSGI middleware around app.wsgi_app.
+
+The encoding is negotiated from Accept-Encoding (brotli, then zstd, then
+gzip, subject to the client's q-values). Only textual content types are
+compressed; responses that already carry a Content-Encoding (the
+precompressed assets), bodies under COMPRESSION_MIN_SIZE, HEAD requests,
+partial content and `Cache-Control: no-transform` pass through untouched.
+
+Buffered responses under COMPRESSION_STREAM_SIZE are compressed in one go
+and keep an exact Content-Length. Larger bodies, and streamed responses
+without a length, are compressed chunk by chunk as they are produced; for
+streamed ones each chunk is flushed so the client gets it straight away.
+
+The level follows the host's CPU load: the 1-minute load average per CPU
+picks one of three tiers in LEVELS, so a busy host spends less time per
+byte. A compressed body is a different representation of the same
+resource, so strong ETags become weak (`W/"..."`), which revalidation
+through make_conditional() still matches, and `Vary: Accept-Encoding` is
+set on every response whose encoding depends on the header.
+"""
+import os
+import time
+import zlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Flask, request
+from werkzeug.http import parse_accept_header
+
+from .metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # optional: br is not offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is not offered without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_STREAM_SIZE = 256 * 1024
+CHUNK_SIZE = 64 * 1024
+ENDPOINT_KEY = "portfolio.endpoint"
+
+# Levels per tier: idle, busy (load >= BUSY_LOAD per CPU), saturated (>= SATURATED_LOAD)
+LEVELS = {"br": (5, 4, 1), "zstd": (6, 3, 1), "gzip": (6, 4, 1)}
+BUSY_LOAD = 0.7
+SATURATED_LOAD = 1.0
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript", "application/json", "application/xml", "application/rss+xml",
+    "application/atom+xml", "application/manifest+json", "application/ld+json", "image/svg+xml",
+}
+# Server-sent events are long-lived and must reach the client unbuffered
+INCOMPRESSIBLE_TYPES = {"text/event-stream"}
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Supported encodings, most preferred first."""
+    return tuple(name for name, module in (("br", brotli), ("zstd", zstandard), ("gzip", zlib)) if module)
+
+
+@lru_cache(maxsize=128)
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The encoding to use for an Accept-Encoding value, or None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    best, best_quality = None, 0.0
+    for name in available_encodings():
+        quality = accepted.quality(name)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compressible(content_type: str) -> bool:
+    mimetype = content_type.split(";", 1)[0].strip().lower()
+    if mimetype in INCOMPRESSIBLE_TYPES:
+        return False
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES or mimetype.endswith(("+json", "+xml"))
+
+
+class _Encoder:
+    """compress() / flush() / finish() over one of the supported codecs."""
+
+    __slots__ = ("_process", "_flush", "_finish")
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == "br":
+            codec = brotli.Compressor(quality=level)
+            self._process, self._flush, self._finish = codec.process, codec.flush, codec.finish
+        elif encoding == "zstd":
+            codec = zstandard.ZstdCompressor(level=level).compressobj()
+            self._process = codec.compress
+            self._flush = lambda: codec.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self._finish = codec.flush
+        else:
+            codec = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self._process = codec.compress
+            self._flush = lambda: codec.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = codec.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._process(data)
+
+    def flush(self) -> bytes:
+        return self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class LoadMonitor:
+    """Load average per CPU, read at most once per interval."""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._cpus = os.cpu_count() or 1
+        self._value = 0.0
+        self._read_at = float("-inf")
+
+    def load(self) -> float:
+        now = time.monotonic()
+        if now - self._read_at >= self.interval:
+            self._read_at = now
+            try:
+                self._value = os.getloadavg()[0] / self._cpus
+            except (AttributeError, OSError):  # not available on this platform
+                self._value = 0.0
+        return self._value
+
+    def tier(self) -> int:
+        load = self.load()
+        return 2 if load >= SATURATED_LOAD else 1 if load >= BUSY_LOAD else 0
+
+
+class CompressionStats:
+    """Process-wide totals for /metrics; per-endpoint figures go to histograms."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.passed_through = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def record(self, endpoint: str, encoding: str, bytes_in: int, bytes_out: int, cpu: float) -> None:
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_seconds += cpu
+        if metrics.enabled:
+            metrics.compression_saved.observe(max(0, bytes_in - bytes_out), endpoint, encoding)
+            metrics.compression_cpu.observe(cpu, endpoint, encoding)
+
+    def skipped(self) -> None:
+        with self._lock:
+            self.passed_through += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "responses": self.compressed,
+                "passed_through": self.passed_through,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "cpu_seconds": round(self.cpu_seconds, 6),
+            }
+
+
+class CompressionMiddleware:
+    """Wraps a WSGI app and compresses eligible responses; see the module docstring."""
+
+    def __init__(self, wsgi_app: Callable[..., Any], min_size: int = DEFAULT_MIN_SIZE,
+                 stream_size: int = DEFAULT_STREAM_SIZE, monitor: Optional[LoadMonitor] = None):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.stream_size = stream_size
+        self.monitor = monitor or LoadMonitor()
+        self.stats = CompressionStats()
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable[..., Any]) -> Iterable[bytes]:
+        encoding = None
+        if environ.get("REQUEST_METHOD") != "HEAD":
+            encoding = negotiate(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        exchange = _Exchange(self, environ, start_response, encoding)
+        app_iter = self.wsgi_app(environ, exchange.start_response)
+        if exchange.encoder_args is None:
+            # Also covers apps that only call start_response while being iterated
+            exchange.locked = True
+            return app_iter
+        return exchange.body(app_iter)
+
+    def plan(self, status: str, headers: List[Tuple[str, str]],
+             encoding: Optional[str]) -> Tuple[bool, Optional[Tuple[str, int]], Optional[int]]:
+        """(varies, (encoding, level) or None, content length) for a response about to start."""
+        code = int(status[:3])
+        if code < 200 or code in (204, 206, 304):
+            return False, None, None
+        content_type = content_length = cache_control = None
+        for name, value in headers:
+            lower = name.lower()
+            if lower == "content-encoding":
+                return False, None, None
+            if lower == "content-type":
+                content_type = value
+            elif lower == "content-length":
+                content_length = int(value) if value.isdigit() else None
+            elif lower == "cache-control":
+                cache_control = value.lower()
+        if not content_type or not compressible(content_type):
+            return False, None, None
+        if content_length is not None and content_length < self.min_size:
+            return False, None, content_length
+        if cache_control and "no-transform" in cache_control:
+            return False, None, content_length
+        if encoding is None:
+            return True, None, content_length
+        return True, (encoding, LEVELS[encoding][self.monitor.tier()]), content_length
+
+
+class _Exchange:
+    """Per-request state between start_response and the body iterator."""
+
+    def __init__(self, middleware: CompressionMiddleware, environ: Dict[str, Any],
+                 start_response: Callable[..., Any], encoding: Optional[str]):
+        self.middleware = middleware
+        self.environ = environ
+        self.server_start = start_response
+        self.encoding = encoding
+        self.locked = False
+        self.status = ""
+        self.headers: List[Tuple[str, str]] = []
+        self.encoder_args: Optional[Tuple[str, int]] = None
+        self.content_length: Optional[int] = None
+        self.encoder: Optional[_Encoder] = None
+        self.server_write: Optional[Callable[[bytes], Any]] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu = 0.0
+
+    def start_response(self, status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> Callable[[bytes], Any]:
+        varies, args, length = self.middleware.plan(status, headers, None if self.locked else self.encoding)
+        if varies:
+            headers = _with_vary(headers)
+        if args is None:
+            self.encoder_args = None
+            if varies or length is not None:
+                self.middleware.stats.skipped()
+            return self.server_start(status, headers, exc_info) if exc_info else self.server_start(status, headers)
+        self.status, self.content_length, self.encoder_args = status, length, args
+        self.headers = _encoded_headers(headers, args[0])
+        return self.write
+
+    def _start(self, content_length: Optional[int] = None) -> None:
+        headers = self.headers
+        if content_length is not None:
+            headers = headers + [("Content-Length", str(content_length))]
+        self.server_write = self.server_start(self.status, headers)
+
+    def _compress(self, data: bytes, flush: bool = False, finish: bool = False) -> bytes:
+        started = time.thread_time()
+        if self.encoder is None:
+            self.encoder = _Encoder(*self.encoder_args)
+        out = self.encoder.compress(data) if data else b""
+        if finish:
+            out += self.encoder.finish()
+        elif flush:
+            out += self.encoder.flush()
+        self.cpu += time.thread_time() - started
+        self.bytes_in += len(data)
+        self.bytes_out += len(out)
+        return out
+
+    def write(self, data: bytes) -> None:
+        # Legacy write() callable: headers go out without a length, each write is flushed
+        if self.server_write is None:
+            self.content_length = None
+            self._start()
+        out = self._compress(data, flush=True)
+        if out:
+            self.server_write(out)
+
+    def body(self, app_iter: Iterable[bytes]) -> Iterator[bytes]:
+        try:
+            if self.server_write is None and self.content_length is not None \
+                    and self.content_length < self.middleware.stream_size:
+                out = self._compress(b"".join(app_iter), finish=True)
+                self._start(len(out))
+                yield out
+                return
+            if self.server_write is None:
+                self._start()
+            streamed = self.content_length is None
+            for chunk in app_iter:
+                for offset in range(0, len(chunk), CHUNK_SIZE):
+                    out = self._compress(chunk[offset:offset + CHUNK_SIZE], flush=streamed)
+                    if out:
+                        yield out
+            out = self._compress(b"", finish=True)
+            if out:
+                yield out
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+            if self.encoder is not None:
+                endpoint = self.environ.get(ENDPOINT_KEY) or "unmatched"
+                self.middleware.stats.record(endpoint, self.encoder_args[0], self.bytes_in, self.bytes_out, self.cpu)
+
+
+def _with_vary(headers: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == "vary":
+            tokens = [token.strip().lower() for token in value.split(",")]
+            if "accept-encoding" in tokens or "*" in tokens:
+                return headers
+            return headers[:index] + [(name, f"{value}, Accept-Encoding")] + headers[index + 1:]
+    return headers + [("Vary", "Accept-Encoding")]
+
+
+def _encoded_headers(headers: List[Tuple[str, str]], encoding: str) -> List[Tuple[str, str]]:
+    result = []
+    for name, value in headers:
+        lower = name.lower()
+        if lower in ("content-length", "accept-ranges", "content-md5"):
+            continue
+        if lower == "etag" and not value.startswith("W/"):
+            value = f"W/{value}"
+        result.append((name, value))
+    result.append(("Content-Encoding", encoding))
+    return result
+
+
+def _remember_endpoint(response: Any) -> Any:
+    request.environ[ENDPOINT_KEY] = request.endpoint or "unmatched"
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """Compress app's responses unless COMPRESSION is off."""
+    if str(app.config.get("COMPRESSION", "on")).lower() in ("off", "false", "0"):
+        return
+    middleware = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=int(app.config.get("COMPRESSION_MIN_SIZE") or DEFAULT_MIN_SIZE),
+        stream_size=int(app.config.get("COMPRESSION_STREAM_SIZE") or DEFAULT_STREAM_SIZE),
+    )
+    app.wsgi_app = middleware
+    app.extensions["compression"] = middleware
+    app.after_request(_remember_endpoint)
+    metrics.register_collector("compression", middleware.stats.snapshot)
@@ -1,13 +1,12 @@
 from flask import render_template
-from portfolio.app import create_app
+from portfolio.routes import bp
 
-app = create_app()
-
-@app.errorhandler(404)
+# On the blueprint, so every app that registers it gets them
+@bp.app_errorhandler(404)
 def not_found_error(error):
     return render_template('error404.html'), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     # In a real app, you'd want to log this error.
-    return render_template('error500.html'), 500
\ No newline at end of file
+    return render_template('error500.html'), 500
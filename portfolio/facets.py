@@ -0,0 +1,222 @@
+import os
+import re
+import logging
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, current_app, has_app_context
+
+from .index_store import PickledIndex, index_source
+
+logger = logging.getLogger(__name__)
+
+# Selections longer than this are cut; each tag is one set intersection
+MAX_SELECTED_TAGS = 10
+# Columns the portfolio page renders, kept per project so filtered pages need no backend read
+ROW_FIELDS = ("id", "title", "description", "github_url", "image_url", "image_variants", "tech_stack", "created_at")
+
+_SPLIT_RE = re.compile(r"[,;|/\n]+")
+TAG_ALIASES = {
+    "js": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "golang": "go",
+    "node": "nodejs",
+    "node.js": "nodejs",
+    "next.js": "nextjs",
+    "react.js": "react",
+    "reactjs": "react",
+    "vue.js": "vue",
+    "postgres": "postgresql",
+    "tailwind": "tailwindcss",
+}
+
+
+def normalize_tag(label: str) -> str:
+    """Canonical tag for one tech name: lowercased, spaces to dashes, common aliases folded."""
+    tag = re.sub(r"\s+", "-", label.strip().lower())
+    return TAG_ALIASES.get(tag, tag)
+
+
+def parse_tech_stack(tech_stack: Optional[str]) -> List[Tuple[str, str]]:
+    """(tag, label) pairs for a free-text tech stack such as 'Python, Flask / JS'; first spelling wins."""
+    seen: Dict[str, str] = {}
+    for label in _SPLIT_RE.split(tech_stack or ""):
+        label = label.strip()
+        if label and normalize_tag(label) not in seen:
+            seen[normalize_tag(label)] = label
+    return list(seen.items())
+
+
+class FacetIndex(PickledIndex):
+    """
+    Tech-stack facets over projects: tag -> ascending project ids.
+
+    Counts are the lengths of those lists, and filters are set
+    intersections (all tags) or unions (any tag) of them. The listing
+    columns of every project are kept alongside, so a filtered page is
+    served from memory.
+    """
+
+    def _reset(self, source: Optional[str]) -> None:
+        super()._reset(source)
+        self.tags: Dict[str, List[Any]] = {}
+        self.labels: Dict[str, str] = {}
+        self.rows: Dict[Any, Dict[str, Any]] = {}
+        self.project_tags: Dict[Any, List[str]] = {}
+
+    def _state(self) -> Dict[str, Any]:
+        return {"tags": self.tags, "labels": self.labels, "rows": self.rows, "project_tags": self.project_tags}
+
+    def _restore(self, state: Dict[str, Any]) -> None:
+        self.tags, self.labels = state["tags"], state["labels"]
+        self.rows, self.project_tags = state["rows"], state["project_tags"]
+
+    # ---------- Writes ----------
+    def _untag(self, project_id: Any) -> None:
+        for tag in self.project_tags.pop(project_id, []):
+            ids = self.tags[tag]
+            i = bisect_left(ids, project_id)
+            if i < len(ids) and ids[i] == project_id:
+                del ids[i]
+            if not ids:
+                del self.tags[tag], self.labels[tag]
+
+    def _set(self, row: Dict[str, Any]) -> None:
+        project_id = row["id"]
+        self._untag(project_id)
+        self.rows[project_id] = {k: row.get(k) for k in ROW_FIELDS}
+        pairs = parse_tech_stack(row.get("tech_stack"))
+        for tag, label in pairs:
+            insort(self.tags.setdefault(tag, []), project_id)
+            self.labels.setdefault(tag, label)
+        self.project_tags[project_id] = [tag for tag, _ in pairs]
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self._write(lambda: self._set(row))
+
+    def update(self, project_id: Any, changes: Dict[str, Any]) -> None:
+        """Apply an edit; changes may be partial."""
+        def apply() -> None:
+            row = self.rows.get(project_id)
+            if row is not None:
+                self._set(dict(row, **{k: v for k, v in changes.items() if k in ROW_FIELDS}))
+        self._write(apply)
+
+    def remove(self, project_id: Any) -> None:
+        def apply() -> None:
+            self._untag(project_id)
+            self.rows.pop(project_id, None)
+        self._write(apply)
+
+    def build(self, source: str, rows: Iterable[Dict[str, Any]]) -> None:
+        """Replace the index with the given projects and save it."""
+        with self._lock:
+            self._reset(source)
+            for row in rows:
+                self._set(row)
+            self.save()
+
+    # ---------- Queries ----------
+    def matching_ids(self, tags: List[str], match_all: bool = True) -> set:
+        postings = sorted((self.tags.get(tag, []) for tag in tags), key=len)
+        if not postings:
+            return set(self.rows)
+        if match_all:
+            # Start from the rarest tag so the working set only shrinks
+            result = set(postings[0])
+            for ids in postings[1:]:
+                if not result:
+                    break
+                result.intersection_update(ids)
+            return result
+        return set().union(*postings)
+
+    def select(self, tags: List[str], match_all: bool = True) -> List[Dict[str, Any]]:
+        """Projects carrying all (or any) of tags, newest first."""
+        with self._lock:
+            ids = self.matching_ids(tags, match_all)
+            return [self.rows[project_id] for project_id in sorted(ids, reverse=True)]
+
+    def counts(self, selected: List[str], match_all: bool = True) -> List[Dict[str, Any]]:
+        """
+        Sidebar facets, most common first. With match_all, counts are the
+        projects left after also adding that tag to the selection; otherwise
+        they are plain tag sizes.
+        """
+        with self._lock:
+            within = self.matching_ids(selected, True) if (selected and match_all) else None
+            facets = []
+            for tag, ids in self.tags.items():
+                count = len(within.intersection(ids)) if within is not None else len(ids)
+                if count or tag in selected:
+                    facets.append({"tag": tag, "label": self.labels[tag], "count": count,
+                                   "selected": tag in selected})
+            facets.sort(key=lambda f: (-f["count"], f["label"].lower()))
+            return facets
+
+    def stats(self) -> Dict[str, float]:
+        return {"projects": len(self.rows), "tags": len(self.tags)}
+
+
+# ---------- App wiring ----------
+def get_facet_index() -> Optional[FacetIndex]:
+    """The current app's facet index, or None outside an app."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("facet_index")
+
+
+def ensure_facets(index: FacetIndex, force: bool = False) -> None:
+    """(Re)build from the project repo when the index is missing or describes another backend."""
+    from .settings import current_settings
+
+    settings = current_settings()
+    source = index_source(settings)
+    index.reload_if_changed()
+    if index.source == source and not force:
+        return
+    repo = settings.project_repo()
+    if repo is None:
+        return
+    logger.info("Building facet index for %s", source)
+    index.build(source, repo.list_projects())
+
+
+def tag_project(row: Optional[Dict[str, Any]]) -> None:
+    """Called by the project repos after a successful create."""
+    index = get_facet_index()
+    if index is not None and row:
+        try:
+            index.add(row)
+        except Exception:
+            logger.exception("Facet index update failed for project %s", row.get("id"))
+
+
+def retag_project(project_id: Any, changes: Dict[str, Any]) -> None:
+    index = get_facet_index()
+    if index is not None:
+        try:
+            index.update(project_id, changes)
+        except Exception:
+            logger.exception("Facet index update failed for project %s", project_id)
+
+
+def untag_project(project_id: Any) -> None:
+    index = get_facet_index()
+    if index is not None:
+        try:
+            index.remove(project_id)
+        except Exception:
+            logger.exception("Facet index removal failed for project %s", project_id)
+
+
+def init_facets(app: Flask) -> None:
+    """Load the persisted facet index (FACET_INDEX_PATH) so workers start warm."""
+    path = app.config.get("FACET_INDEX_PATH") or os.path.join(app.instance_path, "facet_index.pickle")
+    index = FacetIndex(path)
+    index.load()
+    app.extensions["facet_index"] = index
+
+    from .metrics import metrics
+    metrics.register_collector("facets", lambda: (get_facet_index().stats() if get_facet_index() else {}))
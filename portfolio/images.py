@@ -0,0 +1,145 @@
+import os
+import io
+import tempfile
+import logging
+from contextlib import nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any, Dict, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; uploads still work without variants
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_IMAGE_BYTES = 5 * 1024 * 1024
+# Cards render at 230px tall; these cover 1x-3x across phone and desktop layouts
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = ("avif", "webp")
+
+_MIME_BY_FORMAT = {"avif": "image/avif", "webp": "image/webp"}
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload is too large or is not a supported image."""
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Return the image mimetype from magic bytes, ignoring the client's claim."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return None
+
+
+def spool_upload(stream: IO[bytes], max_bytes: int = DEFAULT_MAX_IMAGE_BYTES) -> Tuple[str, int, str]:
+    """
+    Copy an upload stream to a temp file in fixed-size chunks.
+
+    Returns (path, size, mimetype). The caller owns the file and must delete it.
+    """
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".img")
+    size = 0
+    mimetype = None
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if mimetype is None:
+                    mimetype = sniff_image_type(chunk[:16])
+                    if mimetype is None:
+                        raise UploadRejected("File is not a supported image type.")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f"Image exceeds {max_bytes // (1024 * 1024)} MB.")
+                out.write(chunk)
+        if mimetype is None:
+            raise UploadRejected("Uploaded file is empty.")
+        return path, size, mimetype
+    except Exception:
+        os.unlink(path)
+        raise
+
+
+def build_variants(path: str) -> Dict[str, Dict[int, bytes]]:
+    """Encode resized copies of the image at path, per format and width."""
+    if Image is None:
+        return {}
+    variants: Dict[str, Dict[int, bytes]] = {}
+    with Image.open(path) as src:
+        # JPEG can decode straight to a reduced scale, skipping most of the IDCT work
+        src.draft("RGB", (VARIANT_WIDTHS[-1], VARIANT_WIDTHS[-1]))
+        src.load()
+        img = src.convert("RGBA" if src.mode in ("RGBA", "LA", "P") else "RGB")
+    for fmt in VARIANT_FORMATS:
+        for width in VARIANT_WIDTHS:
+            if width > img.width and width != VARIANT_WIDTHS[0]:
+                continue
+            resized = img.copy()
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+            buf = io.BytesIO()
+            try:
+                resized.save(buf, format=fmt.upper(), quality=70 if fmt == "webp" else 55)
+            except (KeyError, OSError):
+                logger.info("Pillow build lacks %s support; skipping", fmt)
+                break
+            variants.setdefault(fmt, {})[width] = buf.getvalue()
+    return variants
+
+
+def srcset(urls: Optional[Dict[Any, str]]) -> str:
+    """Render a {width: url} mapping as an HTML srcset value."""
+    if not urls:
+        return ""
+    return ", ".join(f"{url} {int(width)}w" for width, url in sorted(urls.items(), key=lambda kv: int(kv[0])))
+
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-variants")
+
+
+def schedule_variants(repo: Any, project_id: int, path: str, token: Optional[str]) -> Optional[Future]:
+    """
+    Generate and store variants for a project's image off the request thread.
+    Takes ownership of the temp file at path. The job runs in the calling
+    app's context, so the write reaches that app's caches and indexes.
+    """
+    if Image is None:
+        os.unlink(path)
+        return None
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def run() -> None:
+        with app.app_context() if app is not None else nullcontext():
+            try:
+                variants = build_variants(path)
+                urls: Dict[str, Dict[str, str]] = {}
+                for fmt, by_width in variants.items():
+                    for width, data in by_width.items():
+                        url = repo.upload_image(data, f"{project_id}-{width}.{fmt}", _MIME_BY_FORMAT[fmt],
+                                                token=token)
+                        if url:
+                            urls.setdefault(fmt, {})[str(width)] = url
+                if urls:
+                    repo.update_project(project_id, {"image_variants": urls}, token=token)
+            except Exception:
+                logger.exception("Image variant generation failed for project %s", project_id)
+            finally:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    return _executor.submit(run)
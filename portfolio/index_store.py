@@ -0,0 +1,114 @@
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: concurrent writers may then overwrite each other's saves
+    fcntl = None
+
+
+def index_source(settings: Any) -> str:
+    """Identifies the data an index was built from, so a backend switch triggers a rebuild."""
+    if settings.sqlite is not None:
+        return f"sqlite:{os.path.abspath(settings.sqlite_path)}"
+    return f"supabase:{settings.supabase_url}"
+
+
+class PickledIndex:
+    """
+    Base for in-memory indexes shared by the workers on a host.
+
+    The index is pickled to path after each change (atomic replace, under an
+    fcntl lock so concurrent writers don't lose updates), and every worker
+    reloads it when the file's mtime moves. Subclasses define FORMAT,
+    _reset(), _state() and _restore().
+    """
+
+    FORMAT = 1
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._mtime: Optional[int] = None
+        self._reset(None)
+
+    def _reset(self, source: Optional[str]) -> None:
+        self.source = source
+
+    def _state(self) -> Dict[str, Any]:
+        return {}
+
+    def _restore(self, state: Dict[str, Any]) -> None:
+        pass
+
+    def _after_write(self) -> None:
+        """Housekeeping between a write and its save (compaction and the like)."""
+
+    @property
+    def ready(self) -> bool:
+        return self.source is not None
+
+    def _write(self, apply: Callable[[], Any]) -> None:
+        if not self.ready:
+            return
+        with self._lock, self._file_lock():
+            self.reload_if_changed()
+            apply()
+            self._after_write()
+            self.save()
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Serialise read-modify-save cycles across workers sharing the file."""
+        if not self.path or fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + ".lock", "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        state = dict(self._state(), format=self.FORMAT, source=self.source)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump(state, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def load(self) -> bool:
+        if not self.path:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, "rb") as fh:
+                state = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError, TypeError, AttributeError):
+            return False
+        if not isinstance(state, dict) or state.get("format") != self.FORMAT:
+            return False
+        with self._lock:
+            self._reset(state["source"])
+            self._restore(state)
+            self._mtime = mtime
+        return True
+
+    def reload_if_changed(self) -> None:
+        """Pick up a newer file written by another worker."""
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.load()
@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import random
+import atexit
+import logging
+import threading
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from flask import Flask, Response, current_app, request
+from flask.logging import default_handler
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("portfolio.access")
+
+DEFAULT_QUEUE_SIZE = 10000
+# Records at or above this level are never sampled away
+SAMPLE_BELOW = logging.WARNING
+# Incoming X-Request-ID values are reused only if they look like ids
+MAX_REQUEST_ID_LENGTH = 128
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+# Log call arguments of these types are formatted on the listener thread; anything
+# else (proxies, mutable objects) is formatted before the record leaves the caller.
+_LAZY_ARG_TYPES = (str, int, float, bool, type(None), bytes)
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class _RequestInfo:
+    __slots__ = ("request_id", "method", "path", "started")
+
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+
+
+_current: ContextVar[Optional[_RequestInfo]] = ContextVar("log_request", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request fields and any `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """StreamHandler on whatever sys.stdout is at write time (test runners swap it)."""
+
+    @property
+    def stream(self) -> Any:
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value: Any) -> None:
+        pass
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of the records below WARNING from noisy loggers.
+
+    rates maps logger-name prefixes to the share kept, e.g. {"portfolio.access": 0.1};
+    the longest matching prefix wins. Kept records carry sample_rate so counts
+    can be scaled back up downstream.
+    """
+
+    def __init__(self, rates: Dict[str, float], pipeline: "LogPipeline"):
+        super().__init__()
+        self.rates = rates
+        self.pipeline = pipeline
+        self._by_logger: Dict[str, Optional[float]] = {}
+
+    def _rate(self, name: str) -> Optional[float]:
+        if name not in self._by_logger:
+            matches = [p for p in self.rates if name == p or name.startswith(p + ".")]
+            self._by_logger[name] = self.rates[max(matches, key=len)] if matches else None
+        return self._by_logger[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= SAMPLE_BELOW or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+        self.pipeline.sampled_out += 1
+        return False
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Tags records with the current request and hands them over without formatting or blocking."""
+
+    def __init__(self, log_queue: "queue.Queue[Any]", pipeline: "LogPipeline"):
+        super().__init__(log_queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        info = _current.get()
+        if info is not None:
+            record.request_id = info.request_id
+            record.http_method = info.method
+            record.path = info.path
+            record.elapsed_ms = round((time.perf_counter() - info.started) * 1000, 2)
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if not all(isinstance(v, _LAZY_ARG_TYPES) for v in values):
+                record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline.dropped += 1
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.pipeline.ensure_running()
+        super().emit(record)
+
+
+class _Listener(QueueListener):
+    def __init__(self, log_queue: "queue.Queue[Any]", handler: logging.Handler, pipeline: "LogPipeline"):
+        super().__init__(log_queue, handler, respect_handler_level=True)
+        self.pipeline = pipeline
+        self._reported_drops = 0
+
+    def handle(self, record: logging.LogRecord) -> None:
+        dropped = self.pipeline.dropped
+        if dropped != self._reported_drops:
+            notice = logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": "Log queue full: dropped %d records", "args": (dropped - self._reported_drops,),
+            })
+            self._reported_drops = dropped
+            super().handle(notice)
+        super().handle(record)
+
+    def enqueue_sentinel(self) -> None:
+        try:
+            self.queue.put(self._sentinel, timeout=1)
+        except queue.Full:
+            pass
+
+
+class LogPipeline:
+    """
+    Root logging through a bounded queue: callers only enqueue, and one
+    listener thread per process formats and writes. When the queue is full,
+    records are dropped and counted rather than blocking a request.
+    """
+
+    def __init__(self) -> None:
+        self.dropped = 0
+        self.sampled_out = 0
+        self.queue_size = DEFAULT_QUEUE_SIZE
+        self._queue: "queue.Queue[Any]" = queue.Queue(self.queue_size)
+        self._handler: Optional[_NonBlockingQueueHandler] = None
+        self._output: Optional[logging.Handler] = None
+        self._listener: Optional[_Listener] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._config: Optional[tuple] = None
+
+    def configure(self, level: str = "INFO", fmt: str = "json", queue_size: int = DEFAULT_QUEUE_SIZE,
+                  sample: Optional[Dict[str, float]] = None) -> None:
+        """Route the root logger through the queue; repeated calls with the same settings are no-ops."""
+        config = (level.upper(), fmt, queue_size, tuple(sorted((sample or {}).items())))
+        with self._lock:
+            if config == self._config:
+                return
+            self._stop_locked()
+            self.queue_size = queue_size
+            self._queue = queue.Queue(queue_size)
+            self._output = _StdoutHandler()
+            if fmt == "text":
+                self._output.setFormatter(logging.Formatter(
+                    TEXT_FORMAT, defaults={"request_id": "-"}))
+            else:
+                self._output.setFormatter(JsonFormatter())
+            root = logging.getLogger()
+            # Only our own handler is replaced; file and test capture handlers stay
+            if self._handler is not None:
+                root.removeHandler(self._handler)
+            self._handler = _NonBlockingQueueHandler(self._queue, self)
+            self._handler.addFilter(SamplingFilter(dict(sample or {}), self))
+            root.addHandler(self._handler)
+            root.setLevel(config[0])
+            self._config = config
+            self._start_locked()
+
+    def _start_locked(self) -> None:
+        self._listener = _Listener(self._queue, self._output, self)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def _stop_locked(self) -> None:
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+        self._listener = None
+
+    def ensure_running(self) -> None:
+        """Start a listener in this process; after a fork the parent's thread is gone."""
+        if self._pid == os.getpid() or self._handler is None:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # The inherited queue may hold the parent's records and locks; start clean
+            self._queue = queue.Queue(self.queue_size)
+            self._handler.queue = self._queue
+            self._start_locked()
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener (at exit)."""
+        with self._lock:
+            self._stop_locked()
+
+    def stats(self) -> Dict[str, float]:
+        return {"queue_depth": self._queue.qsize(), "queue_capacity": self.queue_size,
+                "dropped": self.dropped, "sampled_out": self.sampled_out}
+
+
+pipeline = LogPipeline()
+atexit.register(pipeline.stop)
+
+
+def parse_sample(spec: Optional[str]) -> Dict[str, float]:
+    """'werkzeug=0.1,portfolio.access=0.5' -> {'werkzeug': 0.1, 'portfolio.access': 0.5}."""
+    rates = {}
+    for item in (spec or "").split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+def current_request_id() -> Optional[str]:
+    info = _current.get()
+    return info.request_id if info is not None else None
+
+
+# ---------- Flask wiring ----------
+def _incoming_request_id() -> str:
+    value = request.headers.get("X-Request-ID", "")
+    if 0 < len(value) <= MAX_REQUEST_ID_LENGTH and all(c.isalnum() or c in "-_.:" for c in value):
+        return value
+    return uuid.uuid4().hex
+
+
+def _before_request() -> None:
+    _current.set(_RequestInfo(_incoming_request_id(), request.method, request.path))
+
+
+def _after_request(response: Response) -> Response:
+    info = _current.get()
+    if info is None:
+        return response
+    response.headers["X-Request-ID"] = info.request_id
+    if current_app.config.get("ACCESS_LOG", True):
+        access_logger.info("%s %s %s", info.method, info.path, response.status_code, extra={
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - info.started) * 1000, 2),
+            "bytes": response.content_length,
+        })
+    return response
+
+
+def _teardown_request(exc: Optional[BaseException]) -> None:
+    _current.set(None)
+
+
+def init_logging(app: Flask) -> None:
+    """Send all logging through the queue (LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_SAMPLE)."""
+    try:
+        sample = parse_sample(app.config.get("LOG_SAMPLE"))
+        queue_size = int(app.config.get("LOG_QUEUE_SIZE") or DEFAULT_QUEUE_SIZE)
+    except ValueError as exc:
+        raise ValueError(f"Invalid LOG_SAMPLE or LOG_QUEUE_SIZE: {exc}") from exc
+    pipeline.configure(level=app.config.get("LOG_LEVEL") or "INFO",
+                       fmt=str(app.config.get("LOG_FORMAT") or "json").lower(),
+                       queue_size=queue_size, sample=sample)
+    # app.logger's own stderr handler (Flask's default, or the plain StreamHandler
+    # create_app used to add) would print every record a second time
+    for handler in list(app.logger.handlers):
+        if handler is default_handler or type(handler) is logging.StreamHandler:
+            app.logger.removeHandler(handler)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    from .metrics import metrics
+    metrics.register_collector("logging", pipeline.stats)
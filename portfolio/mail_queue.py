@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+from flask import Flask
+from flask_mail import Message as MailMessage
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+create table if not exists outbox (
+  id integer primary key autoincrement,
+  subject text not null,
+  recipients text not null,
+  html text not null,
+  reply_to text,
+  attempts integer not null default 0,
+  next_attempt_at real not null,
+  claimed_until real not null default 0,
+  last_error text,
+  created_at real not null
+);
+create index if not exists outbox_due on outbox (next_attempt_at);
+create table if not exists dead_letter (
+  id integer primary key,
+  subject text not null,
+  recipients text not null,
+  html text not null,
+  reply_to text,
+  attempts integer not null,
+  last_error text,
+  created_at real not null,
+  failed_at real not null
+);
+"""
+
+
+class MailQueue:
+    """
+    Durable SQLite outbox for contact-form notifications.
+
+    Rows are claimed with a lease so several gunicorn workers can drain the
+    same file; a crashed worker's claims simply expire and are retried.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 5, base_delay: float = 30.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited from the gunicorn master must not be used after the fork
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode=wal")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, subject: str, recipients: List[str], html: str, reply_to: Optional[str] = None) -> int:
+        now = time.time()
+        cur = self._conn().execute(
+            "insert into outbox (subject, recipients, html, reply_to, next_attempt_at, created_at)"
+            " values (?, ?, ?, ?, ?, ?)",
+            (subject, json.dumps(recipients), html, reply_to, now, now),
+        )
+        return int(cur.lastrowid)
+
+    def claim(self, batch_size: int, lease: float = 300.0) -> List[sqlite3.Row]:
+        """Lease up to batch_size due messages to the caller."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("begin immediate")
+        try:
+            rows = conn.execute(
+                "select * from outbox where next_attempt_at <= ? and claimed_until < ?"
+                " order by id limit ?",
+                (now, now, batch_size),
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "update outbox set claimed_until = ? where id = ?",
+                    [(now + lease, row["id"]) for row in rows],
+                )
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+        return rows
+
+    def mark_sent(self, message_id: int) -> None:
+        self._conn().execute("delete from outbox where id = ?", (message_id,))
+
+    def mark_failed(self, row: sqlite3.Row, error: str) -> bool:
+        """Schedule a retry with jittered exponential backoff.
+
+        Returns True when the message was moved to the dead-letter table.
+        """
+        attempts = row["attempts"] + 1
+        conn = self._conn()
+        if attempts >= self.max_attempts:
+            conn.execute("begin immediate")
+            conn.execute(
+                "insert or replace into dead_letter"
+                " (id, subject, recipients, html, reply_to, attempts, last_error, created_at, failed_at)"
+                " values (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (row["id"], row["subject"], row["recipients"], row["html"], row["reply_to"],
+                 attempts, error, row["created_at"], time.time()),
+            )
+            conn.execute("delete from outbox where id = ?", (row["id"],))
+            conn.execute("commit")
+            return True
+        delay = self.base_delay * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+        conn.execute(
+            "update outbox set attempts = ?, last_error = ?, next_attempt_at = ?, claimed_until = 0"
+            " where id = ?",
+            (attempts, error, time.time() + delay, row["id"]),
+        )
+        return False
+
+    def depth(self) -> int:
+        return self._conn().execute("select count(*) from outbox").fetchone()[0]
+
+    def dead_count(self) -> int:
+        return self._conn().execute("select count(*) from dead_letter").fetchone()[0]
+
+
+class MailWorker(threading.Thread):
+    """Background thread that drains the outbox over one SMTP connection per batch."""
+
+    def __init__(self, app: Flask, queue: MailQueue, batch_size: int = 20, poll_interval: float = 5.0):
+        super().__init__(name="mail-queue-worker", daemon=True)
+        self.app = app
+        self.queue = queue
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {
+            "sent": 0, "failed": 0, "dead_lettered": 0, "send_seconds_total": 0.0, "last_send_seconds": 0.0,
+        }
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+
+    def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                while self.drain_once():
+                    pass
+            except Exception:
+                logger.exception("Mail queue worker iteration failed")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def drain_once(self) -> int:
+        """Send one claimed batch; returns the number of messages handled."""
+        rows = self.queue.claim(self.batch_size)
+        if not rows:
+            return 0
+        from .utils import mail
+
+        handled = set()
+        with self.app.app_context():
+            try:
+                with mail.connect() as conn:
+                    for row in rows:
+                        self._send_one(conn, row)
+                        handled.add(row["id"])
+            except Exception as e:
+                # Connection or login failure: retry everything not yet handled
+                logger.error("SMTP connection failed: %s", e)
+                for row in rows:
+                    if row["id"] not in handled:
+                        self._record_failure(row, str(e))
+        return len(rows)
+
+    def _send_one(self, conn: Any, row: sqlite3.Row) -> None:
+        msg = MailMessage(row["subject"], recipients=json.loads(row["recipients"]), reply_to=row["reply_to"])
+        msg.html = row["html"]
+        started = time.perf_counter()
+        try:
+            conn.send(msg)
+        except Exception as e:
+            logger.warning("Sending queued mail %s failed: %s", row["id"], e)
+            self._record_failure(row, str(e))
+            return
+        elapsed = time.perf_counter() - started
+        self.queue.mark_sent(row["id"])
+        with self._lock:
+            self.counters["sent"] += 1
+            self.counters["send_seconds_total"] += elapsed
+            self.counters["last_send_seconds"] = elapsed
+
+    def _record_failure(self, row: sqlite3.Row, error: str) -> None:
+        dead = self.queue.mark_failed(row, error)
+        with self._lock:
+            self.counters["failed"] += 1
+            if dead:
+                self.counters["dead_lettered"] += 1
+        if dead:
+            logger.error("Queued mail %s moved to dead letter after %s attempts", row["id"], row["attempts"] + 1)
+
+
+def init_mail_queue(app: Flask) -> None:
+    """Attach the outbox to the app and start draining it, so mail left over from before a restart goes out."""
+    if str(app.config.get("MAIL_QUEUE", "on")).lower() in ("off", "false", "0"):
+        return
+    path = app.config.get("MAIL_QUEUE_PATH") or os.path.join(app.instance_path, "mail_queue.db")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    app.extensions["mail_queue"] = MailQueue(
+        path,
+        max_attempts=int(app.config.get("MAIL_QUEUE_MAX_ATTEMPTS", 5)),
+        base_delay=float(app.config.get("MAIL_QUEUE_RETRY_DELAY", 30)),
+    )
+    get_worker(app)
+
+
+_workers: Dict[int, MailWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(app: Flask) -> Optional[MailWorker]:
+    """Return this process's worker for app, starting it if needed (fork-safe)."""
+    queue = app.extensions.get("mail_queue")
+    if queue is None:
+        return None
+    key = id(app)
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None or not worker.is_alive():
+            worker = MailWorker(app, queue, batch_size=int(app.config.get("MAIL_QUEUE_BATCH_SIZE", 20)))
+            if app.config.get("MAIL_QUEUE_AUTOSTART", True):
+                worker.start()
+            _workers[key] = worker
+        return worker
+
+
+def stop_worker(app: Flask) -> None:
+    """Stop this process's worker for app, e.g. in the gunicorn master before it forks."""
+    with _workers_lock:
+        worker = _workers.pop(id(app), None)
+    if worker is not None:
+        worker.stop()
+
+
+def mail_queue_stats(app: Flask) -> Dict[str, float]:
+    queue = app.extensions.get("mail_queue")
+    if queue is None:
+        return {}
+    worker = _workers.get(id(app))
+    stats: Dict[str, float] = dict(worker.counters) if worker else {}
+    stats["depth"] = queue.depth()
+    stats["dead_letter"] = queue.dead_count()
+    return stats
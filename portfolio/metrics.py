@@ -0,0 +1,393 @@
+import hmac
+import time
+import bisect
+import inspect
+import threading
+import logging
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask, Response, current_app, has_app_context, request, before_render_template, template_rendered
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        with self._lock:
+            return {
+                key: {"count": sum(series[:-1]), "sum": series[-1]}
+                for key, series in self._series.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series = {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            base = _labels(self.labels, label_values)
+            running = 0
+            for bound, count in zip(self.buckets, series):
+                running += count
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound:g}"}} {running}')
+            running += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {running}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {running}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+class RequestTimings:
+    """Time spent per category during one request; feeds Server-Timing."""
+
+    __slots__ = ("started", "repo", "repo_calls", "repo_depth", "supabase", "supabase_calls", "render", "render_stack")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.repo = 0.0
+        self.repo_calls = 0
+        self.repo_depth = 0
+        self.supabase = 0.0
+        self.supabase_calls = 0
+        self.render = 0.0
+        self.render_stack: List[float] = []
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"total;dur={total * 1000:.1f}"]
+        if self.repo_calls:
+            parts.append(f'repo;dur={self.repo * 1000:.1f};desc="{self.repo_calls} calls"')
+        if self.supabase_calls:
+            parts.append(f'supabase;dur={self.supabase * 1000:.1f};desc="{self.supabase_calls} calls"')
+        if self.render:
+            parts.append(f"render;dur={self.render * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class Metrics:
+    """Process-wide histograms plus pluggable gauge collectors."""
+
+    def __init__(self) -> None:
+        # Set once any app turns instrumentation on; used outside an app context
+        self._instrumented = False
+        self.requests = Histogram(
+            "portfolio_http_request_duration_seconds", "Request latency by endpoint.", ("endpoint", "method", "status"))
+        self.repo_calls = Histogram(
+            "portfolio_repo_call_duration_seconds", "Repository method latency.", ("method",))
+        self.supabase_calls = Histogram(
+            "portfolio_supabase_request_duration_seconds", "Supabase HTTP latency by target.", ("method", "target"))
+        self.supabase_per_request = Histogram(
+            "portfolio_supabase_calls_per_request", "Supabase HTTP calls made while serving one request.",
+            ("endpoint",), CALL_COUNT_BUCKETS)
+        self.templates = Histogram(
+            "portfolio_template_render_duration_seconds", "Jinja render time by template.", ("template",))
+        self.compression_saved = Histogram(
+            "portfolio_compression_saved_bytes", "Bytes saved per compressed response.",
+            ("endpoint", "encoding"), BYTE_BUCKETS)
+        self.compression_cpu = Histogram(
+            "portfolio_compression_cpu_seconds", "CPU time spent compressing one response.", ("endpoint", "encoding"))
+        self.supabase_attempts = Histogram(
+            "portfolio_supabase_attempts", "Requests sent per repo call, retries and hedges included.",
+            ("operation",), CALL_COUNT_BUCKETS)
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether to record: the current app's METRICS setting, else whether any app enabled it."""
+        if has_app_context():
+            return bool(current_app.extensions.get("metrics"))
+        return self._instrumented
+
+    @property
+    def histograms(self) -> Tuple[Histogram, ...]:
+        return (self.requests, self.repo_calls, self.supabase_calls, self.supabase_per_request, self.templates,
+                self.compression_saved, self.compression_cpu, self.supabase_attempts)
+
+    def current(self) -> Optional[RequestTimings]:
+        """Timings for the request being served on this thread, if any."""
+        return self._current.get()
+
+    def register_collector(self, prefix: str, fn: Callable[[], Dict[str, float]]) -> None:
+        """Expose fn()'s numeric values as portfolio_<prefix>_<key> gauges."""
+        self._collectors[prefix] = fn
+
+    def reset(self) -> None:
+        for histogram in self.histograms:
+            histogram.reset()
+
+    # ---------- Recording ----------
+    def observe_supabase(self, method: str, target: str, seconds: float) -> None:
+        self.supabase_calls.observe(seconds, method, target)
+        timings = self._current.get()
+        if timings is not None:
+            timings.supabase += seconds
+            timings.supabase_calls += 1
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        for prefix, fn in sorted(self._collectors.items()):
+            try:
+                values = fn() or {}
+            except Exception:
+                logger.exception("Metrics collector %s failed", prefix)
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = f"portfolio_{prefix}_{key}"
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def instrument_repo(cls: type) -> type:
+    """Class decorator: time every public method as '<Class>.<method>'."""
+    for name, fn in list(vars(cls).items()):
+        if name.startswith("_") or not callable(fn):
+            continue
+        setattr(cls, name, _timed(f"{cls.__name__}.{name}", fn))
+    return cls
+
+
+def _timed(label: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    if inspect.iscoroutinefunction(fn):
+        return _timed_async(label, fn)
+    if inspect.isgeneratorfunction(fn):
+        return _timed_generator(label, fn)
+
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not metrics.enabled:
+            return fn(*args, **kwargs)
+        timings = metrics.current()
+        if timings is not None:
+            timings.repo_depth += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.repo_calls.observe(elapsed, label)
+            if timings is not None:
+                timings.repo_depth -= 1
+                if timings.repo_depth == 0:
+                    timings.repo += elapsed
+                    timings.repo_calls += 1
+    return wrapper
+
+
+def _timed_async(label: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    # Async repo calls run side by side, so each one's time is added to the
+    # request's repo total; the sum can exceed the wall-clock time spent.
+    @wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not metrics.enabled:
+            return await fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.repo_calls.observe(elapsed, label)
+            timings = metrics.current()
+            if timings is not None and timings.repo_depth == 0:
+                timings.repo += elapsed
+                timings.repo_calls += 1
+    return wrapper
+
+
+def _timed_generator(label: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    # Row generators are consumed while a template renders; only the time
+    # spent inside the generator (its queries) counts as repo time.
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not metrics.enabled:
+            return (yield from fn(*args, **kwargs))
+        timings = metrics.current()
+        inner = fn(*args, **kwargs)
+        elapsed = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(inner)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield item
+        finally:
+            inner.close()
+            metrics.repo_calls.observe(elapsed, label)
+            if timings is not None and timings.repo_depth == 0:
+                timings.repo += elapsed
+                timings.repo_calls += 1
+    return wrapper
+
+
+# ---------- httpx hooks (attached to pooled Supabase sessions) ----------
+def _on_http_request(req: Any) -> None:
+    if metrics.enabled:
+        req.extensions["metrics_started"] = time.perf_counter()
+
+
+def _on_http_response(resp: Any) -> None:
+    started = resp.request.extensions.get("metrics_started")
+    if started is None:
+        return
+    path = resp.request.url.path
+    if path.startswith("/rest/v1/"):
+        target = path[len("/rest/v1/"):].split("/", 1)[0] or "rest"
+    elif path.startswith("/storage/"):
+        target = "storage"
+    else:
+        target = path.strip("/").split("/", 1)[0] or "other"
+    metrics.observe_supabase(resp.request.method, target, time.perf_counter() - started)
+
+
+async def _on_async_http_request(req: Any) -> None:
+    _on_http_request(req)
+
+
+async def _on_async_http_response(resp: Any) -> None:
+    _on_http_response(resp)
+
+
+def instrument_http_session(session: Any) -> None:
+    """Time every request an httpx client makes; idempotent."""
+    hooks = session.event_hooks
+    if _on_http_request in hooks["request"]:
+        return
+    session.event_hooks = {
+        "request": [*hooks["request"], _on_http_request],
+        "response": [*hooks["response"], _on_http_response],
+    }
+
+
+def instrument_async_http_session(session: Any) -> None:
+    """instrument_http_session for httpx.AsyncClient, whose hooks must be coroutines."""
+    hooks = session.event_hooks
+    if _on_async_http_request in hooks["request"]:
+        return
+    session.event_hooks = {
+        "request": [*hooks["request"], _on_async_http_request],
+        "response": [*hooks["response"], _on_async_http_response],
+    }
+
+
+# ---------- Flask wiring ----------
+def _before_request() -> None:
+    metrics._current.set(RequestTimings())
+
+
+def _after_request(response: Response) -> Response:
+    timings = metrics.current()
+    if timings is None:
+        return response
+    total = time.perf_counter() - timings.started
+    endpoint = request.endpoint or "unmatched"
+    metrics.requests.observe(total, endpoint, request.method, str(response.status_code))
+    metrics.supabase_per_request.observe(timings.supabase_calls, endpoint)
+    if current_app.config.get("SERVER_TIMING", True):
+        response.headers.add("Server-Timing", timings.server_timing(total))
+    return response
+
+
+def _teardown_request(exc: Optional[BaseException]) -> None:
+    metrics._current.set(None)
+
+
+def _on_before_render(sender: Any, template: Any, context: Any, **extra: Any) -> None:
+    timings = metrics.current()
+    if timings is not None:
+        timings.render_stack.append(time.perf_counter())
+
+
+def _on_rendered(sender: Any, template: Any, context: Any, **extra: Any) -> None:
+    timings = metrics.current()
+    if timings is None or not timings.render_stack:
+        return
+    elapsed = time.perf_counter() - timings.render_stack.pop()
+    if not timings.render_stack:
+        timings.render += elapsed
+    metrics.templates.observe(elapsed, template.name or "<string>")
+
+
+def metrics_authorized() -> bool:
+    """Admins (session) or a scraper presenting METRICS_TOKEN as a bearer token."""
+    token = current_app.config.get("METRICS_TOKEN")
+    header = request.headers.get("Authorization", "")
+    if token and header.startswith("Bearer ") and hmac.compare_digest(header[7:], token):
+        return True
+    from flask_login import current_user
+    return bool(current_user.is_authenticated and getattr(current_user, "role", None) == "admin")
+
+
+def metrics_response() -> Response:
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8",
+                    headers={"Cache-Control": "no-store"})
+
+
+def init_metrics(app: Flask) -> None:
+    """Turn instrumentation on for app when METRICS is enabled (the default)."""
+    if str(app.config.get("METRICS", "on")).lower() in ("off", "false", "0"):
+        app.extensions["metrics"] = False
+        return
+    app.extensions["metrics"] = True
+    metrics._instrumented = True
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_rendered, app)
+
+    from .cache import get_repo_cache
+    from .mail_queue import mail_queue_stats
+    from .ratelimit import rate_limit_stats
+    from .supabase_pool import client_stats
+
+    metrics.register_collector("repo_cache", lambda: (get_repo_cache().stats() if get_repo_cache() else {}))
+    metrics.register_collector("supabase_clients", client_stats)
+    metrics.register_collector("mail_queue", lambda: mail_queue_stats(app))
+    metrics.register_collector("ratelimit", rate_limit_stats.snapshot)
@@ -0,0 +1,361 @@
+"""
+Copy projects and blog posts from the SQLite backend into Supabase.
+
+Rows are streamed from SQLite in id order, one batch at a time, and upserted
+on id by a bounded pool of workers, so a rerun never duplicates rows. After
+every batch the checkpoint file records the highest id below which all
+batches are done; an interrupted or failed run resumes from there, and a
+later run copies only rows added since (--restart copies everything again,
+picking up edits). Once the copy finishes, row counts and checksums of both
+sides are compared.
+
+Usage (from the repository root):
+    python -m portfolio.migration [--source instance/portfolio.db] [--tables projects,blog_posts]
+        [--batch-size 500] [--workers 4] [--checkpoint PATH] [--restart] [--verify-only | --no-verify]
+
+Needs SUPABASE_URL, SUPABASE_KEY and SUPABASE_SERVICE_ROLE_KEY (from the
+environment or .env). Ids are kept, so afterwards advance each sequence once:
+    select setval(pg_get_serial_sequence('public.projects', 'id'), (select max(id) from public.projects));
+    select setval(pg_get_serial_sequence('public.blog_posts', 'id'), (select max(id) from public.blog_posts));
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from postgrest.types import ReturnMethod
+
+from .sqlite_repo import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+# Migrated columns per table; updated_at is left to Postgres
+TABLES: Dict[str, Tuple[str, ...]] = {
+    "projects": ("id", "title", "description", "github_url", "image_url", "tech_stack", "image_variants",
+                 "created_at", "created_by"),
+    "blog_posts": ("id", "title", "content", "content_html", "excerpt", "word_count", "reading_minutes",
+                   "render_version", "created_at"),
+}
+JSON_COLUMNS = frozenset({"image_variants"})
+TIMESTAMP_COLUMNS = frozenset({"created_at"})
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_WORKERS = 4
+RETRIES = 3
+# Rows per request when reading the target back for verification
+VERIFY_PAGE_SIZE = 1000
+
+
+class MigrationError(RuntimeError):
+    """A batch kept failing after its retries; the checkpoint marks where to resume."""
+
+
+@dataclass
+class TableReport:
+    table: str
+    rows: int = 0
+    batches: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    resumed_from: int = 0
+    source_count: Optional[int] = None
+    target_count: Optional[int] = None
+    checksums_match: Optional[bool] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def verified(self) -> bool:
+        return self.source_count == self.target_count and bool(self.checksums_match)
+
+
+@dataclass
+class _Batch:
+    seq: int
+    last_id: int
+    rows: List[Dict[str, Any]] = field(repr=False)
+
+
+def _normalize(column: str, value: Any) -> Any:
+    """One representation per value on both sides: PostgREST and SQLite spell timestamps and JSON differently."""
+    if value is None:
+        return None
+    if column in JSON_COLUMNS:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return {}
+        return value
+    if column in TIMESTAMP_COLUMNS and isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc).isoformat(timespec="microseconds")
+    return value
+
+
+def _payload(columns: Sequence[str], row: Dict[str, Any]) -> Dict[str, Any]:
+    return {c: _normalize(c, row.get(c)) for c in columns}
+
+
+def _row_digest(columns: Sequence[str], row: Dict[str, Any]) -> bytes:
+    values = [_normalize(c, row.get(c)) for c in columns]
+    return json.dumps(values, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class Checkpoint:
+    """Per-table resume points in a small JSON file, replaced atomically on every save."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.state: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as fh:
+                    self.state = json.load(fh)
+            except (OSError, ValueError):
+                logger.warning("Ignoring unreadable checkpoint %s", path)
+
+    def last_id(self, table: str) -> int:
+        return int(self.state.get(table, {}).get("last_id", 0))
+
+    def update(self, table: str, **values: Any) -> None:
+        self.state.setdefault(table, {}).update(values)
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(self.state, fh, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.state = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Migrator:
+    """
+    Streams rows out of a SQLiteDatabase and upserts them through a
+    supabase-py client (normally the service-role client).
+    """
+
+    def __init__(self, source: SQLiteDatabase, client: Any, checkpoint: Checkpoint,
+                 batch_size: int = DEFAULT_BATCH_SIZE, workers: int = DEFAULT_WORKERS,
+                 retries: int = RETRIES, backoff: float = 0.5):
+        if batch_size < 1 or workers < 1:
+            raise ValueError("batch_size and workers must be at least 1")
+        self.source = source
+        self.client = client
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+
+    # ---------- Source ----------
+    def _stream(self, table: str, after_id: int) -> Iterator[List[Dict[str, Any]]]:
+        """Keyset-paged reads: each chunk is one indexed range scan, whatever the table size."""
+        columns = ", ".join(TABLES[table])
+        while True:
+            rows = self.source.query(
+                f"select {columns} from {table} where id > ? order by id limit ?", (after_id, self.batch_size))
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1]["id"]
+
+    # ---------- Target ----------
+    def _upsert(self, table: str, batch: _Batch) -> int:
+        """Upsert one batch; returns how many retries it took."""
+        payload = [_payload(TABLES[table], row) for row in batch.rows]
+        for attempt in range(self.retries + 1):
+            try:
+                self.client.table(table).upsert(
+                    payload, on_conflict="id", returning=ReturnMethod.minimal).execute()
+                return attempt
+            except Exception as exc:
+                if attempt == self.retries:
+                    raise MigrationError(f"{table}: batch ending at id {batch.last_id} failed: {exc}") from exc
+                delay = self.backoff * 2 ** attempt
+                logger.warning("%s batch ending at id %s failed (%s); retrying in %.1fs",
+                               table, batch.last_id, exc, delay)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def migrate_table(self, table: str) -> TableReport:
+        resume = self.checkpoint.last_id(table)
+        report = TableReport(table, resumed_from=resume)
+        started = time.perf_counter()
+        # Batches finish out of order; the checkpoint only moves past a batch once
+        # every batch before it is done too.
+        finished: Dict[int, _Batch] = {}
+        next_to_commit = 0
+        in_flight: Dict[Future, _Batch] = {}
+        failure: Optional[BaseException] = None
+
+        def settle(done: Sequence[Future]) -> None:
+            nonlocal next_to_commit, failure
+            for future in done:
+                batch = in_flight.pop(future)
+                if future.exception() is not None:
+                    failure = failure or future.exception()
+                    continue
+                report.retries += future.result()
+                finished[batch.seq] = batch
+            while next_to_commit in finished:
+                batch = finished.pop(next_to_commit)
+                report.rows += len(batch.rows)
+                report.batches += 1
+                next_to_commit += 1
+                self.checkpoint.update(table, last_id=batch.last_id,
+                                       rows=self.checkpoint.state.get(table, {}).get("rows", 0) + len(batch.rows))
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"migrate-{table}") as pool:
+            for seq, rows in enumerate(self._stream(table, resume)):
+                batch = _Batch(seq, rows[-1]["id"], rows)
+                in_flight[pool.submit(self._upsert, table, batch)] = batch
+                # Keep reads at most one round ahead of the writers
+                if len(in_flight) >= self.workers * 2:
+                    settle(wait(in_flight, return_when=FIRST_COMPLETED).done)
+                if failure is not None:
+                    break
+            settle(wait(in_flight).done if in_flight else [])
+        report.seconds = time.perf_counter() - started
+        if failure is not None:
+            raise failure
+        return report
+
+    # ---------- Verification ----------
+    def _source_digest(self, table: str) -> Tuple[int, str]:
+        digest, count = hashlib.sha256(), 0
+        for rows in self._stream(table, 0):
+            for row in rows:
+                digest.update(_row_digest(TABLES[table], row))
+                count += 1
+        return count, digest.hexdigest()
+
+    def _target_digest(self, table: str, first_id: int, last_id: int) -> Tuple[int, str]:
+        """Same digest over the target rows in the source's id range, read back in keyset pages."""
+        columns = TABLES[table]
+        digest, count, after = hashlib.sha256(), 0, first_id - 1
+        while after < last_id:
+            resp = (self.client.table(table).select(",".join(columns))
+                    .gt("id", after).lte("id", last_id).order("id").limit(VERIFY_PAGE_SIZE).execute())
+            rows = resp.data or []
+            if not rows:
+                break
+            for row in rows:
+                digest.update(_row_digest(columns, row))
+                count += 1
+            after = rows[-1]["id"]
+        return count, digest.hexdigest()
+
+    def verify_table(self, table: str, report: Optional[TableReport] = None) -> TableReport:
+        report = report or TableReport(table)
+        bounds = self.source.query_one(f"select min(id) as first, max(id) as last from {table}") or {}
+        report.source_count, source_sum = self._source_digest(table)
+        if not report.source_count:
+            report.target_count, report.checksums_match = 0, True
+            return report
+        report.target_count, target_sum = self._target_digest(table, bounds["first"], bounds["last"])
+        report.checksums_match = source_sum == target_sum
+        return report
+
+    def run(self, tables: Sequence[str], verify: bool = True) -> List[TableReport]:
+        reports = []
+        for table in tables:
+            report = self.migrate_table(table)
+            if verify:
+                self.verify_table(table, report)
+            reports.append(report)
+        return reports
+
+
+def _print(reports: Sequence[TableReport]) -> None:
+    print(f"{'table':<12} {'rows':>8} {'batches':>8} {'retries':>8} {'seconds':>8} {'rows/s':>9}  verification")
+    for r in reports:
+        if r.source_count is None:
+            check = "skipped"
+        elif r.verified:
+            check = f"ok ({r.target_count} rows, checksum match)"
+        else:
+            check = (f"MISMATCH: source {r.source_count} rows, target {r.target_count}, "
+                     f"checksum {'match' if r.checksums_match else 'differs'}")
+        resumed = f" (resumed after id {r.resumed_from})" if r.resumed_from else ""
+        print(f"{r.table:<12} {r.rows:>8} {r.batches:>8} {r.retries:>8} {r.seconds:>8.2f} "
+              f"{r.rows_per_second:>9.0f}  {check}{resumed}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from dotenv import load_dotenv
+    from .supabase_repo import get_supabase_context_from_env
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="SQLite file (default SQLITE_PATH or instance/portfolio.db)")
+    parser.add_argument("--tables", default=",".join(TABLES), help="comma-separated subset of " + ", ".join(TABLES))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per upsert request")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent upsert requests")
+    parser.add_argument("--checkpoint", help="resume file (default next to the source: migration_checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and copy everything again")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--verify-only", action="store_true", help="compare counts and checksums, copy nothing")
+    group.add_argument("--no-verify", action="store_true")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(unknown)}")
+    source_path = args.source or os.environ.get("SQLITE_PATH") or os.path.join("instance", "portfolio.db")
+    if not os.path.exists(source_path):
+        print(f"Source database {source_path} does not exist.")
+        return 2
+    ctx = get_supabase_context_from_env()
+    if ctx is None:
+        print("Supabase env not configured. Set SUPABASE_URL and SUPABASE_KEY.")
+        return 2
+    client = ctx.admin_client()
+    if client is None:
+        print("SUPABASE_SERVICE_ROLE_KEY is required for migration.")
+        return 2
+
+    checkpoint = Checkpoint(args.checkpoint or os.path.join(os.path.dirname(os.path.abspath(source_path)),
+                                                            "migration_checkpoint.json"))
+    if args.restart:
+        checkpoint.clear()
+    migrator = Migrator(SQLiteDatabase(source_path), client, checkpoint,
+                        batch_size=args.batch_size, workers=args.workers)
+    if args.verify_only:
+        reports = [migrator.verify_table(table) for table in tables]
+    else:
+        try:
+            reports = migrator.run(tables, verify=not args.no_verify)
+        except MigrationError as exc:
+            print(f"Migration stopped: {exc}")
+            print(f"Progress is saved in {checkpoint.path}; rerun the same command to resume.")
+            return 1
+    _print(reports)
+    if any(r.source_count is not None and not r.verified for r in reports):
+        return 1
+    if not args.verify_only:
+        print("Ids were preserved; advance the id sequences as shown in `python -m portfolio.migration --help`.")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    raise SystemExit(main())
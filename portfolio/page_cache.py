@@ -0,0 +1,107 @@
+import os
+import time
+import hashlib
+import logging
+from functools import wraps
+from typing import Any, Callable
+
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+
+from .cache import MemoryBackend, get_repo_cache
+
+logger = logging.getLogger(__name__)
+
+PAGE_PREFIX = "page:"
+# Query args that change what a cached view renders (pagination and tag filters)
+PAGE_ARGS = ("cursor", "tech", "match")
+_fallback_backend = MemoryBackend(max_entries=128)
+
+
+def _backend() -> Any:
+    # Share the repo cache backend so a SQLite-backed cache also shares pages
+    # (and their invalidation) across workers.
+    cache = get_repo_cache()
+    return cache.backend if cache is not None else _fallback_backend
+
+
+def _page_ttl() -> float:
+    return float(current_app.config.get("PAGE_CACHE_TTL", os.environ.get("PAGE_CACHE_TTL", 300)))
+
+
+def _enabled() -> bool:
+    value = current_app.config.get("PAGE_CACHE", os.environ.get("PAGE_CACHE", "on"))
+    return str(value).strip().lower() not in ("off", "false", "0")
+
+
+def _bypass() -> bool:
+    """Never serve or store shared pages for admins or pending flash messages."""
+    if request.method not in ("GET", "HEAD"):
+        return True
+    if "_flashes" in session:
+        return True
+    return bool(getattr(current_user, "is_authenticated", False))
+
+
+def _page_key() -> str:
+    # Only the args the cached views read; any other query string would just
+    # evict real entries from the shared LRU
+    args = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)) if k in PAGE_ARGS)
+    return f"{PAGE_PREFIX}{request.path}?{args}"
+
+
+def invalidate_pages() -> None:
+    """Drop every cached page; called from the repo write paths."""
+    try:
+        _backend().delete_prefix(PAGE_PREFIX)
+    except Exception:
+        logger.exception("Failed to invalidate page cache")
+
+
+def _conditional(body: str, mimetype: str, etag: str, stored_at: float) -> Any:
+    resp = make_response(body)
+    resp.mimetype = mimetype
+    resp.set_etag(etag)
+    resp.last_modified = int(stored_at)
+    resp.headers["Cache-Control"] = "public, max-age=0, must-revalidate"
+    resp.vary.add("Cookie")
+    return resp.make_conditional(request)
+
+
+def cached_page(view: Callable) -> Callable:
+    """
+    Cache the rendered body of a public view for anonymous visitors.
+
+    Hits (and conditional GETs answered with 304) skip the view entirely,
+    so neither Supabase nor Jinja is touched. Pages that used the session
+    while rendering (CSRF tokens, flashes) are never stored.
+    """
+
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if g.get("_page_cache_active") or not _enabled() or _bypass():
+            return view(*args, **kwargs)
+
+        key = _page_key()
+        backend = _backend()
+        entry = backend.get(key)
+        if entry is not None:
+            page, stored_at = entry
+            if time.time() - stored_at < _page_ttl():
+                return _conditional(page["body"], page["mimetype"], page["etag"], stored_at)
+
+        g._page_cache_active = True
+        try:
+            resp = make_response(view(*args, **kwargs))
+        finally:
+            g._page_cache_active = False
+
+        if resp.status_code != 200 or resp.is_streamed or session.modified or "csrf_token" in g:
+            return resp
+        body = resp.get_data(as_text=True)
+        etag = hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]
+        stored_at = time.time()
+        backend.set(key, {"body": body, "mimetype": resp.mimetype, "etag": etag}, stored_at)
+        return _conditional(body, resp.mimetype, etag, stored_at)
+
+    return wrapper
@@ -0,0 +1,214 @@
+import os
+import time
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, Optional
+
+from flask import Flask, current_app
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+
+class _Window:
+    __slots__ = ("shared", "pending", "expires_at", "synced_at")
+
+    def __init__(self, expires_at: float):
+        self.shared = 0
+        self.pending = 0
+        self.expires_at = expires_at
+        self.synced_at = 0.0
+
+
+class SQLiteBatchedStorage(Storage):
+    """
+    Fixed-window counters shared by every worker on the host through one
+    SQLite file, e.g. ``sqlite:////srv/app/instance/ratelimit.db``.
+
+    Each worker keeps a local view of every window and only flushes its
+    pending hits when ``batch_size`` accumulate or ``sync_interval`` seconds
+    pass, so most requests never touch the file. The first hit of a window
+    always syncs. Worst-case over-admission is ``workers * batch_size`` per
+    window.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        wrap_exceptions: bool = False,
+        sync_interval: float = 1.0,
+        batch_size: int = 5,
+        **options: Any,
+    ):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = (uri or "sqlite:///ratelimit.db")[len("sqlite:///"):]
+        self.sync_interval = float(sync_interval)
+        self.batch_size = int(batch_size)
+        self._local: Dict[str, _Window] = {}
+        self._lock = threading.Lock()
+        self._thread_conns = threading.local()
+        self._last_prune = time.time()
+        conn = self._conn()
+        conn.execute(
+            "create table if not exists counters ("
+            " key text primary key, count integer not null, expires_at real not null)"
+        )
+
+    @property
+    def base_exceptions(self) -> Any:
+        return sqlite3.Error
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._thread_conns, "conn", None)
+        if conn is None or getattr(self._thread_conns, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._thread_conns.conn = conn
+            self._thread_conns.pid = os.getpid()
+        return conn
+
+    def _sync(self, key: str, window: _Window, now: float) -> None:
+        row = self._conn().execute(
+            "insert into counters (key, count, expires_at) values (:key, :amount, :expires)"
+            " on conflict(key) do update set"
+            "  count = case when counters.expires_at <= :now then excluded.count"
+            "               else counters.count + excluded.count end,"
+            "  expires_at = case when counters.expires_at <= :now then excluded.expires_at"
+            "                    else counters.expires_at end"
+            " returning count, expires_at",
+            {"key": key, "amount": window.pending, "expires": window.expires_at, "now": now},
+        ).fetchone()
+        window.shared, window.expires_at = row[0], row[1]
+        window.pending = 0
+        window.synced_at = now
+        if now - self._last_prune > 60:
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        self._last_prune = now
+        self._conn().execute("delete from counters where expires_at <= ?", (now,))
+        for key in [k for k, w in self._local.items() if w.expires_at <= now]:
+            del self._local[key]
+
+    def _window(self, key: str, expiry: float, now: float) -> _Window:
+        window = self._local.get(key)
+        if window is None or window.expires_at <= now:
+            window = _Window(now + expiry)
+            self._local[key] = window
+        return window
+
+    def incr(self, key: str, expiry: float, amount: int = 1, **_: Any) -> int:
+        now = time.time()
+        with self._lock:
+            window = self._window(key, expiry, now)
+            window.pending += amount
+            if window.pending >= self.batch_size or now - window.synced_at >= self.sync_interval:
+                self._sync(key, window, now)
+            return window.shared + window.pending
+
+    def get(self, key: str) -> int:
+        now = time.time()
+        with self._lock:
+            window = self._local.get(key)
+            if window is None or window.expires_at <= now:
+                row = self._conn().execute(
+                    "select count from counters where key = ? and expires_at > ?", (key, now)
+                ).fetchone()
+                return row[0] if row else 0
+            if now - window.synced_at >= self.sync_interval:
+                self._sync(key, window, now)
+            return window.shared + window.pending
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        with self._lock:
+            window = self._local.get(key)
+            if window is not None and window.expires_at > now:
+                return window.expires_at
+            row = self._conn().execute(
+                "select expires_at from counters where key = ? and expires_at > ?", (key, now)
+            ).fetchone()
+            return row[0] if row else now
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._local.pop(key, None)
+            self._conn().execute("delete from counters where key = ?", (key,))
+
+    def check(self) -> bool:
+        try:
+            self._conn().execute("select 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        with self._lock:
+            self._local.clear()
+            return self._conn().execute("delete from counters").rowcount
+
+
+class RateLimitStats:
+    """Allowed vs. rejected counters for rate-limited requests, per worker."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    def on_breach(self, request_limit: Any) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def after_request(self, response: Any) -> Any:
+        if response.status_code != 429 and limiter.current_limits:
+            with self._lock:
+                self.allowed += 1
+        return response
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"allowed": self.allowed, "rejected": self.rejected}
+
+
+rate_limit_stats = RateLimitStats()
+
+# Storage is configured per app from RATELIMIT_STORAGE_URI in init_rate_limiting()
+limiter = Limiter(
+    get_remote_address,
+    default_limits=["200 per day", "50 per hour"],
+    on_breach=rate_limit_stats.on_breach,
+)
+
+
+def contact_limit() -> str:
+    return current_app.config.get("RATELIMIT_CONTACT", "5 per minute;20 per day")
+
+
+def login_limit() -> str:
+    return current_app.config.get("RATELIMIT_LOGIN", "10 per minute;50 per hour")
+
+
+def init_rate_limiting(app: Flask) -> None:
+    """Point the limiter at a host-wide store and register the stats hook."""
+    uri = os.environ.get("RATELIMIT_STORAGE_URI")
+    if not uri:
+        os.makedirs(app.instance_path, exist_ok=True)
+        uri = "sqlite:///" + os.path.join(app.instance_path, "ratelimit.db")
+    app.config["RATELIMIT_STORAGE_URI"] = uri
+    if uri.startswith("sqlite:"):
+        app.config.setdefault("RATELIMIT_STORAGE_OPTIONS", {
+            "sync_interval": float(os.environ.get("RATELIMIT_SYNC_INTERVAL", 1.0)),
+            "batch_size": int(os.environ.get("RATELIMIT_BATCH_SIZE", 5)),
+        })
+    app.config.setdefault("RATELIMIT_ENABLED", os.environ.get("RATELIMIT_ENABLED", "true").lower() in ("true", "on", "1"))
+    app.config["RATELIMIT_CONTACT"] = os.environ.get("RATELIMIT_CONTACT", "5 per minute;20 per day")
+    app.config["RATELIMIT_LOGIN"] = os.environ.get("RATELIMIT_LOGIN", "10 per minute;50 per hour")
+    limiter.init_app(app)
+    app.after_request(rate_limit_stats.after_request)
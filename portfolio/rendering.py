@@ -0,0 +1,233 @@
+"""
+Blog post rendering, done once when a post is written.
+
+render_post() turns the Markdown source of a post into HTML, with fenced
+code blocks highlighted by Pygments (classes styled by static/highlight.css),
+and derives a plain-text excerpt, a word count and a reading time. The repos
+store these next to `content`, so public views only print stored fields.
+Raw HTML in the source is escaped, as it was when posts were shown as plain
+text, and links and images may only use http(s), mailto or relative URLs.
+
+Each post also stores the RENDER_VERSION it was rendered with. After a
+change to the output, bump it and run `flask render-posts`, which re-renders
+older posts in parallel batches.
+"""
+import re
+import html
+import time
+import logging
+import threading
+import xml.etree.ElementTree as etree
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import click
+import markdown
+from flask import Flask
+from markdown.treeprocessors import Treeprocessor
+
+logger = logging.getLogger(__name__)
+
+# 2: links hidden behind character references are dropped too
+RENDER_VERSION = 2
+EXCERPT_CHARS = 200
+WORDS_PER_MINUTE = 230
+RENDERED_FIELDS = ("content_html", "excerpt", "word_count", "reading_minutes", "render_version")
+DEFAULT_BATCH_SIZE = 100
+
+SAFE_SCHEMES = ("", "http", "https", "mailto")
+# Browsers ignore these inside a URL's scheme, e.g. "java\tscript:"
+_URL_IGNORED = re.compile(r"[\x00-\x20\x7f-\x9f]")
+_SPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+(?:['’-]\w+)*")
+
+
+def _safe_url(value: str) -> bool:
+    """True for relative URLs and http(s) or mailto ones, judged as the browser will read the attribute."""
+    decoded = _URL_IGNORED.sub("", html.unescape(value))
+    try:
+        scheme = urlsplit(decoded).scheme
+    except ValueError:
+        return False
+    return scheme.lower() in SAFE_SCHEMES
+
+
+class _SafeLinks(Treeprocessor):
+    """Drops href/src values with schemes such as javascript: or data:."""
+
+    def run(self, root: etree.Element) -> None:
+        for element in root.iter():
+            for attribute in ("href", "src"):
+                value = element.get(attribute)
+                if value is not None and not _safe_url(value):
+                    element.set(attribute, "#")
+
+
+class _SafeMarkdown(markdown.Extension):
+    def extendMarkdown(self, md: markdown.Markdown) -> None:
+        # Without these, raw HTML blocks and inline tags are escaped like any other text
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        md.treeprocessors.register(_SafeLinks(md), "safe_links", 0)
+
+
+class _TextExtractor(HTMLParser):
+    """Visible text of rendered HTML; code blocks count as words but stay out of the excerpt."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.prose: List[str] = []
+        self.code: List[str] = []
+        self._pre_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        if tag == "pre":
+            self._pre_depth += 1
+        elif tag in ("p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "br", "td", "th", "blockquote"):
+            self.prose.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "pre" and self._pre_depth:
+            self._pre_depth -= 1
+            self.code.append(" ")
+        elif tag in ("p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "td", "th", "blockquote"):
+            self.prose.append(" ")
+
+    def handle_data(self, data: str) -> None:
+        (self.code if self._pre_depth else self.prose).append(data)
+
+
+_local = threading.local()
+
+
+def _markdown() -> markdown.Markdown:
+    # Markdown instances keep per-document state, so each thread has its own
+    md = getattr(_local, "md", None)
+    if md is None:
+        md = _local.md = markdown.Markdown(
+            extensions=["fenced_code", "codehilite", "tables", "sane_lists", _SafeMarkdown()],
+            extension_configs={"codehilite": {"css_class": "highlight", "guess_lang": False}},
+            output_format="html",
+        )
+    return md
+
+
+def excerpt_of(text: str, limit: int = EXCERPT_CHARS) -> str:
+    """Whitespace-collapsed text cut at a word boundary, with an ellipsis when shortened."""
+    text = _SPACE.sub(" ", text).strip()
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0] if " " in text[:limit] else text[:limit]
+    return cut.rstrip(" ,;:.-") + "…"
+
+
+def render_post(content: str) -> Dict[str, Any]:
+    """Rendered fields for a post body: content_html, excerpt, word_count, reading_minutes, render_version."""
+    md = _markdown()
+    try:
+        html = md.convert(content or "")
+    finally:
+        md.reset()
+    text = _TextExtractor()
+    text.feed(html)
+    text.close()
+    prose = "".join(text.prose)
+    words = len(_WORD.findall(prose)) + len(_WORD.findall("".join(text.code)))
+    return {
+        "content_html": html,
+        "excerpt": excerpt_of(prose),
+        "word_count": words,
+        "reading_minutes": max(1, round(words / WORDS_PER_MINUTE)),
+        "render_version": RENDER_VERSION,
+    }
+
+
+def render_batch(rows: Iterable[Tuple[int, str]]) -> List[Dict[str, Any]]:
+    """render_post for (id, content) pairs; runs in the backfill's worker processes."""
+    return [{"id": post_id, **render_post(content)} for post_id, content in rows]
+
+
+# ---------- Backfill ----------
+@dataclass
+class BackfillReport:
+    scanned: int = 0
+    rendered: int = 0
+    failed_batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rendered / self.seconds if self.seconds else 0.0
+
+
+def backfill_posts(repo: Any, batch_size: int = DEFAULT_BATCH_SIZE, workers: Optional[int] = None,
+                   force: bool = False) -> BackfillReport:
+    """
+    Re-render posts older than RENDER_VERSION (every post with force).
+
+    Posts are read in id order, batch_size at a time, via
+    repo.posts_for_render(); worker processes render the batches while the
+    next ones are read, and each result is written back with one
+    repo.save_rendered() call.
+    """
+    report = BackfillReport()
+    started = time.perf_counter()
+    in_flight: Dict[Future, List[Dict[str, Any]]] = {}
+
+    def settle(done: Iterable[Future]) -> None:
+        for future in done:
+            batch = in_flight.pop(future)
+            try:
+                rendered = future.result()
+            except Exception:
+                logger.exception("Rendering posts %s..%s failed", batch[0]["id"], batch[-1]["id"])
+                report.failed_batches += 1
+                continue
+            by_id = {row["id"]: row for row in batch}
+            saved = repo.save_rendered([{**by_id[r["id"]], **r} for r in rendered])
+            if saved:
+                report.rendered += len(rendered)
+            else:
+                report.failed_batches += 1
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        limit = (workers or pool._max_workers) * 2
+        after_id = 0
+        while True:
+            rows = repo.posts_for_render(after_id, batch_size)
+            if not rows:
+                break
+            after_id = rows[-1]["id"]
+            report.scanned += len(rows)
+            stale = [r for r in rows if force or (r.get("render_version") or 0) < RENDER_VERSION]
+            if stale:
+                in_flight[pool.submit(render_batch, [(r["id"], r["content"]) for r in stale])] = stale
+            if len(in_flight) >= limit:
+                settle(wait(in_flight, return_when=FIRST_COMPLETED).done)
+        settle(wait(in_flight).done if in_flight else [])
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def init_rendering(app: Flask) -> None:
+    """Register `flask render-posts`."""
+
+    @app.cli.command("render-posts")
+    @click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True, help="posts per read and write")
+    @click.option("--workers", type=int, default=None, help="render processes (default: one per CPU)")
+    @click.option("--all", "force", is_flag=True, help="re-render posts already at the current version")
+    def render_posts_command(batch_size: int, workers: Optional[int], force: bool) -> None:
+        """Render the Markdown of posts written before the current RENDER_VERSION."""
+        from .settings import current_settings
+
+        repo = current_settings().blog_repo()
+        if repo is None:
+            raise click.ClickException("No blog backend is configured.")
+        report = backfill_posts(repo, batch_size=batch_size, workers=workers, force=force)
+        print(f"Rendered {report.rendered} of {report.scanned} posts in {report.seconds:.1f}s "
+              f"({report.rows_per_second:.0f} posts/s), {report.failed_batches} failed batches.")
+        if report.failed_batches:
+            raise SystemExit(1)
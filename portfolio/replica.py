@@ -0,0 +1,417 @@
+import json
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Flask, has_app_context
+
+from .page_cache import invalidate_pages
+from .resilience import supabase_available
+from .sqlite_repo import SQLiteBlogRepo, SQLiteDatabase, SQLiteProjectRepo
+from .supabase_repo import ITER_BATCH_SIZE, BlogRepo, ProjectRepo, SupabaseContext
+
+logger = logging.getLogger(__name__)
+
+TABLES = ("projects", "blog_posts")
+# Rows fetched per request while catching up
+SYNC_BATCH_SIZE = 1000
+
+STATE_SCHEMA = """
+create table if not exists replica_state (
+  tbl text primary key,
+  source text not null,
+  watermark_column text,
+  watermark text,
+  watermark_id integer,
+  synced_at real
+);
+"""
+
+
+class Replica:
+    """
+    Local copy of the public Supabase tables, kept current by a background thread.
+
+    Each sync pulls rows whose watermark column (updated_at when the table has
+    it, else created_at) sorts after the last (watermark, id) seen, so a sync
+    costs one request per table when nothing changed. Deleted rows are swept
+    every reconcile_every syncs by comparing ids. The watermark is stored in
+    the same file, so a restarted worker resumes where it left off.
+    """
+
+    def __init__(self, db: SQLiteDatabase, ctx: SupabaseContext, interval: float = 30.0,
+                 max_lag: float = 300.0, reconcile_every: int = 10):
+        self.db = db
+        self.ctx = ctx
+        self.interval = interval
+        self.max_lag = max_lag
+        self.reconcile_every = max(1, reconcile_every)
+        self.healthy = True
+        self._syncs = 0
+        self._sync_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._state_ready = False
+        self.counters: Dict[str, float] = {
+            "syncs": 0, "failures": 0, "rows_applied": 0, "rows_deleted": 0, "last_sync_seconds": 0.0,
+        }
+
+    # ---------- State ----------
+    def _conn(self) -> sqlite3.Connection:
+        conn = self.db.connect()
+        if not self._state_ready:
+            conn.executescript(STATE_SCHEMA)
+            self._state_ready = True
+        return conn
+
+    def _state(self) -> Dict[str, Dict[str, Any]]:
+        return {row["tbl"]: dict(row) for row in self._conn().execute("select * from replica_state")}
+
+    def last_success(self) -> Optional[float]:
+        """Unix time of the oldest per-table sync, i.e. how fresh every table is at least."""
+        state = self._state()
+        if any(table not in state or state[table]["synced_at"] is None for table in TABLES):
+            return None
+        return min(state[table]["synced_at"] for table in TABLES)
+
+    def lag(self) -> Optional[float]:
+        """Seconds since the replica last caught up with Supabase; None before the first sync."""
+        synced = self.last_success()
+        return None if synced is None else max(0.0, time.time() - synced)
+
+    def usable(self) -> bool:
+        """Serve reads locally: primed and fresh, or primed and Supabase is failing."""
+        lag = self.lag()
+        return lag is not None and (lag <= self.max_lag or not self.healthy or not supabase_available())
+
+    # ---------- Sync ----------
+    def sync(self) -> int:
+        """Pull changes for every table; returns rows applied. Raises on Supabase errors."""
+        with self._sync_lock:
+            client = self.ctx.read_client()
+            if client is None:
+                raise RuntimeError("Supabase is not configured")
+            started = time.perf_counter()
+            self._reset_if_source_changed()
+            reconcile = self._syncs % self.reconcile_every == 0
+            applied = deleted = 0
+            try:
+                for table in TABLES:
+                    applied += self._pull(client, table)
+                    if reconcile:
+                        deleted += self._sweep(client, table)
+            except Exception:
+                self.healthy = False
+                self.counters["failures"] += 1
+                raise
+            self._syncs += 1
+            self.healthy = True
+            self.counters["syncs"] += 1
+            self.counters["rows_applied"] += applied
+            self.counters["rows_deleted"] += deleted
+            self.counters["last_sync_seconds"] = time.perf_counter() - started
+        if applied or deleted:
+            # Pages rendered from the replica are now out of date
+            invalidate_pages()
+        return applied
+
+    def _reset_if_source_changed(self) -> None:
+        conn = self._conn()
+        stale = conn.execute("select 1 from replica_state where source != ?", (self.ctx.url,)).fetchone()
+        if stale is None:
+            return
+        logger.info("Replica source changed to %s; discarding local copy", self.ctx.url)
+        with conn:
+            conn.execute("begin")
+            for table in TABLES:
+                conn.execute(f"delete from {table}")
+            conn.execute("delete from replica_state")
+
+    def _watermark_column(self, client: Any, table: str, state: Optional[Dict[str, Any]]) -> Optional[str]:
+        if state and state["watermark_column"]:
+            return state["watermark_column"]
+        probe = client.table(table).select("*").limit(1).execute().data or []
+        if not probe:
+            return None
+        return "updated_at" if "updated_at" in probe[0] else "created_at"
+
+    def _pull(self, client: Any, table: str) -> int:
+        state = self._state().get(table)
+        column = self._watermark_column(client, table, state)
+        if column is None:
+            # Empty upstream table: nothing to copy, but the table counts as synced
+            self._save_state(table, None, None, None, synced=True)
+            return 0
+        mark = state["watermark"] if state else None
+        mark_id = state["watermark_id"] if state else None
+        applied = 0
+        while True:
+            query = client.table(table).select("*")
+            if mark is not None:
+                # (column, id) > (mark, mark_id), same logic-tree form as BlogRepo's cursor
+                query.params = query.params.add(
+                    "or", f'({column}.gt."{mark}",and({column}.eq."{mark}",id.gt.{mark_id}))')
+            rows = query.order(column).order("id").limit(SYNC_BATCH_SIZE).execute().data or []
+            if rows:
+                self.apply(table, rows)
+                applied += len(rows)
+                mark, mark_id = rows[-1][column], rows[-1]["id"]
+            caught_up = len(rows) < SYNC_BATCH_SIZE
+            # Checkpoint every batch; the table only counts as synced once caught up
+            self._save_state(table, column, mark, mark_id, synced=caught_up)
+            if caught_up:
+                return applied
+
+    def _sweep(self, client: Any, table: str) -> int:
+        # Page through the upstream ids (responses are capped at PostgREST's
+        # max-rows) and delete local rows missing from each page's id range
+        deleted = 0
+        after: Optional[int] = None
+        conn = self._conn()
+        while True:
+            query = client.table(table).select("id")
+            if after is not None:
+                query = query.gt("id", after)
+            rows = query.order("id").limit(SYNC_BATCH_SIZE).execute().data or []
+            ids = [r["id"] for r in rows]
+            last = len(rows) < SYNC_BATCH_SIZE
+            sql = f"delete from {table} where id not in (select value from json_each(?))"
+            params: List[Any] = [json.dumps(ids)]
+            if after is not None:
+                sql += " and id > ?"
+                params.append(after)
+            if not last:
+                # The last page also covers every id above it
+                sql += " and id <= ?"
+                params.append(ids[-1])
+            with conn:
+                conn.execute("begin")
+                deleted += conn.execute(sql, params).rowcount
+            if last:
+                return deleted
+            after = ids[-1]
+
+    def _save_state(self, table: str, column: Optional[str], mark: Optional[str], mark_id: Optional[int],
+                    synced: bool) -> None:
+        self._conn().execute(
+            "insert into replica_state (tbl, source, watermark_column, watermark, watermark_id, synced_at)"
+            " values (?, ?, ?, ?, ?, ?) on conflict(tbl) do update set source = excluded.source,"
+            " watermark_column = excluded.watermark_column, watermark = excluded.watermark,"
+            " watermark_id = excluded.watermark_id,"
+            " synced_at = coalesce(excluded.synced_at, replica_state.synced_at)",
+            (table, self.ctx.url, column, mark, mark_id, time.time() if synced else None),
+        )
+
+    # ---------- Local writes ----------
+    def _columns(self, table: str) -> List[str]:
+        # table_info omits generated columns
+        return [row["name"] for row in self._conn().execute(f"pragma table_info({table})")]
+
+    def apply(self, table: str, rows: Iterable[Dict[str, Any]]) -> None:
+        """Upsert upstream rows into the local copy."""
+        columns = self._columns(table)
+        names = ", ".join(columns)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "id")
+        sql = f"insert into {table} ({names}) values ({placeholders}) on conflict(id) do update set {updates}"
+
+        def values(row: Dict[str, Any]) -> Tuple[Any, ...]:
+            return tuple(json.dumps(row.get(c)) if isinstance(row.get(c), (dict, list)) else row.get(c)
+                         for c in columns)
+
+        conn = self._conn()
+        with conn:
+            conn.execute("begin")
+            conn.executemany(sql, [values(r) for r in rows if r.get("id") is not None])
+
+    def apply_written(self, table: str, written: Dict[str, Any]) -> None:
+        """Copy a row just written upstream, which may hold only the changed fields, over the local one."""
+        current = self.db.query_one(f"select * from {table} where id = ?", (written["id"],))
+        if current is None and "created_at" not in written:
+            # Only part of a row we don't have; the next sync brings all of it
+            return
+        self.apply(table, [{**(current or {}), **written}])
+
+    def remove(self, table: str, row_id: int) -> None:
+        self._conn().execute(f"delete from {table} where id = ?", (row_id,))
+
+    # ---------- Background thread ----------
+    def ensure_running(self) -> None:
+        """Start this process's sync thread if it is not running (fork-safe)."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def request_sync(self) -> None:
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning("Replica sync failed; serving the local copy if it is primed: %s", e)
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def stats(self) -> Dict[str, float]:
+        stats = dict(self.counters)
+        stats["healthy"] = 1 if self.healthy else 0
+        synced = self.last_success()
+        if synced is not None:
+            stats["last_success_timestamp_seconds"] = synced
+            stats["lag_seconds"] = max(0.0, time.time() - synced)
+        return stats
+
+
+class ReplicatedProjectRepo:
+    """
+    ProjectRepo that reads from the replica while it is usable and writes to
+    Supabase, copying each successful write into the replica straight away.
+    """
+
+    def __init__(self, primary: ProjectRepo, replica: Replica):
+        self.primary = primary
+        self.replica = replica
+        self.local = SQLiteProjectRepo(replica.db, uploads_dir="")
+
+    def _reader(self) -> Any:
+        return self.local if self.replica.usable() else self.primary
+
+    def upload_image(self, *args: Any, **kwargs: Any) -> Optional[str]:
+        return self.primary.upload_image(*args, **kwargs)
+
+    def list_projects(self) -> List[Dict[str, Any]]:
+        return self._reader().list_projects()
+
+    async def alist_projects(self) -> List[Dict[str, Any]]:
+        return await self._reader().alist_projects()
+
+    def list_projects_page(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return self._reader().list_projects_page(cursor, limit)
+
+    def iter_projects(self, batch_size: int = ITER_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        return self._reader().iter_projects(batch_size)
+
+    def get_project(self, project_id: int) -> Optional[Dict[str, Any]]:
+        # Edit forms want the latest row; the replica only answers when Supabase can't
+        row = self.primary.get_project(project_id)
+        if row is None and not self.replica.healthy:
+            row = self.local.get_project(project_id)
+        return row
+
+    def create_project(self, *args: Any, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        created = self.primary.create_project(*args, **kwargs)
+        if created is not None:
+            self.replica.apply("projects", [created])
+        return created
+
+    def update_project(self, project_id: int, fields: Dict[str, Any], token: Optional[str] = None) -> bool:
+        # The primary already ran the write hooks (caches, search, facets); only copy the row
+        written = self.primary.update_project(project_id, fields, token)
+        if written:
+            self.replica.apply_written("projects", written)
+        return bool(written)
+
+    def delete_project(self, project_id: int) -> bool:
+        ok = self.primary.delete_project(project_id)
+        if ok:
+            self.replica.remove("projects", project_id)
+        return ok
+
+
+class ReplicatedBlogRepo:
+    """BlogRepo counterpart of ReplicatedProjectRepo."""
+
+    def __init__(self, primary: BlogRepo, replica: Replica):
+        self.primary = primary
+        self.replica = replica
+        self.local = SQLiteBlogRepo(replica.db)
+
+    def _reader(self) -> Any:
+        return self.local if self.replica.usable() else self.primary
+
+    def list_posts(self) -> List[Dict[str, Any]]:
+        return self._reader().list_posts()
+
+    async def alist_posts(self) -> List[Dict[str, Any]]:
+        return await self._reader().alist_posts()
+
+    def list_posts_page(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return self._reader().list_posts_page(cursor, limit)
+
+    def iter_posts(self, batch_size: int = ITER_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        return self._reader().iter_posts(batch_size)
+
+    def get_post(self, post_id: int) -> Optional[Dict[str, Any]]:
+        return self._reader().get_post(post_id)
+
+    def create_post(self, title: str, content: str) -> Optional[Dict[str, Any]]:
+        created = self.primary.create_post(title, content)
+        if created is not None:
+            self.replica.apply("blog_posts", [created])
+        return created
+
+    def update_post(self, post_id: int, title: str, content: str, token: Optional[str] = None) -> bool:
+        # The primary already rendered the post and ran the write hooks; only copy the row
+        written = self.primary.update_post(post_id, title, content, token)
+        if written:
+            self.replica.apply_written("blog_posts", written)
+        return bool(written)
+
+    def posts_for_render(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        # Re-rendered rows reach the copy through the next sync
+        return self.primary.posts_for_render(after_id, limit)
+
+    def save_rendered(self, rows: List[Dict[str, Any]]) -> bool:
+        return self.primary.save_rendered(rows)
+
+    def delete_post(self, post_id: int) -> bool:
+        ok = self.primary.delete_post(post_id)
+        if ok:
+            self.replica.remove("blog_posts", post_id)
+        return ok
+
+
+def replica_stats() -> Dict[str, float]:
+    """Gauges for the replica of the app serving the current /metrics request."""
+    from .settings import current_settings
+
+    if not has_app_context():
+        return {}
+    replica = current_settings().replica
+    return replica.stats() if replica is not None else {}
+
+
+def init_replica(app: Flask) -> None:
+    """Start the sync thread on first request and expose replica gauges."""
+    from .metrics import metrics
+    from .settings import current_settings
+
+    def start_replica() -> None:
+        replica = current_settings().replica
+        if replica is not None:
+            replica.ensure_running()
+
+    app.before_request(start_replica)
+    metrics.register_collector("replica", replica_stats)
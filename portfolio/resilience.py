@@ -0,0 +1,394 @@
+"""
+Call policy for the Supabase repos: deadlines, a circuit breaker, retries
+and hedged reads.
+
+Every repo query goes through supabase_call() (or asupabase_call() on the
+async clients) with an operation name such as "posts.page":
+
+- Deadline: each call gets SUPABASE_READ_TIMEOUT / SUPABASE_WRITE_TIMEOUT
+  seconds in total. An httpx request hook on the pooled sessions shrinks
+  every request's connect/read/write/pool timeouts to what is left of it and
+  refuses to send once it is spent, so a slow Supabase costs a worker at most
+  the deadline instead of httpx's own minute-long default.
+- Breaker: SUPABASE_BREAKER_THRESHOLD transient failures in a row (timeouts,
+  dropped connections, 5xx and 429 answers) open it, and for
+  SUPABASE_BREAKER_COOLDOWN seconds calls fail at once with CircuitOpenError
+  instead of queueing behind the outage. Then one trial call is let through;
+  it closes the breaker or opens it for another cooldown. 4xx answers (a
+  missing row, an RLS refusal) mean Supabase is up and do not count.
+- Retries: reads are idempotent, so a transient failure is retried up to
+  SUPABASE_READ_RETRIES times after a full-jitter exponential backoff, as
+  long as the deadline leaves room. Writes are tried once.
+- Hedging: with SUPABASE_HEDGE_AFTER set, a read that has not answered after
+  that many seconds is sent a second time and whichever answer comes first is
+  used. It trades a little extra load for a shorter tail, so it is off by
+  default.
+
+The repos still catch every exception and fall back to []/None, so callers
+see no new error types; the cache and the replica serve what they have.
+"""
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from flask import Flask
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_TIMEOUT = 3.0
+DEFAULT_WRITE_TIMEOUT = 10.0
+DEFAULT_READ_RETRIES = 2
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_COOLDOWN = 30.0
+# Full-jitter backoff: sleep uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**retry))
+BACKOFF_BASE = 0.05
+BACKOFF_CAP = 1.0
+HEDGE_WORKERS = 8
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Absolute time.monotonic() by which the current call must finish
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("supabase_deadline", default=None)
+# HTTP status of the last response seen by the current attempt
+_last_status: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("supabase_status", default=None)
+
+
+class CircuitOpenError(RuntimeError):
+    """Supabase calls are failing fast until the breaker's cooldown ends."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call's time budget ran out before a request could be sent."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open trial call."""
+
+    def __init__(self, threshold: int = DEFAULT_BREAKER_THRESHOLD, cooldown: float = DEFAULT_BREAKER_COOLDOWN):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self.opens = 0
+        self.rejections = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; at most one trial at a time once the cooldown is over."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            self.rejections += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Supabase circuit breaker closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.threshold):
+                logger.warning("Supabase circuit breaker opened after %d failures", self._failures)
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial = False
+                self.opens += 1
+
+
+class CallPolicy:
+    """Deadline, retry and hedging settings shared by every repo call in the process."""
+
+    def __init__(self) -> None:
+        self.read_timeout = DEFAULT_READ_TIMEOUT
+        self.write_timeout = DEFAULT_WRITE_TIMEOUT
+        self.read_retries = DEFAULT_READ_RETRIES
+        self.hedge_after: Optional[float] = None
+        self.breaker = CircuitBreaker()
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "failures": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                          "deadline_exceeded": 0}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def configure(self, read_timeout: float = DEFAULT_READ_TIMEOUT, write_timeout: float = DEFAULT_WRITE_TIMEOUT,
+                  read_retries: int = DEFAULT_READ_RETRIES, hedge_after: Optional[float] = None,
+                  breaker_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                  breaker_cooldown: float = DEFAULT_BREAKER_COOLDOWN) -> None:
+        """Apply settings and start with a closed breaker and zeroed counters."""
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.read_retries = max(0, read_retries)
+        self.hedge_after = hedge_after if hedge_after and hedge_after > 0 else None
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        with self._lock:
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    def _bump(self, name: str, by: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += by
+
+    def stats(self) -> Dict[str, float]:
+        breaker = self.breaker
+        with self._lock:
+            counters = dict(self._counters)
+        return dict(counters, breaker_state=_STATE_VALUES[breaker.state], breaker_opens=breaker.opens,
+                    breaker_rejections=breaker.rejections)
+
+    # ---------- Attempts ----------
+    def _settle(self, exc: BaseException, status: Optional[int]) -> bool:
+        """Record exc with the breaker; True when it was transient (worth retrying)."""
+        transient = isinstance(exc, (httpx.TransportError, TimeoutError)) or (
+            status is not None and (status >= 500 or status == 429))
+        if isinstance(exc, (TimeoutError, httpx.TimeoutException)):
+            self._bump("deadline_exceeded")
+        if transient:
+            self._bump("failures")
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return transient
+
+    def _attempt(self, fn: Callable[[], Any]) -> Any:
+        if not self.breaker.allow():
+            raise CircuitOpenError("Supabase circuit breaker is open")
+        holder: List[int] = []
+        token = _last_status.set(holder)
+        try:
+            result = fn()
+        except Exception as exc:
+            exc.transient = self._settle(exc, holder[-1] if holder else None)  # type: ignore[attr-defined]
+            raise
+        finally:
+            _last_status.reset(token)
+        self.breaker.record_success()
+        return result
+
+    def _hedged(self, fn: Callable[[], Any]) -> Any:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(HEDGE_WORKERS, thread_name_prefix="supabase-hedge")
+        # A Context can only be entered by one thread at a time, so each attempt gets a copy
+        first = self._executor.submit(contextvars.copy_context().run, self._attempt, fn)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+        self._bump("hedges")
+        second = self._executor.submit(contextvars.copy_context().run, self._attempt, fn)
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._bump("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error  # type: ignore[misc]
+
+    def _backoff(self, retry: int, deadline: float) -> Optional[float]:
+        """Seconds to wait before retry number `retry`, or None when the deadline leaves no room."""
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** retry))
+        return delay if time.monotonic() + delay < deadline else None
+
+    def _observe(self, operation: str, attempts: int) -> None:
+        self._bump("calls")
+        if attempts > 1:
+            self._bump("retries", attempts - 1)
+        if metrics.enabled:
+            metrics.supabase_attempts.observe(attempts, operation)
+
+    # ---------- Entry points ----------
+    def call(self, operation: str, fn: Callable[[], Any], idempotent: bool = True) -> Any:
+        """Run fn (one Supabase request) under the policy for reads, or for writes when not idempotent."""
+        deadline = time.monotonic() + (self.read_timeout if idempotent else self.write_timeout)
+        token = _deadline.set(deadline)
+        attempts = 0
+        try:
+            while True:
+                attempts += 1
+                try:
+                    if idempotent and self.hedge_after is not None:
+                        return self._hedged(fn)
+                    return self._attempt(fn)
+                except Exception as exc:
+                    delay = None
+                    if idempotent and getattr(exc, "transient", False) and attempts <= self.read_retries:
+                        delay = self._backoff(attempts - 1, deadline)
+                    if delay is None:
+                        raise
+                    logger.debug("Retrying %s in %.3fs after %r", operation, delay, exc)
+                time.sleep(delay)
+        finally:
+            _deadline.reset(token)
+            self._observe(operation, attempts)
+
+    async def acall(self, operation: str, factory: Callable[[], Awaitable[Any]], idempotent: bool = True) -> Any:
+        """call() for coroutines; factory() must start a fresh request each time it is called."""
+        budget = self.read_timeout if idempotent else self.write_timeout
+        deadline = time.monotonic() + budget
+        token = _deadline.set(deadline)
+        attempts = 0
+
+        async def attempt() -> Any:
+            if not self.breaker.allow():
+                raise CircuitOpenError("Supabase circuit breaker is open")
+            holder: List[int] = []
+            _last_status.set(holder)  # tasks run in their own copy of the context
+            try:
+                result = await asyncio.wait_for(factory(), max(0.0, deadline - time.monotonic()))
+            except Exception as exc:
+                exc.transient = self._settle(exc, holder[-1] if holder else None)  # type: ignore[attr-defined]
+                raise
+            self.breaker.record_success()
+            return result
+
+        async def hedged() -> Any:
+            first = asyncio.ensure_future(attempt())
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+            if done:
+                return await first
+            self._bump("hedges")
+            second = asyncio.ensure_future(attempt())
+            pending = {first, second}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        for other in pending:
+                            other.cancel()
+                        if task is second:
+                            self._bump("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error  # type: ignore[misc]
+
+        try:
+            while True:
+                attempts += 1
+                try:
+                    if idempotent and self.hedge_after is not None:
+                        return await hedged()
+                    return await asyncio.ensure_future(attempt())
+                except Exception as exc:
+                    delay = None
+                    if idempotent and getattr(exc, "transient", False) and attempts <= self.read_retries:
+                        delay = self._backoff(attempts - 1, deadline)
+                    if delay is None:
+                        raise
+                    logger.debug("Retrying %s in %.3fs after %r", operation, delay, exc)
+                await asyncio.sleep(delay)
+        finally:
+            _deadline.reset(token)
+            self._observe(operation, attempts)
+
+
+policy = CallPolicy()
+
+
+def supabase_call(operation: str, fn: Callable[[], Any], idempotent: bool = True) -> Any:
+    """Run one Supabase request through the process-wide policy (see the module docstring)."""
+    return policy.call(operation, fn, idempotent)
+
+
+async def asupabase_call(operation: str, factory: Callable[[], Awaitable[Any]], idempotent: bool = True) -> Any:
+    return await policy.acall(operation, factory, idempotent)
+
+
+def supabase_available() -> bool:
+    """False while the breaker is open, i.e. Supabase calls would fail fast."""
+    return policy.breaker.state != OPEN
+
+
+# ---------- httpx hooks (attached to pooled Supabase sessions) ----------
+def _on_request(req: httpx.Request) -> None:
+    deadline = _deadline.get()
+    if deadline is None:
+        return
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded(f"No time left for {req.method} {req.url.path}")
+    timeout = dict(req.extensions.get("timeout") or {})
+    for phase in ("connect", "read", "write", "pool"):
+        current = timeout.get(phase)
+        timeout[phase] = remaining if current is None else min(current, remaining)
+    req.extensions["timeout"] = timeout
+
+
+def _on_response(resp: httpx.Response) -> None:
+    holder = _last_status.get()
+    if holder is not None:
+        holder.append(resp.status_code)
+
+
+async def _on_async_request(req: httpx.Request) -> None:
+    _on_request(req)
+
+
+async def _on_async_response(resp: httpx.Response) -> None:
+    _on_response(resp)
+
+
+def apply_call_policy(session: Any) -> None:
+    """Make an httpx client honour call deadlines and report statuses to the breaker; idempotent."""
+    hooks = session.event_hooks
+    if _on_request in hooks["request"]:
+        return
+    session.event_hooks = {
+        "request": [*hooks["request"], _on_request],
+        "response": [*hooks["response"], _on_response],
+    }
+
+
+def apply_async_call_policy(session: Any) -> None:
+    """apply_call_policy for httpx.AsyncClient, whose hooks must be coroutines."""
+    hooks = session.event_hooks
+    if _on_async_request in hooks["request"]:
+        return
+    session.event_hooks = {
+        "request": [*hooks["request"], _on_async_request],
+        "response": [*hooks["response"], _on_async_response],
+    }
+
+
+def init_resilience(app: Flask) -> None:
+    """Configure the call policy from SUPABASE_* settings and export its state to /metrics."""
+    hedge_after = app.config.get("SUPABASE_HEDGE_AFTER")
+    policy.configure(
+        read_timeout=float(app.config.get("SUPABASE_READ_TIMEOUT") or DEFAULT_READ_TIMEOUT),
+        write_timeout=float(app.config.get("SUPABASE_WRITE_TIMEOUT") or DEFAULT_WRITE_TIMEOUT),
+        read_retries=int(app.config.get("SUPABASE_READ_RETRIES", DEFAULT_READ_RETRIES)),
+        hedge_after=float(hedge_after) if hedge_after else None,
+        breaker_threshold=int(app.config.get("SUPABASE_BREAKER_THRESHOLD") or DEFAULT_BREAKER_THRESHOLD),
+        breaker_cooldown=float(app.config.get("SUPABASE_BREAKER_COOLDOWN") or DEFAULT_BREAKER_COOLDOWN),
+    )
+    metrics.register_collector("supabase_policy", policy.stats)
@@ -1,15 +1,24 @@
 import logging
-from flask import Blueprint, render_template, request, redirect, abort, flash, url_for, current_app
-from flask_login import login_required, current_user
-from flask_limiter import Limiter
-from .utils import send_email
+from flask import Blueprint, render_template, request, redirect, abort, flash, url_for, current_app, send_from_directory
+from flask_login import login_required
+from .utils import queue_email
+from .aio import run_concurrently
+from .page_cache import cached_page
+from .ratelimit import contact_limit, limiter
+from .metrics import metrics, metrics_authorized, metrics_response
+from .images import DEFAULT_MAX_IMAGE_BYTES, UploadRejected, schedule_variants, spool_upload, srcset
 from flask import session
 import os
 from pathlib import Path
 from werkzeug.utils import secure_filename
-from .supabase_repo import get_supabase_context_from_env, ProjectRepo, BlogRepo, get_backend_mode
+from .settings import current_settings
+from .tokens import current_user_is_admin
+from .streaming import DeferredPage, stream_page, streaming_enabled
+from .search import ensure_built, get_search_index
+from .facets import MAX_SELECTED_TAGS, ensure_facets, get_facet_index, normalize_tag
 
 bp = Blueprint('routes', __name__)
+bp.add_app_template_filter(srcset, 'srcset')
 logger = logging.getLogger(__name__)
 
 ALLOWED_TEMPLATES = {
@@ -24,6 +33,7 @@ ALLOWED_TEMPLATES = {
 }
 
 @bp.route("/")
+@cached_page
 def hello_world():
     return render_template('index.html')
 
@@ -31,33 +41,54 @@ def hello_world():
 def test():
     return "Test route is working!"
 
-# Dynamic portfolio page: render projects from DB if available
+# Dynamic portfolio page: render projects from DB if available.
+# ?tech=python&tech=flask keeps projects with every tag; &match=any with either.
 @bp.route('/portfolio.html')
+@cached_page
 def portfolio_page():
-    ctx = get_supabase_context_from_env()
-    projects = []
-    if ctx is not None:
-        projects = ProjectRepo(ctx).list_projects()
-    return render_template('portfolio.html', projects=projects)
+    selected = list(dict.fromkeys(normalize_tag(t) for t in request.args.getlist('tech') if t.strip()))
+    selected = selected[:MAX_SELECTED_TAGS]
+    match_all = request.args.get('match') != 'any'
+    facets = get_facet_index()
+    if facets is not None:
+        ensure_facets(facets)
+    if selected and facets is not None and facets.ready:
+        projects = facets.select(selected, match_all)
+    else:
+        repo = current_settings().project_repo()
+        projects = repo.list_projects() if repo is not None else []
+    facet_counts = facets.counts(selected, match_all) if facets is not None else []
+    return render_template('portfolio.html', projects=projects, facets=facet_counts,
+                           selected=selected, match=('all' if match_all else 'any'))
 
 # Admin dashboard overview: lists projects and blog posts in tables
 @bp.route('/admin')
 @login_required
 def admin_dashboard():
-    if current_user.role != 'admin':
+    if not current_user_is_admin():
         abort(403)
-    ctx = get_supabase_context_from_env()
-    projects = ProjectRepo(ctx).list_projects() if ctx is not None else []
-    posts = BlogRepo(ctx).list_posts() if ctx is not None else []
-    return render_template('admin_dashboard.html', projects=projects, posts=posts, is_admin=True)
+    settings = current_settings()
+    project_repo, blog_repo = settings.project_repo(), settings.blog_repo()
+    if streaming_enabled():
+        # Rows are read in batches while the page streams
+        projects = project_repo.iter_projects() if project_repo is not None else []
+        posts = blog_repo.iter_posts() if blog_repo is not None else []
+    else:
+        # Both listings load at once on the I/O loop
+        projects, posts = run_concurrently(
+            project_repo.alist_projects() if project_repo is not None else None,
+            blog_repo.alist_posts() if blog_repo is not None else None,
+        )
+        projects, posts = projects or [], posts or []
+    return stream_page('admin_dashboard.html', projects=projects, posts=posts, is_admin=True)
 
 # Projects manager (GET list/form, POST create)
 @bp.route('/admin/projects', methods=['GET', 'POST'])
 @login_required
 def admin_projects():
-    if current_user.role != 'admin':
+    if not current_user_is_admin():
         abort(403)
-    ctx = get_supabase_context_from_env()
+    repo = current_settings().project_repo()
     if request.method == 'POST':
         title = request.form.get('title')
         description = request.form.get('description')
@@ -70,15 +101,21 @@ def admin_projects():
         if not session.get('supabase_token'):
             flash('Admin token missing. Please log out and log in again to continue.', 'warning')
             return redirect(url_for('auth.login'))
-        if uploaded and uploaded.filename and ctx is not None:
+        spooled_path = None
+        if uploaded and uploaded.filename and repo is not None:
             filename = secure_filename(uploaded.filename)
-            image_public_url = ProjectRepo(ctx).upload_image(
-                uploaded.stream.read(), filename, uploaded.mimetype or 'image/jpeg'
-            )
+            try:
+                spooled_path, _, mimetype = spool_upload(
+                    uploaded.stream, current_app.config.get('MAX_IMAGE_BYTES', DEFAULT_MAX_IMAGE_BYTES)
+                )
+            except UploadRejected as e:
+                flash(str(e), 'danger')
+                return redirect(url_for('routes.admin_projects'))
+            image_public_url = repo.upload_image(spooled_path, filename, mimetype)
             if image_public_url:
                 image_url = image_public_url
-        if ctx is not None:
-            created = ProjectRepo(ctx).create_project(
+        if repo is not None:
+            created = repo.create_project(
                 title=title,
                 description=description,
                 github_url=github_url,
@@ -86,19 +123,50 @@ def admin_projects():
                 tech_stack=tech_stack,
             )
             if created is None:
-                flash('Failed to create project in Supabase', 'danger')
+                flash('Failed to create project', 'danger')
+            elif spooled_path:
+                # Resized variants are built and attached in the background
+                schedule_variants(repo, created['id'], spooled_path, session.get('supabase_token'))
+                spooled_path = None
+            if spooled_path:
+                os.unlink(spooled_path)
         else:
             flash('Supabase is not configured; cannot create project in supabase mode.', 'danger')
         return redirect(url_for('routes.admin_projects'))
 
-    projects = ProjectRepo(ctx).list_projects() if ctx is not None else []
-    return render_template('admin_projects.html', projects=projects, is_admin=True)
+    cursor = request.args.get('cursor')
+    projects = DeferredPage(lambda: repo.list_projects_page(cursor) if repo is not None else ([], None))
+    return stream_page('admin_projects.html', projects=projects, is_admin=True)
+
+@bp.app_errorhandler(413)
+def upload_too_large(error):
+    # Only the admin project form takes file uploads; elsewhere it is a plain 413
+    if request.endpoint != 'routes.admin_projects':
+        return error
+    flash('Upload is too large.', 'danger')
+    return redirect(url_for('routes.admin_projects'))
+
+# Prometheus scrape target: admins, or METRICS_TOKEN as a bearer token
+@bp.route('/metrics')
+@limiter.exempt
+def metrics_endpoint():
+    if not metrics.enabled:
+        abort(404)
+    if not metrics_authorized():
+        abort(403)
+    return metrics_response()
+
+# Images stored by the sqlite backend; Supabase serves its own from Storage
+@bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    # Upload keys are unique, so the files never change
+    return send_from_directory(os.path.abspath(current_settings().uploads_dir), filename, max_age=31536000)
 
 # Back-compat: keep /dashboard but redirect to the new projects manager
 @bp.route('/dashboard')
 @login_required
 def dashboard():
-    if current_user.role != 'admin':
+    if not current_user_is_admin():
         abort(403)
     return redirect(url_for('routes.admin_projects'))
 
@@ -106,9 +174,9 @@ def dashboard():
 @bp.route('/edit_project/<int:project_id>', methods=['GET', 'POST'])
 @login_required
 def edit_project(project_id):
-    if current_user.role != 'admin':
+    if not current_user_is_admin():
         abort(403)
-    ctx = get_supabase_context_from_env()
+    repo = current_settings().project_repo()
     if request.method == 'POST':
         fields = {
             'title': request.form.get('title'),
@@ -117,10 +185,10 @@ def edit_project(project_id):
             'image_url': request.form.get('image_url'),
             'tech_stack': request.form.get('tech_stack'),
         }
-        if ctx is not None:
-            ok = ProjectRepo(ctx).update_project(project_id, fields)
+        if repo is not None:
+            ok = repo.update_project(project_id, fields)
             if not ok:
-                flash('Failed to update project in Supabase', 'danger')
+                flash('Failed to update project', 'danger')
         else:
             flash('Supabase is not configured; cannot update project in supabase mode.', 'danger')
         # Optional redirect back to provided 'next'
@@ -130,7 +198,7 @@ def edit_project(project_id):
         return redirect(url_for('routes.admin_projects'))
 
     # GET
-    project = ProjectRepo(ctx).get_project(project_id) if ctx is not None else None
+    project = repo.get_project(project_id) if repo is not None else None
     if not project:
         abort(404)
     return render_template('edit_project.html', project=project)
@@ -139,18 +207,19 @@ def edit_project(project_id):
 @bp.route('/delete_project/<int:project_id>', methods=['POST'])
 @login_required
 def delete_project(project_id):
-    if current_user.role != 'admin':
+    if not current_user_is_admin():
         abort(403)
-    ctx = get_supabase_context_from_env()
-    if ctx is not None:
-        ok = ProjectRepo(ctx).delete_project(project_id)
+    repo = current_settings().project_repo()
+    if repo is not None:
+        ok = repo.delete_project(project_id)
         if not ok:
-            flash('Failed to delete project in Supabase', 'danger')
+            flash('Failed to delete project', 'danger')
     else:
         flash('Supabase is not configured; cannot delete project in supabase mode.', 'danger')
     return redirect(url_for('routes.admin_projects'))
 
 @bp.route("/<string:page_name>")
+@cached_page
 def html_page(page_name: str):
     template = ALLOWED_TEMPLATES.get(page_name)
     if not template:
@@ -160,12 +229,13 @@ def html_page(page_name: str):
     return render_template(template)
 
 @bp.route("/submited_form", methods=['POST', 'GET'])
+@limiter.limit(contact_limit, methods=['POST'])
 def submited_form():
     if request.method == 'POST':
         data = request.form.to_dict()
         
-        # Get mail recipient from environment variables
-        mail_recipient = os.environ.get('MAIL_RECIPIENT')
+        # Get mail recipient from the app settings
+        mail_recipient = current_settings().mail_recipient
         
         # If the recipient is not configured, log an error and return
         if not mail_recipient:
@@ -176,8 +246,8 @@ def submited_form():
             return redirect(url_for('routes.html_page', page_name='contact.html'))
 
         try:
-            # Send email notification using the new template
-            send_email(
+            # Queue the notification; delivery happens off the request thread
+            queue_email(
                 subject=f"New Inquiry from {data.get('user_name', 'a visitor')}: {data.get('subject', '')}",
                 recipients=[mail_recipient],
                 template='email_template.html',
@@ -186,7 +256,7 @@ def submited_form():
                 message=data.get('text')
             )
         except Exception:
-            logging.exception("An error occurred while sending the email.")
+            logging.exception("An error occurred while queueing the email.")
             return "Unexpected error", 500
         return redirect('/thank_you.html')
     else:
@@ -194,27 +264,42 @@ def submited_form():
 
 # Public blog listing
 @bp.route('/blogs')
+@cached_page
 def blogs():
-    ctx = get_supabase_context_from_env()
-    posts = BlogRepo(ctx).list_posts() if ctx is not None else []
-    return render_template('blogs.html', posts=posts)
+    repo = current_settings().blog_repo()
+    cursor = request.args.get('cursor')
+    posts = DeferredPage(lambda: repo.list_posts_page(cursor) if repo is not None else ([], None))
+    return stream_page('blogs.html', posts=posts)
 
 # Public blog detail
 @bp.route('/blogs/<int:post_id>')
+@cached_page
 def blog_detail(post_id: int):
-    ctx = get_supabase_context_from_env()
-    post = BlogRepo(ctx).get_post(post_id) if ctx is not None else None
+    repo = current_settings().blog_repo()
+    post = repo.get_post(post_id) if repo is not None else None
     if not post:
         abort(404)
     return render_template('blog_detail.html', post=post)
 
+# Public search over posts and projects; answered from the in-memory index
+@bp.route('/search')
+def search():
+    q = request.args.get('q', '').strip()[:200]
+    kind = request.args.get('type') if request.args.get('type') in ('post', 'project') else None
+    index = get_search_index()
+    results = []
+    if q and index is not None:
+        ensure_built(index)
+        results = index.search(q, limit=20, kind=kind)
+    return render_template('search.html', q=q, results=results)
+
 # Admin: blogs manager (GET list/form, POST create)
 @bp.route('/admin/blogs', methods=['GET', 'POST'])
 @login_required
 def admin_blogs():
-    if current_user.role != 'admin':
+    if not current_user_is_admin():
         abort(403)
-    ctx = get_supabase_context_from_env()
+    repo = current_settings().blog_repo()
     if request.method == 'POST':
         title = request.form.get('title')
         content = request.form.get('content')
@@ -224,32 +309,60 @@ def admin_blogs():
         if not session.get('supabase_token'):
             flash('Admin token missing. Please log out and log in again to continue.', 'warning')
             return redirect(url_for('auth.login'))
-        if ctx is not None:
-            ok = BlogRepo(ctx).create_post(title.strip(), content.strip()) is not None
+        if repo is not None:
+            ok = repo.create_post(title.strip(), content.strip()) is not None
             if ok:
                 flash('Blog post created', 'success')
             else:
-                flash('Failed to create blog post in Supabase', 'danger')
+                flash('Failed to create blog post', 'danger')
         else:
             flash('Supabase is not configured; cannot create blog post in supabase mode.', 'danger')
         return redirect(url_for('routes.admin_blogs'))
 
-    posts = BlogRepo(ctx).list_posts() if ctx is not None else []
-    return render_template('admin_blogs.html', posts=posts, is_admin=True)
+    cursor = request.args.get('cursor')
+    posts = DeferredPage(lambda: repo.list_posts_page(cursor) if repo is not None else ([], None))
+    return stream_page('admin_blogs.html', posts=posts, is_admin=True)
+
+# Admin: edit blog post; the body is re-rendered on save
+@bp.route('/admin/blogs/<int:post_id>/edit', methods=['GET', 'POST'])
+@login_required
+def edit_blog(post_id: int):
+    if not current_user_is_admin():
+        abort(403)
+    repo = current_settings().blog_repo()
+    if request.method == 'POST':
+        title = request.form.get('title')
+        content = request.form.get('content')
+        if not title or not content:
+            flash('Title and content are required', 'danger')
+            return redirect(url_for('routes.edit_blog', post_id=post_id))
+        if not session.get('supabase_token'):
+            flash('Admin token missing. Please log out and log in again to continue.', 'warning')
+            return redirect(url_for('auth.login'))
+        if repo is not None and repo.update_post(post_id, title.strip(), content.strip()):
+            flash('Blog post updated', 'success')
+        else:
+            flash('Failed to update blog post', 'danger')
+        return redirect(url_for('routes.admin_blogs'))
+
+    post = repo.get_post(post_id) if repo is not None else None
+    if not post:
+        abort(404)
+    return render_template('edit_blog.html', post=post)
 
 # Admin: delete blog post
 @bp.route('/admin/blogs/<int:post_id>/delete', methods=['POST'])
 @login_required
 def delete_blog(post_id: int):
-    if current_user.role != 'admin':
+    if not current_user_is_admin():
         abort(403)
-    ctx = get_supabase_context_from_env()
-    if ctx is not None:
-        ok = BlogRepo(ctx).delete_post(post_id)
+    repo = current_settings().blog_repo()
+    if repo is not None:
+        ok = repo.delete_post(post_id)
         if ok:
             flash('Blog post deleted', 'success')
         else:
-            flash('Failed to delete blog post in Supabase', 'danger')
+            flash('Failed to delete blog post', 'danger')
     else:
         flash('Supabase is not configured; cannot delete blog post in supabase mode.', 'danger')
     next_url = request.args.get('next') or request.form.get('next')
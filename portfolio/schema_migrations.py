@@ -0,0 +1,246 @@
+"""
+Apply the numbered SQL files in migrations/ to Supabase, each exactly once.
+
+Files are named NNNN_description.sql and applied in version order. The
+public.schema_migrations ledger records each applied file's checksum, SQL
+and server-side duration. Every pending file runs as a single execute_sql
+call: PostgREST wraps each RPC in one transaction, so the file and its
+ledger row commit or roll back together. When nothing is pending, a run
+makes one request, a read of the ledger.
+
+Usage (from the repository root):
+    python -m portfolio.schema_migrations [--dir migrations] [--dry-run | --diff] [--target VERSION]
+
+--dry-run lists what would be applied. --diff also shows, for applied files
+edited since, a unified diff against the SQL that actually ran. Neither
+writes anything, not even the ledger table. Edited applied files stop the
+run: add a new migration instead.
+
+Needs SUPABASE_URL, SUPABASE_KEY and SUPABASE_SERVICE_ROLE_KEY, plus this
+function, created once in the Supabase SQL editor:
+
+    create or replace function public.execute_sql(sql text) returns void
+    language plpgsql security definer set search_path = public as $$
+    begin execute sql; end $$;
+    revoke execute on function public.execute_sql(text) from public, anon, authenticated;
+"""
+import os
+import re
+import time
+import difflib
+import hashlib
+import logging
+import argparse
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from postgrest.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+LEDGER_TABLE = "schema_migrations"
+LEDGER_DDL = f"""
+create table if not exists public.{LEDGER_TABLE} (
+  version integer primary key,
+  name text not null,
+  checksum text not null,
+  sql text not null,
+  duration_ms integer,
+  applied_at timestamptz not null default now()
+);
+alter table public.{LEDGER_TABLE} enable row level security;
+"""
+# PostgREST's answer when the ledger table does not exist yet (old and new error codes)
+_MISSING_TABLE_CODES = ("42P01", "PGRST205")
+_FILE_RE = re.compile(r"^(\d+)_([A-Za-z0-9_-]+)\.sql$")
+
+
+class SchemaError(RuntimeError):
+    """The migrations directory or the ledger is inconsistent, or a migration failed."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: str = field(repr=False)
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.replace("\r\n", "\n").encode("utf-8")).hexdigest()
+
+    @property
+    def label(self) -> str:
+        return f"{self.version:04d}_{self.name}"
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Migration files in version order; other files in the directory are ignored."""
+    migrations: Dict[int, Migration] = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILE_RE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise SchemaError(f"Two migrations share version {version}: "
+                              f"{migrations[version].label}.sql and {filename}")
+        with open(os.path.join(directory, filename), encoding="utf-8") as fh:
+            migrations[version] = Migration(version, match.group(2), fh.read())
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def _dollar_quote(text: str) -> str:
+    tag = "$m$"
+    n = 0
+    while tag in text:
+        n += 1
+        tag = f"$m{n}$"
+    return f"{tag}{text}{tag}"
+
+
+class RpcExecutor:
+    """Runs SQL through the execute_sql() function; each call is its own transaction."""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def ledger(self, with_sql: bool = False, create: bool = True) -> Dict[int, Dict[str, Any]]:
+        """Ledger rows by version; a missing ledger is empty, and created unless create is False."""
+        columns = "version,name,checksum,duration_ms,applied_at" + (",sql" if with_sql else "")
+        try:
+            resp = self.client.table(LEDGER_TABLE).select(columns).order("version").execute()
+        except APIError as exc:
+            if exc.code not in _MISSING_TABLE_CODES:
+                raise
+            if not create:
+                return {}
+            logger.info("Creating the %s ledger", LEDGER_TABLE)
+            self.client.rpc("execute_sql", {"sql": LEDGER_DDL}).execute()
+            return {}
+        return {row["version"]: row for row in resp.data or []}
+
+    def apply(self, migration: Migration) -> None:
+        # now() is the transaction start, so this is the server-side time of the file itself
+        record = (
+            f"\n;\ninsert into public.{LEDGER_TABLE} (version, name, checksum, sql, duration_ms) values "
+            f"({migration.version}, {_dollar_quote(migration.name)}, '{migration.checksum}', "
+            f"{_dollar_quote(migration.sql)}, (extract(epoch from clock_timestamp() - now()) * 1000)::integer);"
+        )
+        self.client.rpc("execute_sql", {"sql": migration.sql + record}).execute()
+
+
+@dataclass
+class Plan:
+    applied: List[Migration] = field(default_factory=list)
+    pending: List[Migration] = field(default_factory=list)
+    # Applied, but the file has been edited since: (migration, ledger row)
+    changed: List[Any] = field(default_factory=list)
+    # In the ledger, but no file on disk
+    missing: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def plan(migrations: Sequence[Migration], ledger: Dict[int, Dict[str, Any]],
+         target: Optional[int] = None) -> Plan:
+    result = Plan()
+    on_disk = {m.version for m in migrations}
+    for migration in migrations:
+        row = ledger.get(migration.version)
+        if row is None:
+            if target is None or migration.version <= target:
+                result.pending.append(migration)
+        elif row["checksum"] != migration.checksum:
+            result.changed.append((migration, row))
+        else:
+            result.applied.append(migration)
+    result.missing = [row for version, row in sorted(ledger.items()) if version not in on_disk]
+    if result.pending and ledger and result.pending[0].version < max(ledger):
+        logger.warning("Migration %s is older than the newest applied one (%04d); applying it anyway",
+                       result.pending[0].label, max(ledger))
+    return result
+
+
+def apply_pending(executor: Any, migrations: Sequence[Migration],
+                  target: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Apply pending migrations in order, stopping at the first failure. Returns
+    one {migration, seconds} entry per applied file.
+    """
+    todo = plan(migrations, executor.ledger(), target)
+    if todo.changed:
+        names = ", ".join(m.label for m, _ in todo.changed)
+        raise SchemaError(f"Applied migrations were edited afterwards ({names}); "
+                          "revert them and add a new migration instead (see --diff)")
+    results = []
+    for migration in todo.pending:
+        started = time.perf_counter()
+        try:
+            executor.apply(migration)
+        except Exception as exc:
+            raise SchemaError(f"{migration.label} failed and was rolled back: {exc}") from exc
+        results.append({"migration": migration, "seconds": time.perf_counter() - started})
+    return results
+
+
+def _diff(todo: Plan) -> None:
+    for migration in todo.pending:
+        print(f"pending  {migration.label}")
+    for migration, row in todo.changed:
+        print(f"CHANGED  {migration.label} (applied {row.get('applied_at')})")
+        print("".join(difflib.unified_diff(
+            row.get("sql", "").splitlines(keepends=True), migration.sql.splitlines(keepends=True),
+            fromfile=f"{migration.label} (applied)", tofile=f"{migration.label}.sql")))
+    for row in todo.missing:
+        print(f"MISSING  {row['version']:04d}_{row['name']}: applied {row.get('applied_at')}, no file on disk")
+    if not (todo.pending or todo.changed or todo.missing):
+        print(f"Up to date: {len(todo.applied)} migrations applied.")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from dotenv import load_dotenv
+    from .supabase_repo import get_supabase_context_from_env
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=MIGRATIONS_DIR, help="directory of NNNN_name.sql files")
+    parser.add_argument("--target", type=int, help="apply pending migrations up to this version only")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--dry-run", action="store_true", help="list pending migrations, apply nothing")
+    group.add_argument("--diff", action="store_true", help="compare the files with the ledger, apply nothing")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    ctx = get_supabase_context_from_env()
+    client = ctx.admin_client() if ctx is not None else None
+    if client is None:
+        print("SUPABASE_URL, SUPABASE_KEY and SUPABASE_SERVICE_ROLE_KEY must be set.")
+        return 2
+    executor = RpcExecutor(client)
+    started = time.perf_counter()
+    try:
+        migrations = discover(args.dir)
+        if args.diff or args.dry_run:
+            todo = plan(migrations, executor.ledger(with_sql=args.diff, create=False), args.target)
+            if args.diff:
+                _diff(todo)
+            else:
+                for migration in todo.pending:
+                    print(f"would apply {migration.label} ({len(migration.sql)} bytes, {migration.checksum[:12]})")
+                if not todo.pending:
+                    print("Nothing to apply.")
+            return 1 if (todo.changed or todo.missing) else 0
+        results = apply_pending(executor, migrations, args.target)
+    except SchemaError as exc:
+        print(f"Error: {exc}")
+        return 1
+    for result in results:
+        print(f"applied {result['migration'].label} in {result['seconds'] * 1000:.0f} ms")
+    if not results:
+        print(f"Nothing to apply ({len(migrations)} migrations up to date).")
+    print(f"Done in {(time.perf_counter() - started) * 1000:.0f} ms.")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    raise SystemExit(main())
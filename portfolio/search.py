@@ -0,0 +1,509 @@
+import os
+import re
+import math
+import heapq
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, current_app, has_app_context
+
+from .index_store import PickledIndex, index_source
+
+logger = logging.getLogger(__name__)
+
+K1 = 1.2
+B = 0.75
+# Title terms count this many times (a cheap BM25F-style field boost)
+TITLE_WEIGHT = 3
+# Document norms are refreshed when the average length drifts this much
+NORM_DRIFT = 0.1
+# Compact postings once this share of indexed documents is deleted
+COMPACT_RATIO = 0.2
+# Impact lists keep each term's best postings only; a document outside the lists of
+# all query terms is not a candidate. The usual bounded-latency trade-off.
+SCAN_DEPTH = 1000
+# Terms in more documents than this get their impact list precomputed and saved
+HOT_DF = 256
+# Candidates rescored exactly per query: max(limit * RESCORE_FACTOR, RESCORE_MIN)
+RESCORE_FACTOR = 10
+RESCORE_MIN = 200
+MAX_IMPACT_LISTS = 1024
+SNIPPET_CHARS = 200
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\+\+|#)?")
+
+
+# ---------- Porter stemmer ----------
+def _is_consonant(word: str, i: int) -> bool:
+    ch = word[i]
+    if ch in "aeiou":
+        return False
+    if ch == "y":
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Number of vowel-consonant sequences in stem (Porter's m)."""
+    m, previous_vowel = 0, False
+    for i in range(len(stem)):
+        vowel = not _is_consonant(stem, i)
+        if previous_vowel and not vowel:
+            m += 1
+        previous_vowel = vowel
+    return m
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _double_consonant(word: str) -> bool:
+    return len(word) >= 2 and word[-1] == word[-2] and _is_consonant(word, len(word) - 1)
+
+
+def _cvc(word: str) -> bool:
+    return (len(word) >= 3 and _is_consonant(word, len(word) - 3) and not _is_consonant(word, len(word) - 2)
+            and _is_consonant(word, len(word) - 1) and word[-1] not in "wxy")
+
+
+_STEP2 = (
+    ("ational", "ate"), ("tional", "tion"), ("enci", "ence"), ("anci", "ance"), ("izer", "ize"),
+    ("abli", "able"), ("alli", "al"), ("entli", "ent"), ("eli", "e"), ("ousli", "ous"), ("ization", "ize"),
+    ("ation", "ate"), ("ator", "ate"), ("alism", "al"), ("iveness", "ive"), ("fulness", "ful"),
+    ("ousness", "ous"), ("aliti", "al"), ("iviti", "ive"), ("biliti", "ble"),
+)
+_STEP3 = (("icate", "ic"), ("ative", ""), ("alize", "al"), ("iciti", "ic"), ("ical", "ic"), ("ful", ""), ("ness", ""))
+_STEP4 = ("al", "ance", "ence", "er", "ic", "able", "ible", "ant", "ement", "ment", "ent", "ion", "ou", "ism",
+          "ate", "iti", "ous", "ive", "ize")
+
+
+def _replace(word: str, rules: Iterable[Tuple[str, str]], min_measure: int) -> str:
+    for suffix, replacement in rules:
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            return stem + replacement if _measure(stem) > min_measure else word
+    return word
+
+
+def stem(word: str) -> str:
+    """Porter (1980) stemmer: 'indexing', 'indexed' and 'indexes' all become 'index'."""
+    if len(word) <= 2 or not word.isalpha():
+        return word
+    # Step 1a
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    # Step 1b
+    if word.endswith("eed"):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                elif _double_consonant(word) and word[-1] not in "lsz":
+                    word = word[:-1]
+                elif _measure(word) == 1 and _cvc(word):
+                    word += "e"
+                break
+    # Step 1c
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+    word = _replace(word, _STEP2, 0)
+    word = _replace(word, _STEP3, 0)
+    # Step 4
+    for suffix in _STEP4:
+        if word.endswith(suffix):
+            stem_ = word[:-len(suffix)]
+            if _measure(stem_) > 1 and (suffix != "ion" or stem_.endswith(("s", "t"))):
+                word = stem_
+            break
+    # Step 5
+    if word.endswith("e"):
+        stem_ = word[:-1]
+        if _measure(stem_) > 1 or (_measure(stem_) == 1 and not _cvc(stem_)):
+            word = stem_
+    if _measure(word) > 1 and _double_consonant(word) and word.endswith("l"):
+        word = word[:-1]
+    return word
+
+
+_stem_memo: Dict[str, str] = {}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, split, drop stopwords and stem. 'c++' and 'c#' survive as tokens."""
+    out = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        stemmed = _stem_memo.get(token)
+        if stemmed is None:
+            stemmed = stem(token)
+            if len(_stem_memo) < 200_000:
+                _stem_memo[token] = stemmed
+        out.append(stemmed)
+    return out
+
+
+def _snippet(text: Optional[str]) -> str:
+    text = " ".join((text or "").split())
+    return text[:SNIPPET_CHARS] + "…" if len(text) > SNIPPET_CHARS else text
+
+
+def post_document(row: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str]:
+    """(title, stored fields, body) for a blog_posts row."""
+    return row.get("title") or "", {
+        "kind": "post", "id": row["id"], "title": row.get("title") or "",
+        "snippet": row.get("excerpt") or _snippet(row.get("content")), "created_at": row.get("created_at"),
+    }, row.get("content") or ""
+
+
+def project_document(row: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str]:
+    """(title, stored fields, body) for a projects row; the fields are kept whole for re-indexing on update."""
+    fields = {
+        "kind": "project", "id": row["id"], "title": row.get("title") or "",
+        "description": row.get("description") or "", "tech_stack": row.get("tech_stack") or "",
+        "github_url": row.get("github_url") or "", "created_at": row.get("created_at"),
+    }
+    fields["snippet"] = _snippet(fields["description"])
+    return fields["title"], fields, f"{fields['description']} {fields['tech_stack']}"
+
+
+class SearchIndex(PickledIndex):
+    """
+    In-memory inverted index over blog posts and projects with BM25 ranking.
+
+    Postings are per-term arrays of document numbers (ascending) and term
+    frequencies, so 50k documents fit in tens of MB and lookups are bisects.
+    Queries only read each term's SCAN_DEPTH best postings by BM25 impact,
+    so common terms do not cost a pass over every posting; the impact lists
+    of frequent terms are precomputed and saved with the index.
+
+    Deletes tombstone the document and are compacted in bulk. Persistence
+    and cross-worker reloads come from PickledIndex.
+    """
+
+    def _reset(self, source: Optional[str]) -> None:
+        super()._reset(source)
+        self.docs: List[Optional[Dict[str, Any]]] = []
+        self.keys: Dict[str, int] = {}
+        self.doc_ids: Dict[str, array] = {}
+        self.freqs: Dict[str, array] = {}
+        self.lengths = array("I")
+        self.live = 0
+        self.dead = 0
+        self.total_length = 0
+        self._norms: List[float] = []
+        self._norm_avgdl = 0.0
+        # term -> (docnos, negated weights ascending), i.e. best posting first
+        self._hot: Dict[str, Tuple[array, array]] = {}
+        self._impacts: "OrderedDict[str, Tuple[array, array]]" = OrderedDict()
+
+    # ---------- Writes ----------
+    @staticmethod
+    def _term_counts(title: str, body: str) -> Counter:
+        counts = Counter(tokenize(body))
+        for term in tokenize(title):
+            counts[term] += TITLE_WEIGHT
+        return counts
+
+    def _append_doc(self, key: str, fields: Dict[str, Any], counts: Counter) -> int:
+        docno = len(self.docs)
+        self.docs.append(fields)
+        self.keys[key] = docno
+        length = sum(counts.values())
+        self.lengths.append(length)
+        self.total_length += length
+        self.live += 1
+        if self._norms:
+            self._norms.append(K1 * (1 - B + B * length / self._norm_avgdl))
+        return docno
+
+    def _add(self, key: str, title: str, fields: Dict[str, Any], body: str) -> None:
+        if key in self.keys:
+            self._remove(key)
+        counts = self._term_counts(title, body)
+        docno = self._append_doc(key, fields, counts)
+        for term, tf in counts.items():
+            ids = self.doc_ids.get(term)
+            if ids is None:
+                ids = self.doc_ids[term] = array("I")
+                self.freqs[term] = array("H")
+            ids.append(docno)
+            self.freqs[term].append(min(tf, 65535))
+            impacts = self._hot.get(term) or self._impacts.get(term)
+            if impacts is not None:
+                self._insert_impact(impacts, docno, tf)
+
+    def _remove(self, key: str) -> bool:
+        docno = self.keys.pop(key, None)
+        if docno is None:
+            return False
+        self.docs[docno] = None
+        self.total_length -= self.lengths[docno]
+        self.live -= 1
+        self.dead += 1
+        # Postings keep the tombstoned docno until the next compaction
+        return True
+
+    def _compact(self) -> None:
+        alive = [doc is not None for doc in self.docs]
+        for term in list(self.doc_ids):
+            ids, freqs = self.doc_ids[term], self.freqs[term]
+            keep = [i for i, docno in enumerate(ids) if alive[docno]]
+            if not keep:
+                del self.doc_ids[term], self.freqs[term]
+            elif len(keep) != len(ids):
+                self.doc_ids[term] = array("I", (ids[i] for i in keep))
+                self.freqs[term] = array("H", (freqs[i] for i in keep))
+        self.dead = 0
+        self._prepare_impacts(force=True)
+
+    def add(self, kind: str, row: Dict[str, Any]) -> None:
+        title, fields, body = (post_document if kind == "post" else project_document)(row)
+        self._write(lambda: self._add(f"{kind}:{row['id']}", title, fields, body))
+
+    def remove(self, kind: str, doc_id: Any) -> None:
+        self._write(lambda: self._remove(f"{kind}:{doc_id}"))
+
+    def update_project(self, project_id: Any, changes: Dict[str, Any]) -> None:
+        """Re-index a project after an edit; changes may be partial."""
+        def apply() -> None:
+            docno = self.keys.get(f"project:{project_id}")
+            if docno is None or not any(k in changes for k in ("title", "description", "tech_stack")):
+                return
+            row = dict(self.docs[docno] or {}, **{k: v for k, v in changes.items() if v is not None})
+            title, fields, body = project_document(row)
+            self._add(f"project:{project_id}", title, fields, body)
+        self._write(apply)
+
+    def build(self, source: str, projects: Iterable[Dict[str, Any]], posts: Iterable[Dict[str, Any]]) -> None:
+        """Replace the index with the given rows and save it."""
+        documents = [("project", project_document, projects), ("post", post_document, posts)]
+        with self._lock:
+            self._reset(source)
+            # Collect postings in lists and convert once; appending to arrays per term is slower
+            ids: Dict[str, List[int]] = {}
+            freqs: Dict[str, List[int]] = {}
+            for kind, make, rows in documents:
+                for row in rows:
+                    key = f"{kind}:{row['id']}"
+                    if key in self.keys:
+                        continue
+                    title, fields, body = make(row)
+                    counts = self._term_counts(title, body)
+                    docno = self._append_doc(key, fields, counts)
+                    for term, tf in counts.items():
+                        if term in ids:
+                            ids[term].append(docno)
+                            freqs[term].append(tf)
+                        else:
+                            ids[term] = [docno]
+                            freqs[term] = [tf]
+            self.doc_ids = {term: array("I", postings) for term, postings in ids.items()}
+            self.freqs = {term: array("H", [min(tf, 65535) for tf in tfs]) for term, tfs in freqs.items()}
+            self._prepare_impacts(force=True)
+            self.save()
+
+    def _after_write(self) -> None:
+        if self.dead > COMPACT_RATIO * max(len(self.docs), 1):
+            self._compact()
+        else:
+            self._prepare_impacts()
+
+    # ---------- Persistence ----------
+    _FIELDS = ("docs", "keys", "doc_ids", "freqs", "lengths", "live", "dead", "total_length")
+
+    def _state(self) -> Dict[str, Any]:
+        state = {name: getattr(self, name) for name in self._FIELDS}
+        return dict(state, norm_avgdl=self._norm_avgdl, hot=self._hot)
+
+    def _restore(self, state: Dict[str, Any]) -> None:
+        for name in self._FIELDS:
+            setattr(self, name, state[name])
+        self._norm_avgdl, self._hot = state["norm_avgdl"], state["hot"]
+        self._norms = [K1 * (1 - B + B * length / self._norm_avgdl) for length in self.lengths]
+
+    # ---------- Queries ----------
+    def _prepare_impacts(self, force: bool = False) -> None:
+        """
+        Recompute document norms and the impact lists of frequent terms when the
+        average document length has drifted. Runs on build and on writes, never
+        on queries, and the result is saved with the index so workers load it warm.
+        """
+        avgdl = self.total_length / self.live if self.live else 1.0
+        if not force and self._norms and abs(avgdl - self._norm_avgdl) <= NORM_DRIFT * avgdl:
+            return
+        self._norm_avgdl = avgdl
+        # K1 * (1 - B + B * |d| / avgdl): the per-document part of BM25's denominator
+        self._norms = [K1 * (1 - B + B * length / avgdl) for length in self.lengths]
+        self._impacts.clear()
+        self._hot = {term: self._compute_impacts(term) for term, ids in self.doc_ids.items() if len(ids) > HOT_DF}
+
+    def _compute_impacts(self, term: str) -> Tuple[array, array]:
+        norms, ids, freqs = self._norms, self.doc_ids[term], self.freqs[term]
+        weights = [-tf * (K1 + 1) / (tf + norms[docno]) for docno, tf in zip(ids, freqs)]
+        if len(weights) > SCAN_DEPTH:
+            order = heapq.nsmallest(SCAN_DEPTH, range(len(weights)), key=weights.__getitem__)
+        else:
+            order = sorted(range(len(weights)), key=weights.__getitem__)
+        return array("I", [ids[i] for i in order]), array("d", [weights[i] for i in order])
+
+    def _insert_impact(self, impacts: Tuple[array, array], docno: int, tf: int) -> None:
+        ids, weights = impacts
+        weight = -tf * (K1 + 1) / (tf + self._norms[docno])
+        position = bisect_right(weights, weight)
+        if position < SCAN_DEPTH:
+            ids.insert(position, docno)
+            weights.insert(position, weight)
+            if len(ids) > SCAN_DEPTH:
+                ids.pop()
+                weights.pop()
+
+    def _impact_list(self, term: str) -> Tuple[array, array]:
+        """The SCAN_DEPTH best postings of term as (docnos, negated weights), best first."""
+        cached = self._hot.get(term) or self._impacts.get(term)
+        if cached is not None:
+            return cached
+        cached = self._impacts[term] = self._compute_impacts(term)
+        if len(self._impacts) > MAX_IMPACT_LISTS:
+            self._impacts.popitem(last=False)
+        return cached
+
+    def search(self, query: str, limit: int = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top `limit` documents for query by BM25, each with a 'score'."""
+        with self._lock:
+            terms = [t for t in dict.fromkeys(tokenize(query)) if t in self.doc_ids]
+            if not terms or limit <= 0:
+                return []
+            if len(self._norms) != len(self.docs):
+                self._prepare_impacts(force=True)
+            n = max(self.live, 1)
+            norms, docs = self._norms, self.docs
+            lists, postings = [], []
+            for term in terms:
+                ids, freqs = self.doc_ids[term], self.freqs[term]
+                df = len(ids)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                lists.append((idf, *self._impact_list(term)))
+                postings.append((idf * (K1 + 1), ids, freqs, len(ids)))
+
+            # Impact-ordered scoring: sum each term's contribution over its truncated
+            # impact list, then rescore the best partial candidates exactly, since a
+            # document may have been cut from the list of one of its terms.
+            partial: Dict[int, float] = {}
+            get = partial.get
+            for idf, ids, weights in lists:
+                for docno, weight in zip(ids, weights):
+                    partial[docno] = get(docno, 0.0) - idf * weight
+            candidates = heapq.nlargest(max(limit * RESCORE_FACTOR, RESCORE_MIN), partial.items(),
+                                        key=lambda item: item[1])
+            heap: List[Tuple[float, int]] = []
+            for docno, _ in candidates:
+                doc = docs[docno]
+                if doc is None or (kind and doc["kind"] != kind):
+                    continue
+                score = 0.0
+                for scale, term_ids, term_freqs, size in postings:
+                    i = bisect_left(term_ids, docno)
+                    if i < size and term_ids[i] == docno:
+                        tf = term_freqs[i]
+                        score += scale * tf / (tf + norms[docno])
+                if len(heap) < limit:
+                    heapq.heappush(heap, (score, docno))
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, (score, docno))
+            return [dict(docs[docno], score=score) for score, docno in sorted(heap, reverse=True)]
+
+    def stats(self) -> Dict[str, float]:
+        return {"documents": self.live, "tombstones": self.dead, "terms": len(self.doc_ids)}
+
+
+# ---------- App wiring ----------
+def get_search_index() -> Optional[SearchIndex]:
+    """The current app's index, or None outside an app or when search is off."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("search_index")
+
+
+def ensure_built(index: SearchIndex, force: bool = False) -> None:
+    """(Re)build from the repos when the index is missing or indexes another data source."""
+    from .settings import current_settings
+
+    settings = current_settings()
+    source = index_source(settings)
+    index.reload_if_changed()
+    if index.source == source and not force:
+        return
+    project_repo, blog_repo = settings.project_repo(), settings.blog_repo()
+    if project_repo is None or blog_repo is None:
+        return
+    logger.info("Building search index for %s", source)
+    index.build(source, project_repo.list_projects(), blog_repo.list_posts())
+
+
+def index_document(kind: str, row: Optional[Dict[str, Any]]) -> None:
+    """Called by the repos after a successful create."""
+    index = get_search_index()
+    if index is not None and row:
+        try:
+            index.add(kind, row)
+        except Exception:
+            logger.exception("Search index update failed for %s %s", kind, row.get("id"))
+
+
+def reindex_project(project_id: Any, changes: Dict[str, Any]) -> None:
+    index = get_search_index()
+    if index is not None:
+        try:
+            index.update_project(project_id, changes)
+        except Exception:
+            logger.exception("Search index update failed for project %s", project_id)
+
+
+def unindex_document(kind: str, doc_id: Any) -> None:
+    index = get_search_index()
+    if index is not None:
+        try:
+            index.remove(kind, doc_id)
+        except Exception:
+            logger.exception("Search index removal failed for %s %s", kind, doc_id)
+
+
+def init_search(app: Flask) -> None:
+    """Load the persisted index (SEARCH_INDEX_PATH) so workers start warm."""
+    if str(app.config.get("SEARCH", "on")).lower() in ("off", "false", "0"):
+        return
+    path = app.config.get("SEARCH_INDEX_PATH") or os.path.join(app.instance_path, "search_index.pickle")
+    index = SearchIndex(path)
+    index.load()
+    app.extensions["search_index"] = index
+
+    from .metrics import metrics
+    metrics.register_collector("search", lambda: (get_search_index().stats() if get_search_index() else {}))
+
+    @app.cli.command("build-search-index")
+    def build_search_index_command():
+        """Rebuild the search index from the configured backend."""
+        ensure_built(index, force=True)
+        print(f"Indexed {index.live} documents into {index.path}")
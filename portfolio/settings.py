@@ -0,0 +1,215 @@
+import os
+import signal
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Mapping, Optional, Union
+
+from dotenv import dotenv_values, find_dotenv, load_dotenv
+from flask import Flask, current_app
+
+from .replica import Replica, ReplicatedBlogRepo, ReplicatedProjectRepo
+from .sqlite_repo import SQLiteBlogRepo, SQLiteDatabase, SQLiteProjectRepo
+from .supabase_repo import BlogRepo, ProjectRepo, SupabaseContext
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("supabase", "sqlite")
+DEFAULT_SQLITE_PATH = os.path.join("instance", "portfolio.db")
+
+
+class ConfigError(ValueError):
+    """Raised when the environment describes an unusable configuration."""
+
+
+def _first(environ: Mapping[str, str], *names: str) -> Optional[str]:
+    for name in names:
+        value = (environ.get(name) or "").strip()
+        if value:
+            return value
+    return None
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Parsed, validated runtime configuration. Built once in create_app() and
+    replaced wholesale on reload, never mutated.
+    """
+
+    backend: str
+    supabase_url: Optional[str] = None
+    supabase_anon_key: Optional[str] = field(default=None, repr=False)
+    supabase_service_role_key: Optional[str] = field(default=None, repr=False)
+    mail_recipient: Optional[str] = None
+    sqlite_path: str = DEFAULT_SQLITE_PATH
+    uploads_dir: str = os.path.join("instance", "uploads")
+    # Shared by every request; None when Supabase is not configured
+    supabase: Optional[SupabaseContext] = field(default=None, compare=False, repr=False)
+    # Only opened when the sqlite backend is selected
+    sqlite: Optional[SQLiteDatabase] = field(default=None, compare=False, repr=False)
+    # Local copy of the Supabase tables for public reads (REPLICA=on)
+    replica: Optional[Replica] = field(default=None, compare=False, repr=False)
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None,
+                 default_sqlite_path: str = DEFAULT_SQLITE_PATH) -> "Settings":
+        """
+        Build settings from environment variables.
+
+        DATA_BACKEND may force 'supabase' or 'sqlite'; otherwise Supabase is
+        used when SUPABASE_URL and SUPABASE_KEY are both present. The sqlite
+        backend stores data in SQLITE_PATH and uploads in UPLOADS_DIR. With
+        REPLICA=on, the supabase backend also keeps a read replica in
+        REPLICA_PATH.
+        """
+        env = os.environ if environ is None else environ
+        url = _first(env, "SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_URL")
+        anon = _first(env, "SUPABASE_KEY", "NEXT_PUBLIC_SUPABASE_ANON_KEY")
+        service = _first(env, "SUPABASE_SERVICE_ROLE_KEY")
+
+        backend = (env.get("DATA_BACKEND") or "").strip().lower()
+        if backend and backend not in BACKENDS:
+            raise ConfigError(f"DATA_BACKEND must be one of {', '.join(BACKENDS)}, not {backend!r}.")
+        if not backend:
+            backend = "supabase" if (url and anon) else "sqlite"
+        if url and not url.startswith(("http://", "https://")):
+            raise ConfigError("SUPABASE_URL must start with http:// or https://.")
+        if backend == "supabase" and not (url and anon):
+            raise ConfigError("DATA_BACKEND=supabase requires SUPABASE_URL and SUPABASE_KEY.")
+
+        sqlite_path = _first(env, "SQLITE_PATH") or default_sqlite_path
+        supabase = SupabaseContext(url, anon, service) if (url and anon) else None
+        replica = None
+        if backend == "supabase" and (_first(env, "REPLICA") or "off").lower() in ("on", "true", "1"):
+            try:
+                replica = Replica(
+                    SQLiteDatabase(_first(env, "REPLICA_PATH")
+                                   or os.path.join(os.path.dirname(default_sqlite_path), "replica.db")),
+                    supabase,
+                    interval=float(_first(env, "REPLICA_INTERVAL") or 30),
+                    max_lag=float(_first(env, "REPLICA_MAX_LAG") or 300),
+                    reconcile_every=int(_first(env, "REPLICA_RECONCILE_EVERY") or 10),
+                )
+            except ValueError as exc:
+                raise ConfigError(f"Invalid REPLICA_* setting: {exc}") from exc
+        return cls(
+            backend=backend,
+            supabase_url=url,
+            supabase_anon_key=anon,
+            supabase_service_role_key=service,
+            mail_recipient=_first(env, "MAIL_RECIPIENT"),
+            sqlite_path=sqlite_path,
+            uploads_dir=_first(env, "UPLOADS_DIR") or os.path.join(os.path.dirname(sqlite_path), "uploads"),
+            supabase=supabase,
+            sqlite=SQLiteDatabase(sqlite_path) if backend == "sqlite" else None,
+            replica=replica,
+        )
+
+    def project_repo(self) -> Optional[Union[ProjectRepo, SQLiteProjectRepo, ReplicatedProjectRepo]]:
+        """Project repository for the selected backend; None if it is unavailable."""
+        if self.sqlite is not None:
+            return SQLiteProjectRepo(self.sqlite, self.uploads_dir)
+        if self.supabase is None:
+            return None
+        if self.replica is not None:
+            return ReplicatedProjectRepo(ProjectRepo(self.supabase), self.replica)
+        return ProjectRepo(self.supabase)
+
+    def blog_repo(self) -> Optional[Union[BlogRepo, SQLiteBlogRepo, ReplicatedBlogRepo]]:
+        """Blog repository for the selected backend; None if it is unavailable."""
+        if self.sqlite is not None:
+            return SQLiteBlogRepo(self.sqlite)
+        if self.supabase is None:
+            return None
+        if self.replica is not None:
+            return ReplicatedBlogRepo(BlogRepo(self.supabase), self.replica)
+        return BlogRepo(self.supabase)
+
+    def same_supabase(self, other: "Settings") -> bool:
+        return (self.supabase_url, self.supabase_anon_key, self.supabase_service_role_key) == (
+            other.supabase_url, other.supabase_anon_key, other.supabase_service_role_key)
+
+
+class SettingsManager:
+    """
+    Holds the app's current Settings and swaps them on reload.
+
+    SIGHUP only flags a reload; the next request re-reads the .env file on
+    top of the process environment, so no parsing happens in the signal
+    handler. A reload that fails validation keeps the previous settings.
+    """
+
+    def __init__(self, settings: Settings, dotenv_path: Optional[str] = None,
+                 default_sqlite_path: str = DEFAULT_SQLITE_PATH):
+        self.settings = settings
+        self.dotenv_path = dotenv_path
+        self.default_sqlite_path = default_sqlite_path
+        self.reloads = 0
+        self._pending = False
+        self._lock = threading.Lock()
+
+    def request_reload(self, *_: object) -> None:
+        self._pending = True
+
+    def reload_if_pending(self) -> None:
+        if self._pending:
+            self.reload()
+
+    def reload(self) -> bool:
+        with self._lock:
+            self._pending = False
+            environ = dict(os.environ)
+            if self.dotenv_path:
+                environ.update({k: v for k, v in dotenv_values(self.dotenv_path).items() if v is not None})
+            try:
+                fresh = Settings.from_env(environ, self.default_sqlite_path)
+            except ConfigError as exc:
+                logger.error("Settings reload rejected, keeping previous configuration: %s", exc)
+                return False
+            previous, self.settings = self.settings, fresh
+            self.reloads += 1
+        if previous.replica is not None:
+            # The new settings carry their own replica; it resumes from the stored watermark
+            previous.replica.stop()
+        if not fresh.same_supabase(previous) or fresh.backend != previous.backend:
+            # Cached rows and pages came from the old project
+            from .cache import get_repo_cache
+            from .page_cache import invalidate_pages
+            cache = get_repo_cache()
+            if cache is not None:
+                cache.clear()
+            invalidate_pages()
+        logger.info("Settings reloaded (backend=%s)", fresh.backend)
+        return True
+
+
+def current_settings() -> Settings:
+    """Settings of the app handling the current request."""
+    return current_app.extensions["settings"].settings
+
+
+def init_settings(app: Flask) -> SettingsManager:
+    """Parse the environment once and expose it as app.settings."""
+    dotenv_path = os.environ.get("SETTINGS_DOTENV") or find_dotenv(usecwd=True) or None
+    if dotenv_path:
+        load_dotenv(dotenv_path)
+    default_sqlite_path = os.path.join(app.instance_path, "portfolio.db")
+    manager = SettingsManager(Settings.from_env(default_sqlite_path=default_sqlite_path), dotenv_path,
+                              default_sqlite_path)
+    app.extensions["settings"] = manager
+    app.before_request(manager.reload_if_pending)
+    install_reload_handler(app)
+    return manager
+
+
+def install_reload_handler(app: Flask) -> bool:
+    """
+    Point SIGHUP at app's settings manager. gunicorn workers reset every
+    signal after the fork, so gunicorn.conf.py calls this again in each
+    worker. Returns False where SIGHUP can't be handled here.
+    """
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGHUP, app.extensions["settings"].request_reload)
+    return True
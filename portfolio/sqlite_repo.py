@@ -0,0 +1,499 @@
+import os
+import json
+import asyncio
+import uuid
+import shutil
+import sqlite3
+import threading
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .cache import RepoCache
+from .metrics import instrument_repo
+from .page_cache import invalidate_pages
+from .facets import retag_project, tag_project, untag_project
+from .search import index_document, reindex_project, unindex_document
+from .rendering import RENDERED_FIELDS, render_post
+from .supabase_repo import (
+    ITER_BATCH_SIZE,
+    POST_LIST_COLUMNS,
+    PROJECT_LIST_COLUMNS,
+    _cached,
+    _page_size,
+    decode_cursor,
+    encode_cursor,
+)
+
+logger = logging.getLogger(__name__)
+
+# Mirrors migrations/*.sql. Timestamps are ISO-8601 UTC text so they sort
+# and compare the same way as the timestamptz values PostgREST returns.
+# The rendered columns are filled by rendering.render_post() on every write.
+BLOG_POSTS_COLUMNS = """\
+  id integer primary key autoincrement,
+  title text not null,
+  content text not null,
+  content_html text,
+  excerpt text,
+  word_count integer,
+  reading_minutes integer,
+  render_version integer default 0,
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"""
+
+SCHEMA = f"""
+create table if not exists projects (
+  id integer primary key autoincrement,
+  title text not null,
+  description text not null,
+  github_url text default '',
+  image_url text default '',
+  tech_stack text not null,
+  image_variants text default '{{}}',
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  created_by text
+);
+
+create table if not exists blog_posts (
+{BLOG_POSTS_COLUMNS}
+);
+
+create index if not exists blog_posts_created_at_id_idx on blog_posts (created_at desc, id desc);
+
+create table if not exists admins (
+  user_id text primary key
+);
+"""
+
+# External-content FTS5 indexes kept in step by triggers; skipped when the
+# SQLite build lacks FTS5.
+# Files created before posts were rendered have a generated excerpt column,
+# which cannot be written; the table is rebuilt with the same ids instead.
+UPGRADE_BLOG_POSTS = f"""
+create table blog_posts_rendered (
+{BLOG_POSTS_COLUMNS}
+);
+insert into blog_posts_rendered (id, title, content, excerpt, created_at)
+  select id, title, content, excerpt, created_at from blog_posts;
+drop table blog_posts;
+alter table blog_posts_rendered rename to blog_posts;
+create index if not exists blog_posts_created_at_id_idx on blog_posts (created_at desc, id desc);
+"""
+
+FTS_SCHEMA = """
+create virtual table if not exists blog_posts_fts using fts5(
+  title, content, content='blog_posts', content_rowid='id', tokenize='porter unicode61'
+);
+create trigger if not exists blog_posts_fts_ai after insert on blog_posts begin
+  insert into blog_posts_fts(rowid, title, content) values (new.id, new.title, new.content);
+end;
+create trigger if not exists blog_posts_fts_ad after delete on blog_posts begin
+  insert into blog_posts_fts(blog_posts_fts, rowid, title, content) values ('delete', old.id, old.title, old.content);
+end;
+create trigger if not exists blog_posts_fts_au after update on blog_posts begin
+  insert into blog_posts_fts(blog_posts_fts, rowid, title, content) values ('delete', old.id, old.title, old.content);
+  insert into blog_posts_fts(rowid, title, content) values (new.id, new.title, new.content);
+end;
+
+create virtual table if not exists projects_fts using fts5(
+  title, description, tech_stack, content='projects', content_rowid='id', tokenize='porter unicode61'
+);
+create trigger if not exists projects_fts_ai after insert on projects begin
+  insert into projects_fts(rowid, title, description, tech_stack) values (new.id, new.title, new.description, new.tech_stack);
+end;
+create trigger if not exists projects_fts_ad after delete on projects begin
+  insert into projects_fts(projects_fts, rowid, title, description, tech_stack) values ('delete', old.id, old.title, old.description, old.tech_stack);
+end;
+create trigger if not exists projects_fts_au after update on projects begin
+  insert into projects_fts(projects_fts, rowid, title, description, tech_stack) values ('delete', old.id, old.title, old.description, old.tech_stack);
+  insert into projects_fts(rowid, title, description, tech_stack) values (new.id, new.title, new.description, new.tech_stack);
+end;
+"""
+
+# Fixed statement texts: sqlite3 keeps each connection's compiled statements
+# in its statement cache keyed by SQL text, so these are prepared once per thread.
+_PROJECT_LIST_SQL = f"select {PROJECT_LIST_COLUMNS} from projects"
+_SQL = {
+    "projects_all": "select * from projects order by id desc",
+    "projects_first": f"{_PROJECT_LIST_SQL} order by id desc limit ?",
+    "projects_after": f"{_PROJECT_LIST_SQL} where id < ? order by id desc limit ?",
+    "project_get": "select * from projects where id = ?",
+    "project_delete": "delete from projects where id = ?",
+    "posts_all": "select * from blog_posts order by created_at desc, id desc",
+    "posts_first": f"select {POST_LIST_COLUMNS} from blog_posts order by created_at desc, id desc limit ?",
+    "posts_after": (
+        f"select {POST_LIST_COLUMNS} from blog_posts where (created_at, id) < (?, ?)"
+        " order by created_at desc, id desc limit ?"
+    ),
+    "post_get": "select * from blog_posts where id = ?",
+    "post_insert": (
+        "insert into blog_posts (title, content, content_html, excerpt, word_count, reading_minutes, render_version)"
+        " values (?, ?, ?, ?, ?, ?, ?) returning *"
+    ),
+    "post_update": (
+        "update blog_posts set title = ?, content = ?, content_html = ?, excerpt = ?, word_count = ?,"
+        " reading_minutes = ?, render_version = ? where id = ? returning *"
+    ),
+    "posts_for_render": "select id, title, content, render_version from blog_posts where id > ? order by id limit ?",
+    "post_save_rendered": (
+        "update blog_posts set content_html = ?, excerpt = ?, word_count = ?, reading_minutes = ?,"
+        " render_version = ? where id = ?"
+    ),
+    "post_delete": "delete from blog_posts where id = ?",
+}
+PROJECT_FIELDS = ("title", "description", "github_url", "image_url", "tech_stack", "image_variants", "created_by")
+
+
+class SQLiteDatabase:
+    """
+    One SQLite file shared by every thread and worker on the host.
+
+    Each thread gets its own connection (sqlite3 connections must not cross
+    threads); a fork is detected by pid so children never reuse the parent's.
+    """
+
+    def __init__(self, path: str, cached_statements: int = 128):
+        self.path = path
+        self.cached_statements = cached_statements
+        self.fts = False
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, cached_statements=self.cached_statements,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            conn.execute("pragma foreign_keys=on")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn.executescript(SCHEMA)
+            upgraded = "content_html" not in {row[1] for row in conn.execute("pragma table_info(blog_posts)")}
+            if upgraded:
+                conn.executescript(f"begin;{UPGRADE_BLOG_POSTS}commit;")
+                logger.info("Rebuilt blog_posts in %s with rendered-content columns", self.path)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.fts = True
+                if upgraded:
+                    conn.execute("insert into blog_posts_fts(blog_posts_fts) values ('rebuild')")
+            except sqlite3.OperationalError:
+                logger.info("SQLite build lacks FTS5; full-text tables not created")
+            self._schema_ready = True
+
+    def query(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.connect().execute(sql, tuple(params))]
+
+    def query_one(self, sql: str, params: Iterable[Any] = ()) -> Optional[Dict[str, Any]]:
+        row = self.connect().execute(sql, tuple(params)).fetchone()
+        return dict(row) if row is not None else None
+
+    def insert(self, sql: str, params: Iterable[Any] = ()) -> Optional[Dict[str, Any]]:
+        """Run an insert ... returning statement to completion and return its row."""
+        rows = self.query(sql, params)
+        return rows[0] if rows else None
+
+    def execute(self, sql: str, params: Iterable[Any] = ()) -> int:
+        return self.connect().execute(sql, tuple(params)).rowcount
+
+
+def _project_row(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if row is not None and isinstance(row.get("image_variants"), str):
+        try:
+            row["image_variants"] = json.loads(row["image_variants"])
+        except ValueError:
+            row["image_variants"] = {}
+    return row
+
+
+async def _in_thread(method: Callable[[], Any]) -> Any:
+    """Run a sync repo method in a worker thread, keeping file I/O off the event loop."""
+    # The calling async method is timed already; skip the sync method's own timing
+    raw = getattr(method, "__wrapped__", None)
+    return await asyncio.to_thread(raw.__get__(method.__self__) if raw is not None else method)
+
+
+@instrument_repo
+class SQLiteProjectRepo:
+    """ProjectRepo backed by a local SQLite file; same methods and return shapes."""
+
+    CACHE_PREFIX = "projects:"
+
+    def __init__(self, db: SQLiteDatabase, uploads_dir: str, uploads_url: str = "/uploads",
+                 cache: Optional[RepoCache] = None):
+        self.db = db
+        self.uploads_dir = uploads_dir
+        self.uploads_url = uploads_url.rstrip("/")
+        # Local reads are sub-millisecond; a cache is optional here
+        self.cache = cache
+
+    def _invalidate(self) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_PREFIX)
+        invalidate_pages()
+
+    # ---------- Storage helpers ----------
+    def upload_image(
+        self,
+        file: Union[bytes, str],
+        filename: str,
+        content_type: str,
+        token: Optional[str] = None,
+    ) -> Optional[str]:
+        """Store the image under uploads_dir and return its URL, else None."""
+        key = f"{uuid.uuid4().hex}_{filename}"
+        target = os.path.join(self.uploads_dir, key)
+        try:
+            os.makedirs(self.uploads_dir, exist_ok=True)
+            if isinstance(file, str):
+                shutil.copyfile(file, target)
+            else:
+                with open(target, "wb") as fh:
+                    fh.write(file)
+            return f"{self.uploads_url}/{key}"
+        except OSError as e:
+            logger.exception("SQLite upload_image failed: %s", e)
+            return None
+
+    # ---------- Projects ----------
+    def list_projects(self) -> List[Dict[str, Any]]:
+        try:
+            return _cached(self.cache, self.CACHE_PREFIX + "list",
+                           lambda: [_project_row(r) for r in self.db.query(_SQL["projects_all"])])
+        except sqlite3.Error as e:
+            logger.exception("SQLite list_projects failed: %s", e)
+            return []
+
+    async def alist_projects(self) -> List[Dict[str, Any]]:
+        return await _in_thread(self.list_projects)
+
+    def list_projects_page(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Keyset-paginated projects, newest first. Returns (rows, next_cursor)."""
+        size = _page_size(limit)
+        values = decode_cursor(cursor)
+        after_id = int(values[0]) if values and isinstance(values[0], int) else None
+        try:
+            if after_id is None:
+                rows = self.db.query(_SQL["projects_first"], (size + 1,))
+            else:
+                rows = self.db.query(_SQL["projects_after"], (after_id, size + 1))
+        except sqlite3.Error as e:
+            logger.exception("SQLite list_projects_page failed: %s", e)
+            return [], None
+        next_cursor = encode_cursor(rows[size - 1]["id"]) if len(rows) > size else None
+        return [_project_row(r) for r in rows[:size]], next_cursor
+
+    def iter_projects(self, batch_size: int = ITER_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Every project (list columns), newest first, read batch_size rows at a time."""
+        # Keyset batches rather than one open cursor, so no read transaction spans the render
+        rows: List[Dict[str, Any]] = []
+        while True:
+            try:
+                if not rows:
+                    rows = self.db.query(_SQL["projects_first"], (batch_size,))
+                else:
+                    rows = self.db.query(_SQL["projects_after"], (rows[-1]["id"], batch_size))
+            except sqlite3.Error as e:
+                logger.exception("SQLite iter_projects failed: %s", e)
+                return
+            for row in rows:
+                yield _project_row(row)
+            if len(rows) < batch_size:
+                return
+
+    def get_project(self, project_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            return _project_row(self.db.query_one(_SQL["project_get"], (project_id,)))
+        except sqlite3.Error as e:
+            logger.exception("SQLite get_project failed: %s", e)
+            return None
+
+    def create_project(
+        self,
+        title: str,
+        description: str,
+        github_url: Optional[str],
+        image_url: Optional[str],
+        tech_stack: Optional[str],
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            row = self.db.insert(
+                "insert into projects (title, description, github_url, image_url, tech_stack)"
+                " values (?, ?, ?, ?, ?) returning *",
+                (title, description, github_url or "", image_url or "", tech_stack or ""),
+            )
+            self._invalidate()
+            index_document("project", row)
+            tag_project(row)
+            return _project_row(row)
+        except sqlite3.Error as e:
+            logger.exception("SQLite create_project failed: %s", e)
+            return None
+
+    def update_project(
+        self,
+        project_id: int,
+        fields: Dict[str, Any],
+        token: Optional[str] = None,
+    ) -> bool:
+        columns = [c for c in fields if c in PROJECT_FIELDS]
+        if not columns:
+            return True
+        values = [json.dumps(fields[c]) if c == "image_variants" else fields[c] for c in columns]
+        assignments = ", ".join(f"{c} = ?" for c in columns)
+        try:
+            self.db.execute(f"update projects set {assignments} where id = ?", (*values, project_id))
+            self._invalidate()
+            reindex_project(project_id, fields)
+            retag_project(project_id, fields)
+            return True
+        except sqlite3.Error as e:
+            logger.exception("SQLite update_project failed: %s", e)
+            return False
+
+    def delete_project(self, project_id: int) -> bool:
+        try:
+            self.db.execute(_SQL["project_delete"], (project_id,))
+            self._invalidate()
+            unindex_document("project", project_id)
+            untag_project(project_id)
+            return True
+        except sqlite3.Error as e:
+            logger.exception("SQLite delete_project failed: %s", e)
+            return False
+
+
+@instrument_repo
+class SQLiteBlogRepo:
+    """BlogRepo backed by a local SQLite file; same methods and return shapes."""
+
+    CACHE_PREFIX = "blog:"
+
+    def __init__(self, db: SQLiteDatabase, cache: Optional[RepoCache] = None):
+        self.db = db
+        self.cache = cache
+
+    def _invalidate(self) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_PREFIX)
+        invalidate_pages()
+
+    def list_posts(self) -> List[Dict[str, Any]]:
+        try:
+            return _cached(self.cache, self.CACHE_PREFIX + "list", lambda: self.db.query(_SQL["posts_all"]))
+        except sqlite3.Error as e:
+            logger.exception("SQLite list_posts failed: %s", e)
+            return []
+
+    async def alist_posts(self) -> List[Dict[str, Any]]:
+        return await _in_thread(self.list_posts)
+
+    def list_posts_page(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Keyset-paginated post summaries (no body), newest first. Returns (rows, next_cursor)."""
+        size = _page_size(limit)
+        values = decode_cursor(cursor)
+        try:
+            if values and len(values) == 2 and isinstance(values[0], str) and isinstance(values[1], int):
+                rows = self.db.query(_SQL["posts_after"], (values[0], values[1], size + 1))
+            else:
+                rows = self.db.query(_SQL["posts_first"], (size + 1,))
+        except sqlite3.Error as e:
+            logger.exception("SQLite list_posts_page failed: %s", e)
+            return [], None
+        next_cursor = None
+        if len(rows) > size:
+            last = rows[size - 1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        return rows[:size], next_cursor
+
+    def iter_posts(self, batch_size: int = ITER_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Every post summary (no body), newest first, read batch_size rows at a time."""
+        rows: List[Dict[str, Any]] = []
+        while True:
+            try:
+                if not rows:
+                    rows = self.db.query(_SQL["posts_first"], (batch_size,))
+                else:
+                    last = rows[-1]
+                    rows = self.db.query(_SQL["posts_after"], (last["created_at"], last["id"], batch_size))
+            except sqlite3.Error as e:
+                logger.exception("SQLite iter_posts failed: %s", e)
+                return
+            yield from rows
+            if len(rows) < batch_size:
+                return
+
+    def get_post(self, post_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            return self.db.query_one(_SQL["post_get"], (post_id,))
+        except sqlite3.Error as e:
+            logger.exception("SQLite get_post failed: %s", e)
+            return None
+
+    def create_post(self, title: str, content: str) -> Optional[Dict[str, Any]]:
+        rendered = render_post(content)
+        try:
+            row = self.db.insert(_SQL["post_insert"], (title, content, *(rendered[f] for f in RENDERED_FIELDS)))
+            self._invalidate()
+            index_document("post", row)
+            return row
+        except sqlite3.Error as e:
+            logger.exception("SQLite create_post failed: %s", e)
+            return None
+
+    def update_post(self, post_id: int, title: str, content: str, token: Optional[str] = None) -> bool:
+        rendered = render_post(content)
+        try:
+            row = self.db.insert(_SQL["post_update"],
+                                 (title, content, *(rendered[f] for f in RENDERED_FIELDS), post_id))
+            self._invalidate()
+            index_document("post", row)
+            return row is not None
+        except sqlite3.Error as e:
+            logger.exception("SQLite update_post failed: %s", e)
+            return False
+
+    def posts_for_render(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        return self.db.query(_SQL["posts_for_render"], (after_id, limit))
+
+    def save_rendered(self, rows: List[Dict[str, Any]]) -> bool:
+        conn = self.db.connect()
+        try:
+            with conn:
+                conn.execute("begin")
+                conn.executemany(_SQL["post_save_rendered"],
+                                 [(*(row[f] for f in RENDERED_FIELDS), row["id"]) for row in rows])
+            self._invalidate()
+            return True
+        except sqlite3.Error as e:
+            logger.exception("SQLite save_rendered failed: %s", e)
+            return False
+
+    def delete_post(self, post_id: int) -> bool:
+        try:
+            self.db.execute(_SQL["post_delete"], (post_id,))
+            self._invalidate()
+            unindex_document("post", post_id)
+            return True
+        except sqlite3.Error as e:
+            logger.exception("SQLite delete_post failed: %s", e)
+            return False
@@ -0,0 +1,103 @@
+"""
+Streamed rendering for the listing pages.
+
+stream_page() renders through Flask's stream_template, so the response
+starts before the rows are read: views hand templates row generators
+(repo.iter_projects() / repo.iter_posts()) or a DeferredPage that runs
+its query when the template first loops over it. Templates call
+stream_flush() just before their first row loop; everything above it (the
+<head>, navigation, flashed messages and forms) goes out at that point,
+before any repo call. Between flush points output is gathered into
+STREAM_CHUNK_SIZE pieces, so the server and the compression middleware see
+a few sizeable writes rather than one per template expression.
+
+Headers, and with them the session cookie, are sent before the body, so
+the CSRF token and flashed messages are taken up front. Pages the page
+cache is about to store, and every page when STREAM_TEMPLATES is off, are
+rendered in one piece by render_template() instead.
+"""
+import logging
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Flask, Response, current_app, g, get_flashed_messages, render_template, stream_template
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 16 * 1024
+
+
+class DeferredPage:
+    """One page of rows, loaded when first iterated; next_cursor is known from then on."""
+
+    def __init__(self, loader: Callable[[], Tuple[List[Any], Optional[str]]]):
+        self._loader = loader
+        self._rows: Optional[List[Any]] = None
+        self._next_cursor: Optional[str] = None
+
+    def _load(self) -> List[Any]:
+        if self._rows is None:
+            self._rows, self._next_cursor = self._loader()
+        return self._rows
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._load())
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        self._load()
+        return self._next_cursor
+
+
+def streaming_enabled() -> bool:
+    """Whether this request's page may be streamed."""
+    if g.get("_page_cache_active"):
+        return False
+    return str(current_app.config.get("STREAM_TEMPLATES", "on")).lower() not in ("off", "false", "0")
+
+
+class _FlushRequest:
+    """The stream_flush() template global of one streamed page."""
+
+    __slots__ = ("requested",)
+
+    def __init__(self) -> None:
+        self.requested = False
+
+    def __call__(self) -> str:
+        self.requested = True
+        return ""
+
+
+def _chunked(events: Iterable[str], flush: _FlushRequest, chunk_size: int) -> Iterator[str]:
+    parts: List[str] = []
+    size = 0
+    for text in events:
+        if text:
+            parts.append(text)
+            size += len(text)
+        if (flush.requested or size >= chunk_size) and parts:
+            flush.requested = False
+            yield "".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts)
+
+
+def stream_page(template_name: str, **context: Any) -> Any:
+    """render_template() that streams the page when streaming_enabled()."""
+    if not streaming_enabled():
+        return render_template(template_name, **context)
+    # Both write to the session, which is saved with the headers
+    if "csrf" in current_app.extensions:
+        from flask_wtf.csrf import generate_csrf
+        generate_csrf()
+    get_flashed_messages()
+    flush = _FlushRequest()
+    events = stream_template(template_name, stream_flush=flush, **context)
+    chunk_size = int(current_app.config.get("STREAM_CHUNK_SIZE") or DEFAULT_CHUNK_SIZE)
+    return Response(_chunked(events, flush, chunk_size), mimetype="text/html")
+
+
+def init_streaming(app: Flask) -> None:
+    """Make stream_flush() a no-op wherever a template is rendered in one piece."""
+    app.jinja_env.globals["stream_flush"] = lambda: ""
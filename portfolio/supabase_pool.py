@@ -0,0 +1,206 @@
+import os
+import asyncio
+import threading
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from httpx import Headers, QueryParams
+from postgrest import AsyncPostgrestClient, SyncFilterRequestBuilder, SyncRequestBuilder
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from storage3._sync.file_api import SyncBucketProxy
+from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+from supabase.lib.storage_client import SupabaseStorageClient
+
+from .metrics import instrument_async_http_session, instrument_http_session
+from .resilience import apply_async_call_policy, apply_call_policy
+
+logger = logging.getLogger(__name__)
+
+
+class _ScopedSession:
+    """
+    Wraps a shared httpx session and swaps only the bearer header per request,
+    so RLS-scoped calls reuse the pooled keep-alive connections.
+    """
+
+    def __init__(self, session: Any, token: str):
+        self._session = session
+        self._auth = {"Authorization": f"Bearer {token}"}
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {**self._session.headers, **self._auth}
+
+    def request(self, method: str, url: Any, headers: Any = None, **kwargs: Any) -> Any:
+        merged = dict(headers or {})
+        merged.update(self._auth)
+        return self._session.request(method, url, headers=merged, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+
+class ScopedClient:
+    """
+    Lightweight per-user view over a pooled client. Exposes the subset of the
+    supabase.Client surface the repos use: table/from_/rpc and storage.
+    """
+
+    def __init__(self, base: Client, storage: SupabaseStorageClient, token: str):
+        self._rest = _ScopedSession(base.postgrest.session, token)
+        self._storage = _ScopedSession(storage.session, token)
+
+    def table(self, table_name: str) -> SyncRequestBuilder:
+        return self.from_(table_name)
+
+    def from_(self, table_name: str) -> SyncRequestBuilder:
+        return SyncRequestBuilder(self._rest, f"/{table_name}")  # type: ignore[arg-type]
+
+    def rpc(self, fn: str, params: Dict[Any, Any]) -> SyncFilterRequestBuilder:
+        return SyncFilterRequestBuilder(
+            self._rest, f"/rpc/{fn}", "POST", Headers(), QueryParams(), json=params  # type: ignore[arg-type]
+        )
+
+    @property
+    def storage(self) -> "_ScopedStorage":
+        return _ScopedStorage(self._storage)
+
+
+class _ScopedStorage:
+    def __init__(self, session: _ScopedSession):
+        self._session = session
+
+    def from_(self, bucket_id: str) -> SyncBucketProxy:
+        return SyncBucketProxy(bucket_id, self._session)  # type: ignore[arg-type]
+
+
+class ClientRegistry:
+    """
+    Per-worker registry of long-lived Supabase clients, keyed by (url, key).
+
+    Clients are built once and reused for the life of the process; a fork
+    (e.g. gunicorn workers after preload) is detected by pid and starts a fresh
+    pool so connections are never shared across processes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._clients: Dict[Tuple[str, str], Client] = {}
+        self._storages: Dict[Tuple[str, str], SupabaseStorageClient] = {}
+        self._async_clients: Dict[Tuple[str, str], AsyncPostgrestClient] = {}
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters = {"created": 0, "reused": 0, "scoped": 0}
+        # Benchmarks route newly built clients through in-process transports
+        self.transport: Optional[Any] = None
+        self.async_transport: Optional[Any] = None
+
+    def _check_fork(self) -> None:
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._clients = {}
+            self._storages = {}
+            self._async_clients = {}
+            self._async_loop = None
+
+    def get(self, url: str, key: str) -> Client:
+        """Return the pooled client for (url, key), creating it on first use."""
+        with self._lock:
+            self._check_fork()
+            client = self._clients.get((url, key))
+            if client is not None:
+                self._counters["reused"] += 1
+                return client
+            # Fresh options per client: supabase-py mutates the headers dict.
+            client = create_client(url, key, ClientOptions())
+            if self.transport is not None:
+                client.postgrest.session._transport = self.transport
+            instrument_http_session(client.postgrest.session)
+            apply_call_policy(client.postgrest.session)
+            self._clients[(url, key)] = client
+            self._counters["created"] += 1
+            logger.info("Created pooled Supabase client (%d total)", len(self._clients))
+            return client
+
+    def scoped(self, url: str, key: str, token: str) -> ScopedClient:
+        """Return an RLS-scoped view that reuses the pooled client's connections."""
+        base = self.get(url, key)
+        with self._lock:
+            storage = self._storages.get((url, key))
+            if storage is None:
+                storage = base.storage()
+                if self.transport is not None:
+                    storage.session._transport = self.transport
+                instrument_http_session(storage.session)
+                apply_call_policy(storage.session)
+                self._storages[(url, key)] = storage
+            self._counters["scoped"] += 1
+        return ScopedClient(base, storage, token)
+
+    def get_async(self, url: str, key: str) -> AsyncPostgrestClient:
+        """
+        Return the pooled async PostgREST client for (url, key) on the running
+        event loop. httpx connections belong to the loop that opened them, so
+        the pool starts over if it is asked from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._check_fork()
+            if loop is not self._async_loop:
+                self._async_clients = {}
+                self._async_loop = loop
+            client = self._async_clients.get((url, key))
+            if client is not None:
+                self._counters["reused"] += 1
+                return client
+            options = ClientOptions()
+            # Same headers supabase-py's sync client sends
+            headers = {**DEFAULT_POSTGREST_CLIENT_HEADERS, **options.headers,
+                       "apiKey": key, "Authorization": f"Bearer {key}"}
+            client = AsyncPostgrestClient(f"{url}/rest/v1", headers=headers, timeout=options.timeout)
+            if self.async_transport is not None:
+                client.session._transport = self.async_transport
+            instrument_async_http_session(client.session)
+            apply_async_call_policy(client.session)
+            self._async_clients[(url, key)] = client
+            self._counters["created"] += 1
+            logger.info("Created pooled async PostgREST client (%d total)", len(self._async_clients))
+            return client
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters, pooled=len(self._clients), pooled_async=len(self._async_clients))
+
+    def reset(self) -> None:
+        """Close and drop every pooled client (tests, config reloads)."""
+        with self._lock:
+            for client in self._clients.values():
+                try:
+                    client.postgrest.aclose()
+                except Exception:
+                    logger.debug("Error closing pooled client", exc_info=True)
+            for storage in self._storages.values():
+                try:
+                    storage.aclose()
+                except Exception:
+                    logger.debug("Error closing pooled storage client", exc_info=True)
+            self._clients = {}
+            self._storages = {}
+            # Async clients can only be closed on their own loop; drop them
+            self._async_clients = {}
+            self._async_loop = None
+            self._counters = {"created": 0, "reused": 0, "scoped": 0}
+
+
+registry = ClientRegistry()
+
+
+def client_stats() -> Dict[str, int]:
+    return registry.stats()
+
+
+def get_client(url: Optional[str], key: Optional[str]) -> Optional[Client]:
+    if not url or not key:
+        return None
+    return registry.get(url, key)
@@ -1,18 +1,68 @@
 import os
 import io
+import json
 import uuid
-from typing import Any, Dict, List, Optional, Tuple
+import base64
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 import logging
 from datetime import datetime
 
 from flask import session
-from supabase import create_client, Client
+from postgrest import AsyncPostgrestClient
+from postgrest.types import ReturnMethod
+from supabase import Client, create_client
+from supabase.lib.client_options import ClientOptions
+
+from .cache import RepoCache, get_repo_cache
+from .metrics import instrument_repo
+from .page_cache import invalidate_pages
+from .facets import retag_project, tag_project, untag_project
+from .search import index_document, reindex_project, unindex_document
+from .rendering import RENDERED_FIELDS, render_post
+from .resilience import asupabase_call, supabase_call
+from .supabase_pool import ScopedClient, registry
+
+_UNSET = object()
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Rows per request when a listing is streamed in full (iter_projects/iter_posts)
+ITER_BATCH_SIZE = 1000
+
+# Column projections for list views; detail views still select("*")
+PROJECT_LIST_COLUMNS = "id,title,description,github_url,image_url,image_variants,tech_stack,created_at"
+# excerpt and reading_minutes are computed when a post is written (see rendering.py),
+# so list pages never ship post bodies
+POST_LIST_COLUMNS = "id,title,created_at,excerpt,reading_minutes"
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List[Any]]:
+    """Decode an opaque page cursor; malformed cursors mean 'first page'."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return values if isinstance(values, list) else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _page_size(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(int(limit), MAX_PAGE_SIZE)
 
 
 class SupabaseContext:
     """
-    Provides per-request Supabase clients:
-    - user_client: uses the end-user access token (RLS-enforced)
+    Provides per-request Supabase clients backed by the process-wide pool:
+    - user_client: RLS-scoped view using the end-user access token
     - admin_client: uses the service role for maintenance/migrations only
     """
 
@@ -20,50 +70,104 @@ class SupabaseContext:
         self.url = url
         self.anon_key = anon_key
         self.service_role_key = service_role_key
+        self._auth_client: Optional[Client] = None
 
-    def user_client(self) -> Optional[Client]:
-        token = session.get("supabase_token")
+    def user_client(self, token: Optional[str] = None) -> Optional[ScopedClient]:
+        # Background jobs pass the token explicitly; requests read it from the session
+        if token is None:
+            token = session.get("supabase_token")
         if not token:
             return None
-        client = create_client(self.url, self.anon_key)
-        # Attach user's bearer token for RLS
-        client.postgrest.auth(token)
-        return client
+        # Reuse the pooled anon client; only the bearer header changes for RLS
+        return registry.scoped(self.url, self.anon_key, token)
 
     def admin_client(self) -> Optional[Client]:
         if not self.service_role_key:
             return None
-        return create_client(self.url, self.service_role_key)
+        return registry.get(self.url, self.service_role_key)
 
     def anon_client(self) -> Optional[Client]:
         if not self.url or not self.anon_key:
             return None
         # anon client without bearer, RLS evaluates as role=anon
-        return create_client(self.url, self.anon_key)
+        return registry.get(self.url, self.anon_key)
 
+    def read_client(self) -> Optional[Client]:
+        """Client for public, cacheable reads; never depends on the request session."""
+        return self.anon_client() or self.admin_client()
 
+    async def async_read_client(self) -> Optional[AsyncPostgrestClient]:
+        """Async PostgREST counterpart of read_client, on the running event loop."""
+        key = self.anon_key if (self.url and self.anon_key) else self.service_role_key
+        if not self.url or not key:
+            return None
+        return registry.get_async(self.url, key)
+
+    def auth_client(self) -> Client:
+        """Dedicated client for sign-in, kept apart from the pool since it holds session state."""
+        if self._auth_client is None:
+            self._auth_client = create_client(self.url, self.anon_key, ClientOptions())
+        return self._auth_client
+
+
+def _cached(cache: Optional[RepoCache], key: str, loader):
+    if cache is None:
+        return loader()
+    return cache.get_or_load(key, loader)
+
+
+async def _acached(cache: Optional[RepoCache], key: str, loader):
+    if cache is None:
+        return await loader()
+    return await cache.aget_or_load(key, loader)
+
+
+@instrument_repo
 class ProjectRepo:
-    def __init__(self, ctx: SupabaseContext, bucket: str = "portfolio"):
+    CACHE_PREFIX = "projects:"
+
+    def __init__(self, ctx: SupabaseContext, bucket: str = "portfolio", cache: Any = _UNSET):
         self.ctx = ctx
         self.bucket = bucket
+        self.cache: Optional[RepoCache] = get_repo_cache() if cache is _UNSET else cache
+
+    def _invalidate(self) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_PREFIX)
+        invalidate_pages()
 
     # ---------- Storage helpers ----------
-    def upload_image(self, file_bytes: bytes, filename: str, content_type: str) -> Optional[str]:
+    def upload_image(
+        self,
+        file: Union[bytes, str],
+        filename: str,
+        content_type: str,
+        token: Optional[str] = None,
+    ) -> Optional[str]:
         """
         Uploads an image to Supabase Storage under the configured bucket.
+        `file` is either the bytes or a path, which is streamed from disk.
         Returns a public URL on success, else None.
         """
-        client = self.ctx.user_client()
+        client = self.ctx.user_client(token)
         if client is None:
             return None
         # Unique key per upload to avoid collisions
         key = f"uploads/{uuid.uuid4().hex}_{filename}"
+        file_options = {
+            "content-type": content_type,
+            # Keys are unique per upload, so the objects never change
+            "cache-control": "public, max-age=31536000, immutable",
+            "x-upsert": "false",
+        }
         try:
-            client.storage.from_(self.bucket).upload(
-                file=file_bytes,
-                path=key,
-                file_options={"contentType": content_type, "upsert": False},
-            )
+            if isinstance(file, str):
+                with open(file, "rb") as fh:
+                    supabase_call("storage.upload", lambda: client.storage.from_(self.bucket).upload(
+                        file=fh, path=key, file_options=file_options), idempotent=False)
+            else:
+                supabase_call("storage.upload", lambda: client.storage.from_(self.bucket).upload(
+                    file=file, path=key, file_options=file_options), idempotent=False)
             public = client.storage.from_(self.bucket).get_public_url(key)
             return public
         except Exception as e:
@@ -71,25 +175,86 @@ class ProjectRepo:
             return None
 
     # ---------- Projects (table: projects) ----------
-    def list_projects(self) -> List[Dict[str, Any]]:
-        client = self.ctx.user_client() or self.ctx.anon_client() or self.ctx.admin_client()
+    def _fetch_projects(self) -> List[Dict[str, Any]]:
+        client = self.ctx.read_client()
         if client is None:
             return []
+        resp = supabase_call("projects.list", client.table("projects").select("*").order("id", desc=True).execute)
+        return resp.data or []
+
+    def list_projects(self) -> List[Dict[str, Any]]:
         try:
-            resp = (
-                client.table("projects").select("*").order("id", desc=True).execute()
-            )
-            return resp.data or []
+            return _cached(self.cache, self.CACHE_PREFIX + "list", self._fetch_projects)
         except Exception as e:
             logging.getLogger(__name__).exception("Supabase list_projects failed: %s", e)
             return []
 
+    async def _afetch_projects(self) -> List[Dict[str, Any]]:
+        client = await self.ctx.async_read_client()
+        if client is None:
+            return []
+        resp = await asupabase_call("projects.list",
+                                    client.table("projects").select("*").order("id", desc=True).execute)
+        return resp.data or []
+
+    async def alist_projects(self) -> List[Dict[str, Any]]:
+        """list_projects over the async client; shares its cache entry."""
+        try:
+            return await _acached(self.cache, self.CACHE_PREFIX + "list", self._afetch_projects)
+        except Exception as e:
+            logging.getLogger(__name__).exception("Supabase alist_projects failed: %s", e)
+            return []
+
+    def _fetch_projects_page(self, after_id: Optional[int], size: int) -> Dict[str, Any]:
+        client = self.ctx.read_client()
+        if client is None:
+            return {"rows": [], "next": None}
+        query = client.table("projects").select(PROJECT_LIST_COLUMNS)
+        if after_id is not None:
+            query = query.lt("id", after_id)
+        # Fetch one extra row to learn whether another page exists
+        resp = supabase_call("projects.page", query.order("id", desc=True).limit(size + 1).execute)
+        rows = resp.data or []
+        next_cursor = encode_cursor(rows[size - 1]["id"]) if len(rows) > size else None
+        return {"rows": rows[:size], "next": next_cursor}
+
+    def list_projects_page(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Keyset-paginated projects, newest first. Returns (rows, next_cursor)."""
+        size = _page_size(limit)
+        values = decode_cursor(cursor)
+        after_id = int(values[0]) if values and isinstance(values[0], int) else None
+        key = f"{self.CACHE_PREFIX}page:{after_id}:{size}"
+        try:
+            page = _cached(self.cache, key, lambda: self._fetch_projects_page(after_id, size))
+            return page["rows"], page["next"]
+        except Exception as e:
+            logging.getLogger(__name__).exception("Supabase list_projects_page failed: %s", e)
+            return [], None
+
+    def iter_projects(self, batch_size: int = ITER_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Every project (list columns), newest first, read batch_size rows at a time."""
+        after_id = None
+        while True:
+            try:
+                page = self._fetch_projects_page(after_id, batch_size)
+            except Exception as e:
+                logging.getLogger(__name__).exception("Supabase iter_projects failed: %s", e)
+                return
+            yield from page["rows"]
+            if page["next"] is None:
+                return
+            after_id = decode_cursor(page["next"])[0]
+
     def get_project(self, project_id: int) -> Optional[Dict[str, Any]]:
-        client = self.ctx.user_client() or self.ctx.anon_client() or self.ctx.admin_client()
+        # Read through the session client: edit forms must see the latest row.
+        client = self.ctx.user_client() or self.ctx.read_client()
         if client is None:
             return None
         try:
-            resp = client.table("projects").select("*").eq("id", project_id).single().execute()
+            resp = supabase_call("projects.get",
+                                 client.table("projects").select("*").eq("id", project_id).single().execute)
             return resp.data
         except Exception as e:
             logging.getLogger(__name__).exception("Supabase get_project failed: %s", e)
@@ -114,8 +279,14 @@ class ProjectRepo:
             "tech_stack": tech_stack,
         }
         try:
-            resp = client.table("projects").insert(payload).select("*").single().execute()
-            return resp.data
+            # insert() returns the representation; postgrest-py has no insert().select()
+            resp = supabase_call("projects.create", client.table("projects").insert(payload).execute,
+                                 idempotent=False)
+            self._invalidate()
+            created = (resp.data or [None])[0]
+            index_document("project", created)
+            tag_project(created)
+            return created
         except Exception as e:
             logging.getLogger(__name__).exception("Supabase create_project failed: %s", e)
             return None
@@ -124,51 +295,152 @@ class ProjectRepo:
         self,
         project_id: int,
         fields: Dict[str, Any],
-    ) -> bool:
-        client = self.ctx.user_client()
+        token: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """The row as written (just the changed fields if PostgREST returned none), or None on failure."""
+        client = self.ctx.user_client(token)
         if client is None:
-            return False
+            return None
         try:
-            client.table("projects").update(fields).eq("id", project_id).execute()
-            return True
+            resp = supabase_call("projects.update",
+                                 client.table("projects").update(fields).eq("id", project_id).execute,
+                                 idempotent=False)
+            self._invalidate()
+            reindex_project(project_id, fields)
+            retag_project(project_id, fields)
+            return (resp.data or [None])[0] or {"id": project_id, **fields}
         except Exception as e:
             logging.getLogger(__name__).exception("Supabase update_project failed: %s", e)
-            return False
+            return None
 
     def delete_project(self, project_id: int) -> bool:
         client = self.ctx.user_client()
         if client is None:
             return False
         try:
-            client.table("projects").delete().eq("id", project_id).execute()
+            supabase_call("projects.delete", client.table("projects").delete().eq("id", project_id).execute,
+                          idempotent=False)
+            self._invalidate()
+            unindex_document("project", project_id)
+            untag_project(project_id)
             return True
         except Exception as e:
             logging.getLogger(__name__).exception("Supabase delete_project failed: %s", e)
             return False
 
 
+@instrument_repo
 class BlogRepo:
-    def __init__(self, ctx: SupabaseContext):
+    CACHE_PREFIX = "blog:"
+
+    def __init__(self, ctx: SupabaseContext, cache: Any = _UNSET):
         self.ctx = ctx
+        self.cache: Optional[RepoCache] = get_repo_cache() if cache is _UNSET else cache
 
-    def list_posts(self) -> List[Dict[str, Any]]:
-        client = self.ctx.user_client() or self.ctx.anon_client() or self.ctx.admin_client()
+    def _invalidate(self) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_PREFIX)
+        invalidate_pages()
+
+    def _fetch_posts(self) -> List[Dict[str, Any]]:
+        client = self.ctx.read_client()
         if client is None:
             return []
+        resp = supabase_call("posts.list",
+                             client.table("blog_posts").select("*").order("created_at", desc=True).execute)
+        return resp.data or []
+
+    def list_posts(self) -> List[Dict[str, Any]]:
         try:
-            resp = client.table("blog_posts").select("*").order("created_at", desc=True).execute()
-            return resp.data or []
+            return _cached(self.cache, self.CACHE_PREFIX + "list", self._fetch_posts)
         except Exception as e:
             logging.getLogger(__name__).exception("Supabase list_posts failed: %s", e)
             return []
 
-    def get_post(self, post_id: int) -> Optional[Dict[str, Any]]:
-        client = self.ctx.user_client() or self.ctx.anon_client() or self.ctx.admin_client()
+    async def _afetch_posts(self) -> List[Dict[str, Any]]:
+        client = await self.ctx.async_read_client()
+        if client is None:
+            return []
+        resp = await asupabase_call("posts.list",
+                                    client.table("blog_posts").select("*").order("created_at", desc=True).execute)
+        return resp.data or []
+
+    async def alist_posts(self) -> List[Dict[str, Any]]:
+        """list_posts over the async client; shares its cache entry."""
+        try:
+            return await _acached(self.cache, self.CACHE_PREFIX + "list", self._afetch_posts)
+        except Exception as e:
+            logging.getLogger(__name__).exception("Supabase alist_posts failed: %s", e)
+            return []
+
+    def _fetch_posts_page(self, after: Optional[List[Any]], size: int) -> Dict[str, Any]:
+        client = self.ctx.read_client()
+        if client is None:
+            return {"rows": [], "next": None}
+        query = client.table("blog_posts").select(POST_LIST_COLUMNS)
+        if after is not None:
+            created_at, post_id = after
+            # Row-value comparison (created_at, id) < (cursor) as a PostgREST logic tree
+            query.params = query.params.add(
+                "or",
+                f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{post_id}))',
+            )
+        resp = supabase_call(
+            "posts.page", query.order("created_at", desc=True).order("id", desc=True).limit(size + 1).execute
+        )
+        rows = resp.data or []
+        next_cursor = None
+        if len(rows) > size:
+            last = rows[size - 1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        return {"rows": rows[:size], "next": next_cursor}
+
+    def list_posts_page(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Keyset-paginated post summaries (no body), newest first. Returns (rows, next_cursor)."""
+        size = _page_size(limit)
+        values = decode_cursor(cursor)
+        after = None
+        if values and len(values) == 2 and isinstance(values[0], str) and isinstance(values[1], int):
+            try:
+                # Only well-formed timestamps reach the filter string
+                datetime.fromisoformat(values[0])
+                after = values
+            except ValueError:
+                after = None
+        key = f"{self.CACHE_PREFIX}page:{cursor if after else ''}:{size}"
+        try:
+            page = _cached(self.cache, key, lambda: self._fetch_posts_page(after, size))
+            return page["rows"], page["next"]
+        except Exception as e:
+            logging.getLogger(__name__).exception("Supabase list_posts_page failed: %s", e)
+            return [], None
+
+    def iter_posts(self, batch_size: int = ITER_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Every post summary (no body), newest first, read batch_size rows at a time."""
+        after = None
+        while True:
+            try:
+                page = self._fetch_posts_page(after, batch_size)
+            except Exception as e:
+                logging.getLogger(__name__).exception("Supabase iter_posts failed: %s", e)
+                return
+            yield from page["rows"]
+            if page["next"] is None:
+                return
+            after = decode_cursor(page["next"])
+
+    def _fetch_post(self, post_id: int) -> Optional[Dict[str, Any]]:
+        client = self.ctx.read_client()
         if client is None:
             return None
+        resp = supabase_call("posts.get", client.table("blog_posts").select("*").eq("id", post_id).single().execute)
+        return resp.data
+
+    def get_post(self, post_id: int) -> Optional[Dict[str, Any]]:
         try:
-            resp = client.table("blog_posts").select("*").eq("id", post_id).single().execute()
-            return resp.data
+            return _cached(self.cache, f"{self.CACHE_PREFIX}post:{post_id}", lambda: self._fetch_post(post_id))
         except Exception as e:
             logging.getLogger(__name__).exception("Supabase get_post failed: %s", e)
             return None
@@ -177,20 +449,72 @@ class BlogRepo:
         client = self.ctx.user_client()
         if client is None:
             return None
-        payload = {"title": title, "content": content}
+        payload = {"title": title, "content": content, **render_post(content)}
         try:
-            resp = client.table("blog_posts").insert(payload).select("*").single().execute()
-            return resp.data
+            # insert() returns the representation; postgrest-py has no insert().select()
+            resp = supabase_call("posts.create", client.table("blog_posts").insert(payload).execute,
+                                 idempotent=False)
+            self._invalidate()
+            created = (resp.data or [None])[0]
+            index_document("post", created)
+            return created
         except Exception as e:
             logging.getLogger(__name__).exception("Supabase create_post failed: %s", e)
             return None
 
+    def update_post(self, post_id: int, title: str, content: str,
+                    token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Replace a post's title and body, re-rendering the body. Returns the row as written, or None."""
+        client = self.ctx.user_client(token)
+        if client is None:
+            return None
+        fields = {"title": title, "content": content, **render_post(content)}
+        try:
+            resp = supabase_call("posts.update", client.table("blog_posts").update(fields).eq("id", post_id).execute,
+                                 idempotent=False)
+            self._invalidate()
+            row = (resp.data or [None])[0] or {"id": post_id, **fields}
+            index_document("post", row)
+            return row
+        except Exception as e:
+            logging.getLogger(__name__).exception("Supabase update_post failed: %s", e)
+            return None
+
+    def posts_for_render(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Source rows for `flask render-posts`, in id order; errors propagate to the command."""
+        client = self.ctx.admin_client() or self.ctx.read_client()
+        if client is None:
+            return []
+        resp = supabase_call("posts.render_batch", client.table("blog_posts").select("id,title,content,render_version")
+                             .gt("id", after_id).order("id").limit(limit).execute)
+        return resp.data or []
+
+    def save_rendered(self, rows: List[Dict[str, Any]]) -> bool:
+        """Store re-rendered posts with one upsert; needs the service role key."""
+        client = self.ctx.admin_client()
+        if client is None:
+            logging.getLogger(__name__).error("Saving rendered posts needs SUPABASE_SERVICE_ROLE_KEY")
+            return False
+        # Upserted rows must carry every not-null column, hence title and content
+        payload = [{k: row[k] for k in ("id", "title", "content", *RENDERED_FIELDS)} for row in rows]
+        try:
+            supabase_call("posts.save_rendered", client.table("blog_posts").upsert(
+                payload, on_conflict="id", returning=ReturnMethod.minimal).execute, idempotent=False)
+            self._invalidate()
+            return True
+        except Exception as e:
+            logging.getLogger(__name__).exception("Supabase save_rendered failed: %s", e)
+            return False
+
     def delete_post(self, post_id: int) -> bool:
         client = self.ctx.user_client()
         if client is None:
             return False
         try:
-            client.table("blog_posts").delete().eq("id", post_id).execute()
+            supabase_call("posts.delete", client.table("blog_posts").delete().eq("id", post_id).execute,
+                          idempotent=False)
+            self._invalidate()
+            unindex_document("post", post_id)
             return True
         except Exception as e:
             logging.getLogger(__name__).exception("Supabase delete_post failed: %s", e)
@@ -199,24 +523,12 @@ class BlogRepo:
 
 
 def get_supabase_context_from_env() -> Optional[SupabaseContext]:
-    url = os.environ.get("SUPABASE_URL") or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
-    anon = os.environ.get("SUPABASE_KEY") or os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-    service = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-    if not url or not anon:
-        return None
-    return SupabaseContext(url, anon, service)
+    """Context for scripts running outside the app; views use current_settings().supabase."""
+    from .settings import Settings
+    return Settings.from_env().supabase
 
 
 def get_backend_mode() -> str:
-    """Return the selected data backend: 'supabase' or 'sqlite'.
-
-    Precedence:
-    - DATA_BACKEND env var if explicitly set to 'supabase' or 'sqlite'.
-    - Otherwise, auto-detect: if Supabase URL+KEY are present -> 'supabase', else 'sqlite'.
-    """
-    val = (os.environ.get("DATA_BACKEND") or "").strip().lower()
-    if val in ("supabase", "sqlite"):
-        return val
-    url = os.environ.get("SUPABASE_URL") or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
-    anon = os.environ.get("SUPABASE_KEY") or os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-    return "supabase" if (url and anon) else "sqlite"
\ No newline at end of file
+    """Return the selected data backend: 'supabase' or 'sqlite' (see Settings.from_env)."""
+    from .settings import Settings
+    return Settings.from_env().backend
@@ -0,0 +1,473 @@
+"""
+Supabase access tokens, checked without a network call.
+
+The access token kept in the session since login is a JWT signed by
+Supabase Auth. verify() checks its signature and claims locally: HS256
+tokens against SUPABASE_JWT_SECRET, RS256/ES256 tokens against the
+project's signing keys, fetched once from its JWKS endpoint and cached.
+Without a secret, or without the cryptography package for RS256/ES256, only
+the claims are checked. A verified token is remembered until it expires, so later requests only look
+it up.
+
+Membership of the `admins` table is cached per user id for ADMIN_CACHE_TTL
+seconds. Once a session's token has less than TOKEN_REFRESH_MARGIN seconds
+left, a background thread trades the refresh token for a new pair and the
+next request of that session picks it up. Only a token that is about to
+expire or already has is refreshed inline; if that fails, the session is
+logged out instead of letting admin writes fail with 401s.
+"""
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+from flask import Flask, current_app, flash, g, session
+from flask_login import current_user, logout_user
+
+from .supabase_pool import registry
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+    from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+except ImportError:  # optional: RS256/ES256 signatures go unchecked without it
+    hashes = None
+
+logger = logging.getLogger(__name__)
+
+AUDIENCE = "authenticated"
+# Seconds of clock skew tolerated on exp/nbf
+LEEWAY = 10
+# A token with less time left than this is refreshed before the request goes on
+MIN_VALIDITY = 30
+JWKS_TTL = 600
+# Least time between two JWKS fetches triggered by an unknown key id
+JWKS_RETRY = 30
+MEMO_SIZE = 1024
+SESSION_KEYS = ("supabase_token", "supabase_refresh_token")
+
+Pair = Tuple[str, str]
+
+
+class TokenError(ValueError):
+    """Raised when an access token is malformed, forged or expired."""
+
+
+def _b64decode(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def _b64int(part: str) -> int:
+    return int.from_bytes(_b64decode(part), "big")
+
+
+def decode_unverified(token: str) -> Tuple[Dict[str, Any], Dict[str, Any], bytes, bytes]:
+    """Header, claims, signing input and signature of a JWT, without checking anything."""
+    try:
+        header_b64, claims_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64decode(header_b64))
+        claims = json.loads(_b64decode(claims_b64))
+        signature = _b64decode(signature_b64)
+    except (ValueError, AttributeError) as exc:
+        raise TokenError(f"malformed token: {exc}") from exc
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise TokenError("malformed token")
+    return header, claims, f"{header_b64}.{claims_b64}".encode("ascii"), signature
+
+
+def _public_key(jwk: Dict[str, Any]) -> Any:
+    if jwk.get("kty") == "RSA":
+        return rsa.RSAPublicNumbers(_b64int(jwk["e"]), _b64int(jwk["n"])).public_key()
+    if jwk.get("kty") == "EC" and jwk.get("crv") == "P-256":
+        return ec.EllipticCurvePublicNumbers(_b64int(jwk["x"]), _b64int(jwk["y"]), ec.SECP256R1()).public_key()
+    raise TokenError(f"unsupported key type {jwk.get('kty')}")
+
+
+class TokenVerifier:
+    """Checks Supabase JWTs against the shared secret or the cached JWKS."""
+
+    def __init__(self, secret: Optional[str] = None, jwks_loader: Optional[Callable[[], Dict[str, Any]]] = None,
+                 leeway: float = LEEWAY):
+        self.secret = secret.encode("utf-8") if secret else None
+        self.jwks_loader = jwks_loader
+        self.leeway = leeway
+        self._keys: Dict[str, Any] = {}
+        self._keys_loaded_at = float("-inf")
+        self._memo: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.verified = 0
+        self.memo_hits = 0
+        self.failures = 0
+        self.unverified = 0
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid, unexpired token; raises TokenError otherwise."""
+        now = time.time()
+        with self._lock:
+            claims = self._memo.get(token)
+            if claims is not None:
+                self._memo.move_to_end(token)
+                self.memo_hits += 1
+        if claims is None:
+            try:
+                claims = self._verify(token, now)
+            except TokenError:
+                self.failures += 1
+                raise
+            with self._lock:
+                self._memo[token] = claims
+                while len(self._memo) > MEMO_SIZE:
+                    self._memo.popitem(last=False)
+                self.verified += 1
+        if float(claims["exp"]) + self.leeway < now:
+            raise TokenError("token expired")
+        return claims
+
+    def _verify(self, token: str, now: float) -> Dict[str, Any]:
+        header, claims, signing_input, signature = decode_unverified(token)
+        alg = header.get("alg")
+        if alg == "HS256" and self.secret is not None:
+            expected = hmac.new(self.secret, signing_input, hashlib.sha256).digest()
+            if not hmac.compare_digest(expected, signature):
+                raise TokenError("bad signature")
+        elif alg in ("RS256", "ES256") and self.jwks_loader is not None and hashes is not None:
+            self._verify_asymmetric(alg, header.get("kid"), signing_input, signature)
+        elif alg == "HS256" or (alg in ("RS256", "ES256") and hashes is None):
+            # No secret configured, or cryptography missing. The token came from
+            # Supabase at login and sits in the signed session cookie, so only its
+            # claims are checked
+            self.unverified += 1
+        else:
+            raise TokenError(f"cannot verify {alg} tokens")
+        if not isinstance(claims.get("exp"), (int, float)) or not claims.get("sub"):
+            raise TokenError("token lacks exp or sub")
+        if isinstance(claims.get("nbf"), (int, float)) and claims["nbf"] - self.leeway > now:
+            raise TokenError("token not yet valid")
+        audience = claims.get("aud")
+        if AUDIENCE != audience and AUDIENCE not in (audience if isinstance(audience, list) else ()):
+            raise TokenError("wrong audience")
+        return claims
+
+    def _verify_asymmetric(self, alg: str, kid: Optional[str], signing_input: bytes, signature: bytes) -> None:
+        key = self._signing_key(kid)
+        try:
+            if alg == "RS256":
+                key.verify(signature, signing_input, padding.PKCS1v15(), hashes.SHA256())
+            else:
+                if len(signature) != 64:
+                    raise TokenError("bad signature")
+                der = encode_dss_signature(int.from_bytes(signature[:32], "big"),
+                                           int.from_bytes(signature[32:], "big"))
+                key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+        except InvalidSignature as exc:
+            raise TokenError("bad signature") from exc
+
+    def _signing_key(self, kid: Optional[str]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            key = self._keys.get(kid or "")
+            stale = now - self._keys_loaded_at > JWKS_TTL
+            # Keys rotate: an unknown kid triggers a fetch, but at most every JWKS_RETRY s
+            may_fetch = stale or (key is None and now - self._keys_loaded_at > JWKS_RETRY)
+        if may_fetch:
+            self._load_keys(now)
+            with self._lock:
+                key = self._keys.get(kid or "")
+        if key is None:
+            raise TokenError(f"unknown signing key {kid!r}")
+        return key
+
+    def _load_keys(self, now: float) -> None:
+        try:
+            jwks = self.jwks_loader() or {}
+            keys = {}
+            for jwk in jwks.get("keys", []):
+                try:
+                    keys[jwk.get("kid") or ""] = _public_key(jwk)
+                except (TokenError, KeyError, ValueError):
+                    logger.warning("Skipping unusable JWKS key %s", jwk.get("kid"))
+        except Exception:
+            # Keep the keys we have; the retry interval stops a fetch per request
+            logger.warning("Could not fetch the Supabase signing keys", exc_info=True)
+            with self._lock:
+                self._keys_loaded_at = now
+            return
+        with self._lock:
+            self._keys, self._keys_loaded_at = keys, now
+
+
+class AdminCache:
+    """Per-user-id admin decisions, fresh for ttl seconds."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Tuple[Optional[bool], bool]:
+        """(decision or None, whether it is still fresh)."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None:
+            return None, False
+        return entry[0], entry[1] > time.monotonic()
+
+    def set(self, user_id: str, is_admin: bool) -> None:
+        with self._lock:
+            self._entries[user_id] = (is_admin, time.monotonic() + self.ttl)
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+class TokenManager:
+    """Verification, admin decisions and refreshes for the sessions of one process."""
+
+    def __init__(self, verifier: TokenVerifier, admin_ttl: float = 300, refresh_margin: float = 300,
+                 refresher: Optional[Callable[[str], Pair]] = None,
+                 admin_loader: Optional[Callable[[str, str], bool]] = None):
+        self.verifier = verifier
+        self.admins = AdminCache(admin_ttl)
+        self.refresh_margin = refresh_margin
+        self.refresher = refresher
+        self.admin_loader = admin_loader
+        self._lock = threading.Lock()
+        # Refresh tokens are single-use: the new pair is kept for every request
+        # that still carries the old one, until the new access token expires
+        self._refreshed: Dict[str, Tuple[Pair, float]] = {}
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._pid = os.getpid()
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    # ---------- Admin decisions ----------
+    def is_admin(self, user_id: str, token: str) -> bool:
+        """Cached membership of the admins table; loaded with the user's token when stale."""
+        decision, fresh = self.admins.get(user_id)
+        if fresh:
+            self.admins.hits += 1
+            return bool(decision)
+        self.admins.misses += 1
+        try:
+            decision = bool(self.admin_loader(user_id, token)) if self.admin_loader else False
+        except Exception:
+            logger.warning("Admin check for %s failed", user_id, exc_info=True)
+            # A previous decision beats locking the admin out during a Supabase blip
+            return bool(decision)
+        self.admins.set(user_id, decision)
+        return decision
+
+    # ---------- Refresh ----------
+    def _check_fork(self) -> None:
+        if self._pid != os.getpid():
+            with self._lock:
+                self._refreshed.clear()
+                self._in_flight.clear()
+                self._pid = os.getpid()
+
+    def refreshed(self, refresh_token: str) -> Optional[Pair]:
+        """The pair that replaced refresh_token, if a refresh finished."""
+        self._check_fork()
+        with self._lock:
+            entry = self._refreshed.get(refresh_token)
+        return entry[0] if entry is not None else None
+
+    def refresh(self, refresh_token: str, wait: bool) -> Optional[Pair]:
+        """Start (or join) the refresh of refresh_token; with wait, return its result."""
+        self._check_fork()
+        if self.refresher is None or not refresh_token:
+            return None
+        with self._lock:
+            if refresh_token in self._refreshed:
+                return self._refreshed[refresh_token][0]
+            done = self._in_flight.get(refresh_token)
+            starter = done is None
+            if starter:
+                done = self._in_flight[refresh_token] = threading.Event()
+        if starter:
+            if wait:
+                self._run_refresh(refresh_token, done)
+            else:
+                threading.Thread(target=self._run_refresh, args=(refresh_token, done),
+                                 name="token-refresh", daemon=True).start()
+                return None
+        elif not wait:
+            return None
+        done.wait(timeout=15)
+        return self.refreshed(refresh_token)
+
+    def _run_refresh(self, refresh_token: str, done: threading.Event) -> None:
+        try:
+            access, new_refresh = self.refresher(refresh_token)
+            expires = float(decode_unverified(access)[1].get("exp") or time.time() + self.refresh_margin)
+            now = time.time()
+            with self._lock:
+                self._refreshed = {k: v for k, v in self._refreshed.items() if v[1] > now}
+                self._refreshed[refresh_token] = ((access, new_refresh), expires)
+            self.refreshes += 1
+        except Exception:
+            self.refresh_failures += 1
+            logger.warning("Refreshing a Supabase session failed", exc_info=True)
+        finally:
+            with self._lock:
+                self._in_flight.pop(refresh_token, None)
+            done.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "verified": self.verifier.verified,
+            "verify_memo_hits": self.verifier.memo_hits,
+            "verify_failures": self.verifier.failures,
+            "unverified_signatures": self.verifier.unverified,
+            "admin_cache_hits": self.admins.hits,
+            "admin_cache_misses": self.admins.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+
+# ---------- Supabase Auth over HTTP ----------
+_http: Dict[Tuple[int, int], httpx.Client] = {}
+
+
+def _auth_http() -> httpx.Client:
+    # registry.transport routes benchmark and test traffic to an in-process fake
+    key = (os.getpid(), id(registry.transport))
+    client = _http.get(key)
+    if client is None:
+        _http.clear()
+        client = _http[key] = httpx.Client(timeout=10, transport=registry.transport)
+    return client
+
+
+def _supabase() -> Tuple[Optional[str], Optional[str]]:
+    from .settings import current_settings
+
+    ctx = current_settings().supabase
+    return (ctx.url, ctx.anon_key) if ctx is not None else (None, None)
+
+
+def _fetch_jwks(url: str, anon_key: str) -> Dict[str, Any]:
+    response = _auth_http().get(f"{url}/auth/v1/.well-known/jwks.json", headers={"apikey": anon_key})
+    response.raise_for_status()
+    return response.json()
+
+
+def _refresh_session(url: str, anon_key: str, refresh_token: str) -> Pair:
+    response = _auth_http().post(f"{url}/auth/v1/token", params={"grant_type": "refresh_token"},
+                                 headers={"apikey": anon_key}, json={"refresh_token": refresh_token})
+    response.raise_for_status()
+    body = response.json()
+    return body["access_token"], body["refresh_token"]
+
+
+def _load_admin(user_id: str, token: str) -> bool:
+    from .settings import current_settings
+
+    ctx = current_settings().supabase
+    client = ctx.user_client(token) if ctx is not None else None
+    if client is None:
+        return False
+    result = client.table("admins").select("user_id").eq("user_id", user_id).limit(1).execute()
+    return bool(result.data)
+
+
+# ---------- Flask integration ----------
+def get_token_manager() -> Optional[TokenManager]:
+    return current_app.extensions.get("tokens")
+
+
+def clear_auth_session() -> None:
+    for key in SESSION_KEYS + ("user_details",):
+        session.pop(key, None)
+    logout_user()
+
+
+def _check_session_token() -> None:
+    """Verify the session's Supabase token; refresh it ahead of expiry or log the session out."""
+    token = session.get("supabase_token")
+    manager = get_token_manager()
+    if not token or manager is None:
+        return
+    refresh_token = session.get("supabase_refresh_token")
+    replaced = manager.refreshed(refresh_token) if refresh_token else None
+    if replaced is not None:
+        # A background refresh finished since this session's last request
+        token, refresh_token = replaced
+        session["supabase_token"], session["supabase_refresh_token"] = replaced
+    try:
+        claims = manager.verifier.verify(token)
+        left = float(claims["exp"]) - time.time()
+    except TokenError as exc:
+        claims, left = None, 0.0
+        logger.info("Session token rejected: %s", exc)
+    if left < MIN_VALIDITY and refresh_token:
+        replaced = manager.refresh(refresh_token, wait=True)
+        if replaced is not None:
+            session["supabase_token"], session["supabase_refresh_token"] = replaced
+            try:
+                claims = manager.verifier.verify(replaced[0])
+            except TokenError as exc:
+                claims = None
+                logger.warning("Refreshed token rejected: %s", exc)
+    elif left < manager.refresh_margin and refresh_token:
+        manager.refresh(refresh_token, wait=False)
+    if claims is None:
+        clear_auth_session()
+        flash("Your session has expired. Please log in again.", "warning")
+        return
+    g.token_claims = claims
+
+
+def current_user_is_admin() -> bool:
+    """Admin check for admin views: the signed session, the verified token and the cached decision."""
+    if not current_user.is_authenticated or getattr(current_user, "role", None) != "admin":
+        return False
+    claims = g.get("token_claims")
+    manager = get_token_manager()
+    if claims is None or manager is None:
+        # Sessions without a Supabase token cannot write to Supabase anyway
+        return True
+    return manager.is_admin(claims["sub"], session["supabase_token"])
+
+
+def init_tokens(app: Flask) -> None:
+    """Local token checks (SUPABASE_JWT_SECRET, ADMIN_CACHE_TTL, TOKEN_REFRESH_MARGIN)."""
+
+    def jwks() -> Dict[str, Any]:
+        # Also called from background threads, which need the app context for the settings
+        with app.app_context():
+            url, anon_key = _supabase()
+        return _fetch_jwks(url, anon_key) if url else {}
+
+    def refresh(refresh_token: str) -> Pair:
+        with app.app_context():
+            url, anon_key = _supabase()
+        if not url:
+            raise RuntimeError("Supabase is not configured")
+        return _refresh_session(url, anon_key, refresh_token)
+
+    secret = app.config.get("SUPABASE_JWT_SECRET") or None
+    manager = TokenManager(
+        TokenVerifier(secret, jwks_loader=jwks),
+        admin_ttl=float(app.config.get("ADMIN_CACHE_TTL") or 300),
+        refresh_margin=float(app.config.get("TOKEN_REFRESH_MARGIN") or 300),
+        refresher=refresh,
+        admin_loader=_load_admin,
+    )
+    app.extensions["tokens"] = manager
+    app.before_request(_check_session_token)
+
+    from .metrics import metrics
+    metrics.register_collector("tokens", manager.stats)
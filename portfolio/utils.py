@@ -1,6 +1,6 @@
 
 import os
-from flask import render_template
+from flask import current_app, render_template
 from flask_mail import Mail, Message as MailMessage
 from email_validator import validate_email as _validate_email, EmailNotValidError
 import logging
@@ -17,4 +17,21 @@ def send_email(subject, recipients, template, **kwargs):
     try:
         mail.send(msg)
     except Exception as e:
-        logger.exception(f"Failed to send email: {e}")
\ No newline at end of file
+        logger.exception("Failed to send email: %s", e)
+
+def queue_email(subject, recipients, template, reply_to=None, **kwargs):
+    """Render a templated email and hand it to the background outbox.
+
+    Falls back to sending inline when the mail queue is disabled.
+    """
+    from .mail_queue import get_worker
+
+    app = current_app._get_current_object()
+    queue = app.extensions.get('mail_queue')
+    if queue is None:
+        send_email(subject, recipients, template, **kwargs)
+        return
+    queue.enqueue(subject, list(recipients), render_template(template, **kwargs), reply_to=reply_to)
+    worker = get_worker(app)
+    if worker is not None:
+        worker.notify()
@@ -0,0 +1,77 @@
+"""
+Work done before a worker serves its first request.
+
+Jinja compiles each template to Python code the first time a process
+renders it. With TEMPLATE_CACHE on, the compiled code is also written to
+TEMPLATE_CACHE_DIR, so any later process only loads it from disk; build it
+at deploy time with `flask build-templates`. When gunicorn preloads the app
+(gunicorn.conf.py), warm_templates() compiles everything once in the master
+and the forked workers share that memory copy-on-write. After the fork,
+warm_connections() opens each worker's Supabase connection before the
+worker accepts requests.
+"""
+import os
+import time
+import logging
+from typing import Any, Optional
+
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache, TemplateError
+
+logger = logging.getLogger(__name__)
+
+
+def init_templates(app: Flask) -> None:
+    """Attach the on-disk bytecode cache (TEMPLATE_CACHE, TEMPLATE_CACHE_DIR) and the CLI."""
+    app.jinja_env.auto_reload = bool(app.config.get("TEMPLATES_AUTO_RELOAD"))
+    if str(app.config.get("TEMPLATE_CACHE", "on")).lower() not in ("off", "false", "0"):
+        directory = app.config.get("TEMPLATE_CACHE_DIR") or os.path.join(app.instance_path, "jinja_cache")
+        os.makedirs(directory, exist_ok=True)
+        # Entries carry a checksum of the template source, so edited templates recompile
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+    @app.cli.command("build-templates")
+    def build_templates_command() -> None:
+        """Compile every template into the bytecode cache."""
+        count = warm_templates(app)
+        cache = app.jinja_env.bytecode_cache
+        where = f" into {cache.directory}" if isinstance(cache, FileSystemBytecodeCache) else ""
+        print(f"Compiled {count} templates{where}.")
+
+
+def warm_templates(app: Flask) -> int:
+    """Load every template into the environment's cache; returns how many loaded."""
+    started = time.perf_counter()
+    loaded = 0
+    for name in app.jinja_env.list_templates(extensions=("html", "txt", "xml")):
+        try:
+            app.jinja_env.get_template(name)
+            loaded += 1
+        except TemplateError:
+            logger.exception("Template %s failed to compile", name)
+    logger.info("Compiled %d templates in %.0f ms", loaded, (time.perf_counter() - started) * 1000)
+    return loaded
+
+
+def warm_connections(app: Flask) -> None:
+    """Open this process's pooled Supabase connection with one small read."""
+    from .settings import current_settings
+
+    with app.app_context():
+        ctx = current_settings().supabase
+    client = ctx.read_client() if ctx is not None else None
+    if client is None:
+        return
+    try:
+        client.table("projects").select("id").limit(1).execute()
+    except Exception:
+        # The first request retries on its own; a slow Supabase must not stop the worker
+        logger.warning("Supabase warm-up request failed", exc_info=True)
+
+
+def flask_app_of(wsgi: Any) -> Optional[Flask]:
+    """The Flask app behind what gunicorn loaded: the app itself or the ASGI adapter."""
+    if isinstance(wsgi, Flask):
+        return wsgi
+    inner = getattr(wsgi, "wsgi_app", None)
+    return inner if isinstance(inner, Flask) else None
@@ -5,10 +5,7 @@ ROOT = Path(__file__).resolve().parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-# Load the app and alias package via WSGI loader
-import wsgi  # noqa: F401
-
-from hammed import migrate_to_supabase as mig
+from portfolio.migration import main
 
 if __name__ == "__main__":
-    raise SystemExit(mig.main())
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+import time
+import asyncio
+
+import httpx
+from flask import Flask, request
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_supabase import ANON_KEY, URL, FakeSupabase
+from portfolio.aio import run_concurrently
+from portfolio.asgi import WsgiToAsgi
+from portfolio.supabase_repo import BlogRepo, ProjectRepo, SupabaseContext
+
+
+class ConcurrentReadsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeSupabase(latency=0.1)
+        self.fake.seed_posts(3)
+        self.fake.seed_projects(2)
+        self.fake.install()
+        ctx = SupabaseContext(URL, ANON_KEY)
+        self.projects, self.posts = ProjectRepo(ctx, cache=None), BlogRepo(ctx, cache=None)
+
+    def test_independent_reads_overlap(self):
+        started = time.perf_counter()
+        projects, posts, nothing = run_concurrently(self.projects.alist_projects(), self.posts.alist_posts(), None)
+        elapsed = time.perf_counter() - started
+        self.assertEqual([p['title'] for p in projects], ['Project 1', 'Project 0'])
+        self.assertEqual([p['title'] for p in posts], ['Post 2', 'Post 1', 'Post 0'])
+        self.assertIsNone(nothing)
+        # Two 100 ms calls, one after the other, would take 200 ms
+        self.assertLess(elapsed, 0.19)
+
+    def test_failures_return_empty_like_the_sync_methods(self):
+        # The first try and both retries
+        self.fake.fail_next = 3
+        self.assertEqual(run_concurrently(self.projects.alist_projects()), [[]])
+
+
+class WsgiToAsgiTestCase(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+
+        @app.route('/echo', methods=['POST'])
+        def echo():
+            return {'path': request.path, 'script': request.script_root, 'args': request.args.to_dict(),
+                    'body': request.get_data(as_text=True), 'agent': request.headers.get('User-Agent')}
+
+        @app.route('/stream')
+        def stream():
+            return app.response_class((str(i) for i in range(3)), mimetype='text/plain')
+
+        @app.route('/boom')
+        def boom():
+            raise RuntimeError('boom')
+
+        self.asgi = WsgiToAsgi(app, threads=4)
+
+    def request(self, method, url, **kwargs):
+        async def go():
+            async with httpx.AsyncClient(app=self.asgi, base_url='http://test') as client:
+                return await client.request(method, url, **kwargs)
+        return asyncio.run(go())
+
+    def test_request_reaches_the_wsgi_app(self):
+        response = self.request('POST', '/echo?q=caf%C3%A9', content=b'x' * 5000, headers={'User-Agent': 'ua'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'path': '/echo', 'script': '', 'args': {'q': 'café'},
+                                           'body': 'x' * 5000, 'agent': 'ua'})
+
+    def test_chunked_body_is_buffered_and_sized(self):
+        async def chunks():
+            for part in (b'abc', b'def', b'ghi'):
+                yield part
+        response = self.request('POST', '/echo', content=chunks())
+        self.assertEqual(response.json()['body'], 'abcdefghi')
+
+    def test_oversized_body_is_refused(self):
+        self.asgi.wsgi_app.config['MAX_CONTENT_LENGTH'] = 4
+        async def chunks():
+            for part in (b'abc', b'def'):
+                yield part
+        self.assertEqual(self.request('POST', '/echo', content=chunks()).status_code, 413)
+        self.assertEqual(self.request('POST', '/echo', content=b'abc').json()['body'], 'abc')
+
+    def test_streamed_body_and_errors(self):
+        self.assertEqual(self.request('GET', '/stream').text, '012')
+        self.assertEqual(self.request('GET', '/boom').status_code, 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
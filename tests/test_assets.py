@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, url_for
+
+from portfolio.assets import build_assets, init_assets, subset_fontawesome_css
+
+
+class AssetPipelineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, 'static', 'img'))
+        os.makedirs(os.path.join(root, 'templates'))
+        with open(os.path.join(root, 'static', 'img', 'bg.png'), 'wb') as fh:
+            fh.write(b'\x89PNG\r\n\x1a\n' + b'0' * 64)
+        with open(os.path.join(root, 'static', 'site.css'), 'w') as fh:
+            fh.write('body { background: url("img/bg.png"); }\n' * 40)
+        with open(os.path.join(root, 'templates', 'index.html'), 'w') as fh:
+            fh.write('<i class="fab fa-github"></i>')
+        self.app = Flask(__name__, static_folder=os.path.join(root, 'static'),
+                         template_folder=os.path.join(root, 'templates'))
+        init_assets(self.app)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_subset_keeps_only_used_glyphs(self):
+        css = '.fa-github:before {\n  content: "\\f09b"; }\n\n.fa-gitlab:before {\n  content: "\\f296"; }\n'
+        subset, codepoints = subset_fontawesome_css(css, {'github'})
+        self.assertIn('fa-github', subset)
+        self.assertNotIn('fa-gitlab', subset)
+        self.assertEqual(codepoints, {0xf09b})
+
+    def test_hashed_urls_and_rewritten_css(self):
+        manifest = self.app.extensions['asset_manifest']
+        with self.app.test_request_context():
+            url = url_for('static', filename='site.css')
+        self.assertEqual(url, '/static/' + manifest['site.css'])
+        with open(os.path.join(self.app.static_folder, manifest['site.css'])) as fh:
+            self.assertIn(os.path.basename(manifest['img/bg.png']), fh.read())
+
+    def test_precompressed_and_immutable(self):
+        url = '/static/' + self.app.extensions['asset_manifest']['site.css']
+        client = self.app.test_client()
+        resp = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(resp.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(resp.mimetype, 'text/css')
+        self.assertIn('immutable', resp.headers['Cache-Control'])
+        self.assertIn('Accept-Encoding', resp.headers['Vary'])
+        resp = client.get(url, headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', resp.headers)
+
+    def test_rebuild_is_deterministic(self):
+        first = dict(self.app.extensions['asset_manifest'])
+        self.assertEqual(build_assets(self.app.static_folder, self.app.template_folder), first)
+
+    def _fresh_app(self, **config):
+        app = Flask(__name__, static_folder=self.app.static_folder, template_folder=self.app.template_folder)
+        app.config.update(config)
+        init_assets(app)
+        return app.extensions['asset_manifest']
+
+    def test_changed_sources_trigger_a_rebuild(self):
+        old = self.app.extensions['asset_manifest']
+        self.assertEqual(self._fresh_app(), old)
+        with open(os.path.join(self.app.static_folder, 'site.css'), 'a') as fh:
+            fh.write('main { color: red; }\n')
+        # Without auto-build the stale manifest is still served
+        self.assertEqual(self._fresh_app(ASSETS_AUTO_BUILD='off'), old)
+        new = self._fresh_app()
+        self.assertNotEqual(new['site.css'], old['site.css'])
+        self.assertEqual(new['img/bg.png'], old['img/bg.png'])
+        with open(os.path.join(self.app.static_folder, new['site.css'])) as fh:
+            self.assertIn('color: red', fh.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
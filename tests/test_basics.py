@@ -6,6 +6,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from portfolio.app import create_app
+from portfolio.page_cache import _page_key
 
 class BasicsTestCase(unittest.TestCase):
     def setUp(self):
@@ -25,4 +26,31 @@ class BasicsTestCase(unittest.TestCase):
 
     def test_index_page(self):
         response = self.client.get('/')
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+    def test_index_page_conditional_get(self):
+        response = self.client.get('/')
+        etag = response.headers.get('ETag')
+        self.assertIsNotNone(etag)
+        self.assertIn('Last-Modified', response.headers)
+        cached = self.client.get('/', headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_page_key_ignores_unread_query_args(self):
+        with self.app.test_request_context('/portfolio.html?x=1&tech=flask&utm_source=a&tech=python'):
+            self.assertEqual(_page_key(), 'page:/portfolio.html?tech=flask&tech=python')
+        with self.app.test_request_context('/?x=2'):
+            self.assertEqual(_page_key(), 'page:/?')
+
+    def test_contact_page_not_cached(self):
+        # The contact form embeds a per-session CSRF token
+        response = self.client.get('/contact.html')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_admin_projects_page_renders(self):
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = 'admin-id'
+            sess['user_details'] = {'id': 'admin-id', 'username': 'admin@example.com', 'role': 'admin'}
+        response = self.client.get('/admin/projects')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,30 @@
+import unittest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.bench_routes import compare, percentile
+
+
+class RegressionCheckTestCase(unittest.TestCase):
+    baseline = {'/': {'rps': 1000.0, 'p95_ms': 10.0}}
+
+    def test_within_threshold_passes(self):
+        current = {'/': {'rps': 900.0, 'p95_ms': 11.0, 'errors': 0}}
+        self.assertEqual(compare(current, self.baseline, 0.25), [])
+
+    def test_throughput_and_latency_regressions_fail(self):
+        current = {'/': {'rps': 500.0, 'p95_ms': 30.0, 'errors': 0}}
+        problems = compare(current, self.baseline, 0.25)
+        self.assertEqual(len(problems), 2)
+
+    def test_percentile(self):
+        samples = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(samples, 50), 50.0)
+        self.assertEqual(percentile(samples, 99), 99.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.cache import MemoryBackend, RepoCache, SQLiteBackend
+
+
+class RepoCacheTestCase(unittest.TestCase):
+    def test_hit_after_first_load(self):
+        cache = RepoCache(MemoryBackend(), ttl=60)
+        calls = []
+        loader = lambda: calls.append(1) or ['row']
+        self.assertEqual(cache.get_or_load('k', loader), ['row'])
+        self.assertEqual(cache.get_or_load('k', loader), ['row'])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_lru_eviction(self):
+        cache = RepoCache(MemoryBackend(max_entries=2), ttl=60)
+        for key in ('a', 'b', 'c'):
+            cache.get_or_load(key, lambda: key)
+        self.assertIsNone(cache.backend.get('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_invalidate_prefix(self):
+        cache = RepoCache(MemoryBackend(), ttl=60)
+        cache.get_or_load('blog:list', lambda: [1])
+        cache.get_or_load('projects:list', lambda: [2])
+        cache.invalidate('blog:')
+        self.assertIsNone(cache.backend.get('blog:list'))
+        self.assertIsNotNone(cache.backend.get('projects:list'))
+
+    def test_failing_loader_serves_stale(self):
+        cache = RepoCache(MemoryBackend(), ttl=60, stale_ttl=60)
+        cache.backend.set('k', ['old'], time.time() - 1000)
+        cache.stale_ttl = 0.0
+        with self.assertRaises(RuntimeError):
+            cache.get_or_load('k', self._boom)
+        # Past the stale window the loader runs inline; its failure falls back to the old value
+        cache.stale_ttl = 100.0
+        self.assertEqual(cache.get_or_load('k', self._boom), ['old'])
+        self.assertEqual(cache.stats()['load_errors'], 2)
+
+    def test_failing_background_refresh_keeps_stale_value(self):
+        cache = RepoCache(MemoryBackend(), ttl=60, stale_ttl=5000)
+        cache.backend.set('k', ['old'], time.time() - 1000)
+        self.assertEqual(cache.get_or_load('k', self._boom), ['old'])
+        deadline = time.time() + 2
+        while cache._refreshing and time.time() < deadline:
+            time.sleep(0.01)
+        stats = cache.stats()
+        self.assertEqual((stats['load_errors'], stats['refreshes']), (1, 0))
+        self.assertEqual(cache.backend.get('k')[0], ['old'])
+        self.assertEqual(cache.get_or_load('k', self._boom), ['old'])
+
+    def test_sqlite_backend_is_shared(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.db')
+            writer = RepoCache(SQLiteBackend(path), ttl=60)
+            reader = RepoCache(SQLiteBackend(path), ttl=60)
+            writer.get_or_load('projects:list', lambda: [{'id': 1}])
+            self.assertEqual(reader.get_or_load('projects:list', self._boom), [{'id': 1}])
+            writer.invalidate('projects:')
+            self.assertIsNone(reader.backend.get('projects:list'))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    def test_sqlite_backend_reconnects_after_fork(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteBackend(os.path.join(tmp, 'cache.db'))
+            inherited = backend._conn()
+            pid = os.fork()
+            if pid == 0:
+                ok = False
+                try:
+                    ok = backend._conn() is not inherited
+                    backend.set('k', 'from child', time.time())
+                finally:
+                    os._exit(0 if ok else 1)
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+            self.assertIs(backend._conn(), inherited)
+            self.assertEqual(backend.get('k')[0], 'from child')
+
+    @staticmethod
+    def _boom():
+        raise RuntimeError('supabase down')
@@ -0,0 +1,128 @@
+import unittest
+import sys
+import os
+import gzip
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, Response, stream_with_context
+
+from portfolio.app import create_app
+from portfolio.compression import CompressionMiddleware, LoadMonitor, negotiate
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PAGE = ('<p>' + 'portfolio ' * 500 + '</p>').encode()
+
+
+class _FixedLoad(LoadMonitor):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+    def load(self):
+        return self.value
+
+
+def _demo_app(monitor=None):
+    app = Flask(__name__)
+
+    @app.route('/page')
+    def page():
+        return Response(PAGE, mimetype='text/html')
+
+    @app.route('/small')
+    def small():
+        return 'tiny'
+
+    @app.route('/image')
+    def image():
+        return Response(PAGE, mimetype='image/png')
+
+    @app.route('/stream')
+    def stream():
+        return Response(stream_with_context(iter([PAGE, PAGE])), mimetype='text/html')
+
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, monitor=monitor)
+    return app
+
+
+class NegotiationTestCase(unittest.TestCase):
+    def test_preference_and_q_values(self):
+        self.assertEqual(negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate('gzip;q=1.0, br;q=0.5'), 'gzip')
+        self.assertIsNone(negotiate('identity'))
+        self.assertIsNone(negotiate('gzip;q=0'))
+        if brotli is not None:
+            self.assertEqual(negotiate('gzip, deflate, br'), 'br')
+
+
+class CompressionMiddlewareTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = _demo_app()
+        self.client = self.app.test_client()
+
+    def test_buffered_page_is_gzipped_with_a_length(self):
+        response = self.client.get('/page', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertEqual(gzip.decompress(response.data), PAGE)
+        # Identity clients get the same page, still marked as varying
+        plain = self.client.get('/page')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual((plain.data, plain.headers['Vary']), (PAGE, 'Accept-Encoding'))
+
+    def test_small_and_binary_bodies_pass_through(self):
+        for path in ('/small', '/image'):
+            response = self.client.get(path, headers={'Accept-Encoding': 'gzip'})
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertNotIn('Vary', response.headers)
+
+    def test_streamed_responses_are_compressed_per_chunk(self):
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        self.assertNotIn('Content-Length', response.headers)
+        chunks = list(response.response)
+        self.assertGreaterEqual(len(chunks), 2)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), PAGE * 2)
+        stats = self.app.wsgi_app.stats.snapshot()
+        self.assertEqual((stats['responses'], stats['bytes_in']), (1, len(PAGE) * 2))
+
+    def test_level_drops_under_load(self):
+        levels = []
+        for load in (0.1, 0.8, 3.0):
+            app = _demo_app(_FixedLoad(load))
+            _, args, _ = app.wsgi_app.plan('200 OK', [('Content-Type', 'text/html')], 'gzip')
+            levels.append(args[1])
+        self.assertEqual(levels, [6, 4, 1])
+
+
+class CompressedPagesTestCase(unittest.TestCase):
+    def setUp(self):
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['RATELIMIT_STORAGE_URI'] = 'memory://'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        os.environ.pop('RATELIMIT_STORAGE_URI', None)
+
+    def test_cached_pages_get_weak_etags_that_revalidate(self):
+        response = self.client.get('/about.html', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn(b'</html>', gzip.decompress(response.data))
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        again = self.client.get('/about.html', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.app.extensions['compression'].stats.snapshot()['responses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import io
+import time
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_supabase import sign_token
+from portfolio.app import create_app
+from portfolio.facets import FacetIndex, parse_tech_stack
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class FacetIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = FacetIndex(os.path.join(self.tmp.name, 'facets.pickle'))
+        self.index.build('test', [
+            {'id': 1, 'title': 'Site', 'tech_stack': 'Python, Flask'},
+            {'id': 2, 'title': 'Polls', 'tech_stack': 'Next.js; Postgres / JS'},
+            {'id': 3, 'title': 'API', 'tech_stack': 'python, FastAPI, postgresql'},
+        ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def ids(self, tags, match_all=True):
+        return [row['id'] for row in self.index.select(tags, match_all)]
+
+    def test_tech_stack_normalization(self):
+        self.assertEqual(parse_tech_stack('Python, python , Node.js | Tailwind\n'),
+                         [('python', 'Python'), ('nodejs', 'Node.js'), ('tailwindcss', 'Tailwind')])
+        self.assertEqual(parse_tech_stack(None), [])
+
+    def test_and_or_filters(self):
+        self.assertEqual(self.ids(['python']), [3, 1])
+        self.assertEqual(self.ids(['python', 'postgresql']), [3])
+        self.assertEqual(self.ids(['flask', 'nextjs'], match_all=False), [2, 1])
+        self.assertEqual(self.ids(['python', 'cobol']), [])
+
+    def test_counts_follow_the_selection(self):
+        counts = {f['tag']: f['count'] for f in self.index.counts([])}
+        self.assertEqual(counts['python'], 2)
+        self.assertEqual(counts['postgresql'], 2)
+        narrowed = {f['tag']: f['count'] for f in self.index.counts(['python'])}
+        self.assertEqual(narrowed, {'python': 2, 'flask': 1, 'fastapi': 1, 'postgresql': 1})
+
+    def test_writes_keep_lists_sorted_and_persisted(self):
+        self.index.add({'id': 4, 'title': 'Bot', 'tech_stack': 'TypeScript, Python'})
+        self.index.update(1, {'tech_stack': 'Rust'})
+        self.index.remove(3)
+        self.assertEqual(self.index.tags['python'], [4])
+        self.assertNotIn('fastapi', self.index.tags)
+        worker = FacetIndex(self.index.path)
+        self.assertTrue(worker.load())
+        self.assertEqual([row['title'] for row in worker.select(['rust'])], ['Site'])
+
+
+class PortfolioFilterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['RATELIMIT_STORAGE_URI'] = 'memory://'
+        os.environ['DATA_BACKEND'] = 'sqlite'
+        os.environ['SQLITE_PATH'] = os.path.join(self.tmp.name, 'portfolio.db')
+        os.environ['FACET_INDEX_PATH'] = os.path.join(self.tmp.name, 'facets.pickle')
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        for key in ('RATELIMIT_STORAGE_URI', 'DATA_BACKEND', 'SQLITE_PATH', 'FACET_INDEX_PATH'):
+            os.environ.pop(key, None)
+        self.tmp.cleanup()
+
+    def test_tech_query_filters_projects(self):
+        self.client.get('/portfolio.html')
+        repo = self.app.extensions['settings'].settings.project_repo()
+        with self.app.test_request_context():
+            repo.create_project('Flask site', 'd', None, None, 'Python, Flask')
+            repo.create_project('Rust tool', 'd', None, None, 'Rust')
+        both = self.client.get('/portfolio.html?tech=python&tech=flask').data
+        self.assertIn(b'Flask site', both)
+        self.assertNotIn(b'Rust tool', both)
+        either = self.client.get('/portfolio.html?tech=flask&tech=rust&match=any').data
+        self.assertIn(b'Flask site', either)
+        self.assertIn(b'Rust tool', either)
+        self.assertIn(b'facet-count', self.client.get('/portfolio.html').data)
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_filtered_page_shows_variants_of_a_new_upload(self):
+        self.app.config['WTF_CSRF_ENABLED'] = False
+        self.client.get('/portfolio.html?tech=rust')
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = 'admin-id'
+            sess['user_details'] = {'id': 'admin-id', 'username': 'admin@example.com', 'role': 'admin'}
+            sess['supabase_token'] = sign_token('admin-id')
+        # No admins table in sqlite mode; seed the cached decision
+        self.app.extensions['tokens'].admins.set('admin-id', True)
+        image = io.BytesIO()
+        Image.new('RGB', (700, 400), (20, 90, 200)).save(image, format='PNG')
+        image.seek(0)
+        response = self.client.post('/admin/projects', data={
+            'title': 'Rust tool', 'description': 'd', 'tech_stack': 'Rust', 'image_file': (image, 'shot.png'),
+        })
+        self.assertEqual(response.status_code, 302)
+        # Variants are attached by a background job
+        index = self.app.extensions['facet_index']
+        deadline = time.time() + 10
+        while 'webp' not in (index.select(['rust'])[0].get('image_variants') or {}) and time.time() < deadline:
+            time.sleep(0.05)
+        page = self.client.get('/portfolio.html?tech=rust').data
+        self.assertIn(b'Rust tool', page)
+        self.assertIn(b'<source type="image/webp"', page)
+
+
+if __name__ == '__main__':
+    unittest.main()
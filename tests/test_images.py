@@ -0,0 +1,126 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.app import create_app
+from portfolio.images import (
+    UploadRejected, build_variants, schedule_variants, sniff_image_type, spool_upload, srcset,
+)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def _png(width, height):
+    buf = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 60, 20)).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+class _RecordingRepo:
+    def __init__(self):
+        self.uploads, self.updates = [], []
+
+    def upload_image(self, data, filename, content_type, token=None):
+        self.uploads.append((filename, content_type, len(data)))
+        return f'https://cdn.example/{filename}'
+
+    def update_project(self, project_id, fields, token=None):
+        self.updates.append((project_id, fields))
+        return True
+
+
+class UploadValidationTestCase(unittest.TestCase):
+    def test_type_is_sniffed_from_magic_bytes(self):
+        self.assertEqual(sniff_image_type(b'\x89PNG\r\n\x1a\n' + b'\0' * 8), 'image/png')
+        self.assertEqual(sniff_image_type(b'\xff\xd8\xff\xe0'), 'image/jpeg')
+        self.assertEqual(sniff_image_type(b'RIFF\0\0\0\0WEBPVP8 '), 'image/webp')
+        self.assertIsNone(sniff_image_type(b'<svg xmlns="http://www.w3.org/2000/svg">'))
+
+    def test_spool_accepts_images_and_rejects_the_rest(self):
+        data = b'GIF89a' + b'\0' * 100_000
+        path, size, mimetype = spool_upload(io.BytesIO(data), max_bytes=200_000)
+        try:
+            self.assertEqual((size, mimetype), (len(data), 'image/gif'))
+            with open(path, 'rb') as fh:
+                self.assertEqual(fh.read(), data)
+        finally:
+            os.unlink(path)
+        before = set(os.listdir(tempfile.gettempdir()))
+        for stream, max_bytes in ((io.BytesIO(b'#!/bin/sh\n'), 1000), (io.BytesIO(b''), 1000),
+                                  (io.BytesIO(data), 50_000)):
+            with self.assertRaises(UploadRejected):
+                spool_upload(stream, max_bytes=max_bytes)
+        # Rejected uploads leave no temp files behind
+        self.assertEqual(set(os.listdir(tempfile.gettempdir())) - before, set())
+
+    def test_srcset_orders_by_width(self):
+        self.assertEqual(srcset({'640': 'b.webp', '320': 'a.webp'}), 'a.webp 320w, b.webp 640w')
+        self.assertEqual(srcset(None), '')
+
+
+@unittest.skipIf(Image is None, 'Pillow is not installed')
+class VariantTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.png')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(_png(900, 600))
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def test_variants_are_never_upscaled(self):
+        variants = build_variants(self.path)
+        self.assertEqual(sorted(variants['webp']), [320, 640])
+        with Image.open(io.BytesIO(variants['webp'][640])) as img:
+            self.assertEqual(img.size, (640, 427))
+
+    def test_scheduled_variants_are_stored_on_the_project(self):
+        repo = _RecordingRepo()
+        schedule_variants(repo, 7, self.path, token='t').result(timeout=30)
+        self.assertFalse(os.path.exists(self.path))
+        (project_id, fields), = repo.updates
+        self.assertEqual(project_id, 7)
+        self.assertEqual(fields['image_variants']['webp'],
+                         {'320': 'https://cdn.example/7-320.webp', '640': 'https://cdn.example/7-640.webp'})
+        self.assertIn(('7-640.webp', 'image/webp'), [(name, mime) for name, mime, _ in repo.uploads])
+
+
+class TooLargeTestCase(unittest.TestCase):
+    def setUp(self):
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['RATELIMIT_STORAGE_URI'] = 'memory://'
+        self.app = create_app()
+        self.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, MAX_CONTENT_LENGTH=1024)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        os.environ.pop('RATELIMIT_STORAGE_URI', None)
+
+    def test_public_forms_get_a_plain_413(self):
+        response = self.client.post('/submited_form', data={'text': 'x' * 4096})
+        self.assertEqual(response.status_code, 413)
+
+    def test_admin_upload_redirects_back_with_a_message(self):
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = 'admin-id'
+            sess['user_details'] = {'id': 'admin-id', 'username': 'admin@example.com', 'role': 'admin'}
+        response = self.client.post('/admin/projects', data={
+            'title': 'T', 'image_file': (io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'\0' * 4096), 'big.png'),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.headers['Location'].endswith('/admin/projects'))
+        with self.client.session_transaction() as sess:
+            self.assertIn(('danger', 'Upload is too large.'), sess['_flashes'])
+
+
+if __name__ == '__main__':
+    unittest.main()
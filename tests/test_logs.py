@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import io
+import json
+import queue
+import logging
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.app import create_app
+from portfolio.logs import JsonFormatter, LogPipeline, SamplingFilter, _NonBlockingQueueHandler, parse_sample, pipeline
+
+
+class LogPipelineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pipeline = LogPipeline()
+        self.queue = queue.Queue(2)
+        self.handler = _NonBlockingQueueHandler(self.queue, self.pipeline)
+        self.logger = logging.Logger('noisy.child')
+        self.logger.addHandler(self.handler)
+        # No listener: records stay queued so the test can look at them
+        self.pipeline._pid = os.getpid()
+
+    def test_full_queue_drops_and_counts(self):
+        for i in range(5):
+            self.logger.warning('event %d', i)
+        self.assertEqual(self.queue.qsize(), 2)
+        self.assertEqual(self.pipeline.dropped, 3)
+
+    def test_primitive_args_are_formatted_later(self):
+        self.logger.warning('user %s took %d ms', 'ada', 12)
+        record = self.queue.get_nowait()
+        self.assertEqual(record.args, ('ada', 12))
+        self.logger.warning('object %s', object())
+        self.assertIsNone(self.queue.get_nowait().args)
+
+    def test_sampling_spares_warnings(self):
+        self.handler.addFilter(SamplingFilter(parse_sample('noisy=0,other=1'), self.pipeline))
+        self.logger.info('chatty')
+        self.logger.warning('important')
+        self.assertEqual(self.queue.get_nowait().getMessage(), 'important')
+        self.assertTrue(self.queue.empty())
+        self.assertEqual(self.pipeline.sampled_out, 1)
+
+    def test_configure_keeps_other_root_handlers(self):
+        root, level = logging.getLogger(), logging.getLogger().level
+        other = logging.FileHandler(os.devnull, delay=True)
+        root.addHandler(other)
+        try:
+            self.pipeline.configure(fmt='text')
+            first = self.pipeline._handler
+            self.pipeline.configure(fmt='json')
+            self.assertIn(other, root.handlers)
+            self.assertNotIn(first, root.handlers)
+            self.assertIn(self.pipeline._handler, root.handlers)
+        finally:
+            self.pipeline.stop()
+            root.removeHandler(self.pipeline._handler)
+            root.removeHandler(other)
+            root.setLevel(level)
+
+    def test_json_lines_carry_extra_fields(self):
+        record = logging.makeLogRecord({'name': 'x', 'levelno': logging.INFO, 'levelname': 'INFO',
+                                        'msg': 'hi %s', 'args': ('there',), 'request_id': 'abc', 'status': 200})
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual((entry['msg'], entry['request_id'], entry['status']), ('hi there', 'abc', 200))
+
+
+class RequestIdTestCase(unittest.TestCase):
+    def setUp(self):
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['RATELIMIT_STORAGE_URI'] = 'memory://'
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        os.environ.pop('RATELIMIT_STORAGE_URI', None)
+
+    def test_request_id_is_echoed_or_generated(self):
+        self.assertEqual(self.client.get('/test', headers={'X-Request-ID': 'req-42'}).headers['X-Request-ID'],
+                         'req-42')
+        generated = self.client.get('/test', headers={'X-Request-ID': 'bad id; drop'}).headers['X-Request-ID']
+        self.assertRegex(generated, r'^[0-9a-f]{32}$')
+
+    def test_access_log_reaches_output(self):
+        buffer, stdout = io.StringIO(), sys.stdout
+        sys.stdout = buffer
+        try:
+            self.client.get('/test', headers={'X-Request-ID': 'req-7'})
+            pipeline.stop()
+        finally:
+            sys.stdout = stdout
+            pipeline._start_locked()
+        entries = [json.loads(line) for line in buffer.getvalue().splitlines()]
+        access = [e for e in entries if e['logger'] == 'portfolio.access']
+        self.assertEqual(access[-1]['request_id'], 'req-7')
+        self.assertEqual(access[-1]['status'], 200)
+        self.assertIn('duration_ms', access[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import time
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.app import create_app
+from portfolio.mail_queue import MailQueue, get_worker, mail_queue_stats
+from portfolio.utils import mail
+
+
+class MailQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['MAIL_RECIPIENT'] = 'owner@example.com'
+        os.environ['MAIL_QUEUE_PATH'] = os.path.join(self.tmp.name, 'mail_queue.db')
+        os.environ['RATELIMIT_STORAGE_URI'] = 'memory://'
+        os.environ['MAIL_QUEUE_AUTOSTART'] = 'off'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['WTF_CSRF_ENABLED'] = False
+        self.app.config['MAIL_DEFAULT_SENDER'] = 'site@example.com'
+        self.app.extensions['mail'].default_sender = 'site@example.com'
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        for key in ('MAIL_RECIPIENT', 'MAIL_QUEUE_PATH', 'RATELIMIT_STORAGE_URI', 'MAIL_QUEUE_AUTOSTART'):
+            os.environ.pop(key, None)
+        self.tmp.cleanup()
+
+    def _submit(self):
+        return self.client.post('/submited_form', data={
+            'user_name': 'Ada', 'email': 'ada@example.com', 'subject': 'Hi', 'text': 'Hello',
+        })
+
+    def test_submission_is_queued_and_delivered(self):
+        response = self._submit()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail_queue_stats(self.app)['depth'], 1)
+
+        self.app.extensions['mail'].suppress = True
+        with mail.record_messages() as outbox:
+            self.assertEqual(get_worker(self.app).drain_once(), 1)
+        self.assertEqual(len(outbox), 1)
+        self.assertIn('Ada', outbox[0].subject)
+        stats = mail_queue_stats(self.app)
+        self.assertEqual(stats['depth'], 0)
+        self.assertEqual(stats['sent'], 1)
+
+    def test_unreachable_smtp_dead_letters(self):
+        self._submit()
+        state = self.app.extensions['mail']
+        state.server, state.port, state.use_tls = '127.0.0.1', 1, False
+        queue = self.app.extensions['mail_queue']
+        queue.max_attempts, queue.base_delay = 2, 0.0
+        worker = get_worker(self.app)
+        worker.drain_once()
+        worker.drain_once()
+        stats = mail_queue_stats(self.app)
+        self.assertEqual(stats['failed'], 2)
+        self.assertEqual(stats['dead_letter'], 1)
+        self.assertEqual(stats['depth'], 0)
+
+    def test_worker_starts_with_the_app_and_drains_leftover_mail(self):
+        self.app.extensions['mail_queue'].enqueue('Left over', ['owner@example.com'], '<p>hi</p>')
+        os.environ['MAIL_QUEUE_AUTOSTART'] = 'on'
+        os.environ['MAIL_SERVER'], os.environ['MAIL_PORT'] = '127.0.0.1', '1'
+        try:
+            app = create_app()
+        finally:
+            for key in ('MAIL_SERVER', 'MAIL_PORT'):
+                os.environ.pop(key, None)
+        worker = get_worker(app)
+        try:
+            self.assertTrue(worker.is_alive())
+            deadline = time.time() + 5
+            while worker.counters['failed'] == 0 and time.time() < deadline:
+                time.sleep(0.02)
+            # The SMTP port is closed, so the attempt fails and is rescheduled
+            self.assertEqual(worker.counters['failed'], 1)
+        finally:
+            worker.stop()
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    def test_forked_process_opens_its_own_connection(self):
+        queue = MailQueue(os.path.join(self.tmp.name, 'fork.db'))
+        inherited = queue._conn()
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                ok = queue._conn() is not inherited and queue.enqueue('From child', ['a@example.com'], 'x') > 0
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertIs(queue._conn(), inherited)
+        self.assertEqual(queue.depth(), 1)
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.app import create_app
+from portfolio.metrics import Histogram, metrics
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['RATELIMIT_STORAGE_URI'] = 'memory://'
+        os.environ['METRICS_TOKEN'] = 'scrape-token'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        metrics.reset()
+
+    def tearDown(self):
+        for key in ('RATELIMIT_STORAGE_URI', 'METRICS_TOKEN', 'METRICS'):
+            os.environ.pop(key, None)
+
+    def test_server_timing_and_route_histogram(self):
+        response = self.client.get('/contact.html')
+        self.assertIn('total;dur=', response.headers['Server-Timing'])
+        self.assertIn('render;dur=', response.headers['Server-Timing'])
+        counts = metrics.requests.snapshot()
+        self.assertEqual(counts[('routes.html_page', 'GET', '200')]['count'], 1)
+        self.assertEqual(metrics.templates.snapshot()[('contact.html',)]['count'], 1)
+
+    def test_metrics_endpoint_requires_admin_or_token(self):
+        self.client.get('/contact.html')
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('version=0.0.4', response.headers['Content-Type'])
+        body = response.get_data(as_text=True)
+        self.assertIn('portfolio_http_request_duration_seconds_count{endpoint="routes.html_page"', body)
+        self.assertIn('portfolio_ratelimit_allowed', body)
+
+    def test_disabled_adds_no_header(self):
+        os.environ['METRICS'] = 'off'
+        app = create_app()
+        client = app.test_client()
+        self.assertNotIn('Server-Timing', client.get('/contact.html').headers)
+        self.assertEqual(client.get('/metrics').status_code, 404)
+        # Building a disabled app leaves the others instrumented
+        self.assertTrue(self.app.extensions['metrics'])
+        self.assertIn('Server-Timing', self.client.get('/contact.html').headers)
+        with self.app.app_context():
+            self.assertTrue(metrics.enabled)
+        with app.app_context():
+            self.assertFalse(metrics.enabled)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('t_seconds', 'test', ('op',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, 'x')
+        lines = histogram.render()
+        self.assertIn('t_seconds_bucket{op="x",le="0.1"} 1', lines)
+        self.assertIn('t_seconds_bucket{op="x",le="1"} 2', lines)
+        self.assertIn('t_seconds_bucket{op="x",le="+Inf"} 3', lines)
+        self.assertIn('t_seconds_count{op="x"} 3', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_supabase import ANON_KEY, SERVICE_KEY, URL, FakeSupabase
+from portfolio.migration import Checkpoint, MigrationError, Migrator
+from portfolio.sqlite_repo import SQLiteBlogRepo, SQLiteDatabase, SQLiteProjectRepo
+from portfolio.supabase_repo import SupabaseContext
+
+
+class MigrationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = SQLiteDatabase(os.path.join(self.tmp.name, 'portfolio.db'))
+        self.posts = SQLiteBlogRepo(self.source)
+        for i in range(60):
+            self.posts.create_post(f'Post {i}', f'Body {i}')
+        projects = SQLiteProjectRepo(self.source, os.path.join(self.tmp.name, 'uploads'))
+        for i in range(3):
+            projects.create_project(f'Project {i}', 'd', None, None, 'python')
+        self.fake = FakeSupabase()
+        self.fake.install()
+        self.client = SupabaseContext(URL, ANON_KEY, SERVICE_KEY).admin_client()
+        self.checkpoint_path = os.path.join(self.tmp.name, 'checkpoint.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def migrator(self, **kwargs):
+        kwargs.setdefault('batch_size', 10)
+        kwargs.setdefault('workers', 3)
+        return Migrator(self.source, self.client, Checkpoint(self.checkpoint_path), backoff=0, **kwargs)
+
+    def test_batched_copy_verifies(self):
+        reports = self.migrator().run(['projects', 'blog_posts'])
+        self.assertEqual([r.rows for r in reports], [3, 60])
+        self.assertEqual(reports[1].batches, 6)
+        self.assertTrue(all(r.verified for r in reports))
+        self.assertEqual(sorted(r['id'] for r in self.fake.tables['blog_posts']), list(range(1, 61)))
+
+    def test_failed_batch_resumes_from_checkpoint(self):
+        self.migrator().migrate_table('blog_posts')
+        for i in range(60, 90):
+            self.posts.create_post(f'Post {i}', f'Body {i}')
+        self.fake.fail_next = 1
+        with self.assertRaises(MigrationError):
+            self.migrator(workers=1, retries=0).migrate_table('blog_posts')
+        self.assertEqual(Checkpoint(self.checkpoint_path).last_id('blog_posts'), 60)
+        before = self.fake.requests
+        report = self.migrator().run(['blog_posts'])[0]
+        self.assertEqual((report.resumed_from, report.rows), (60, 30))
+        self.assertTrue(report.verified)
+        self.assertEqual(self.fake.requests - before, 4)  # 3 upserts of the new rows, 1 verification read
+
+    def test_transient_failures_are_retried(self):
+        self.fake.fail_next = 2
+        report = self.migrator(workers=1).migrate_table('blog_posts')
+        self.assertEqual((report.rows, report.retries), (60, 2))
+
+    def test_verification_catches_drift(self):
+        migrator = self.migrator()
+        migrator.migrate_table('blog_posts')
+        self.fake.tables['blog_posts'][5]['content'] = 'edited upstream'
+        report = migrator.verify_table('blog_posts')
+        self.assertEqual(report.source_count, report.target_count)
+        self.assertFalse(report.checksums_match)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import time
+import sqlite3
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.app import create_app
+from portfolio.ratelimit import SQLiteBatchedStorage, rate_limit_stats
+
+
+class SharedStorageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.uri = 'sqlite:///' + os.path.join(self.tmp.name, 'ratelimit.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _storage(self, **options):
+        return SQLiteBatchedStorage(self.uri, **options)
+
+    def _stored(self, key):
+        with sqlite3.connect(self.uri[len('sqlite:///'):]) as conn:
+            row = conn.execute('select count from counters where key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def test_hits_are_flushed_in_batches(self):
+        a, b = self._storage(batch_size=5, sync_interval=3600), self._storage(batch_size=5, sync_interval=3600)
+        # The first hit of a window always syncs
+        self.assertEqual(a.incr('k', 60), 1)
+        self.assertEqual(self._stored('k'), 1)
+        for expected in (2, 3, 4, 5):
+            self.assertEqual(a.incr('k', 60), expected)
+        self.assertEqual(self._stored('k'), 1)
+        self.assertEqual(a.incr('k', 60), 6)
+        self.assertEqual(self._stored('k'), 6)
+        # A second worker starts from the shared count
+        self.assertEqual(b.incr('k', 60), 7)
+
+    def test_pending_hits_sync_after_the_interval(self):
+        a, b = self._storage(batch_size=100, sync_interval=0.05), self._storage(batch_size=100, sync_interval=0.05)
+        a.incr('k', 60)
+        a.incr('k', 60)
+        self.assertEqual(b.get('k'), 1)
+        time.sleep(0.06)
+        self.assertEqual(a.get('k'), 2)
+        self.assertEqual(b.get('k'), 2)
+
+    def test_windows_expire_for_every_worker(self):
+        a, b = self._storage(batch_size=1), self._storage(batch_size=1)
+        for _ in range(3):
+            a.incr('k', 0.1)
+        self.assertEqual(b.get('k'), 3)
+        time.sleep(0.15)
+        self.assertEqual(b.get('k'), 0)
+        self.assertLessEqual(b.get_expiry('k'), time.time())
+        self.assertEqual(b.incr('k', 60), 1)
+        self.assertEqual(self._stored('k'), 1)
+
+    def test_expired_rows_are_pruned(self):
+        a = self._storage(batch_size=1)
+        a.incr('old', 0.05)
+        time.sleep(0.06)
+        a._last_prune = 0
+        a.incr('new', 60)
+        self.assertIsNone(self._stored('old'))
+        self.assertNotIn('old', a._local)
+        self.assertEqual(self._stored('new'), 1)
+
+
+class RateLimitStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['RATELIMIT_STORAGE_URI'] = 'sqlite:///' + os.path.join(self.tmp.name, 'ratelimit.db')
+        os.environ['RATELIMIT_LOGIN'] = '2 per minute'
+        self.app = create_app()
+        self.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        for key in ('RATELIMIT_STORAGE_URI', 'RATELIMIT_LOGIN'):
+            os.environ.pop(key, None)
+        self.tmp.cleanup()
+
+    def test_allowed_and_rejected_requests_are_counted(self):
+        before = rate_limit_stats.snapshot()
+        statuses = [self.client.post('/login', data={'username': 'a@example.com', 'password': 'x'}).status_code
+                    for _ in range(3)]
+        self.assertNotEqual(statuses[1], 429)
+        self.assertEqual(statuses[2], 429)
+        after = rate_limit_stats.snapshot()
+        self.assertEqual(after['rejected'] - before['rejected'], 1)
+        self.assertEqual(after['allowed'] - before['allowed'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
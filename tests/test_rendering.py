@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_supabase import ANON_KEY, SERVICE_KEY, URL, FakeSupabase
+from portfolio.rendering import RENDER_VERSION, backfill_posts, render_post
+from portfolio.sqlite_repo import SQLiteBlogRepo, SQLiteDatabase
+from portfolio.supabase_repo import BlogRepo, SupabaseContext
+
+SOURCE = """# Notes
+
+Some *emphasis*, <script>alert(1)</script> and [a link](javascript:alert(1)).
+
+```python
+def answer():
+    return 42
+```
+"""
+
+
+class RenderPostTestCase(unittest.TestCase):
+    def test_markdown_is_rendered_and_sanitized(self):
+        rendered = render_post(SOURCE)
+        html = rendered['content_html']
+        self.assertIn('<h1>Notes</h1>', html)
+        self.assertIn('<em>emphasis</em>', html)
+        self.assertIn('<div class="highlight">', html)
+        self.assertIn('&lt;script&gt;', html)
+        self.assertNotIn('javascript:', html)
+        # The excerpt is plain text without the code block; the code still counts as words
+        self.assertEqual(rendered['excerpt'], 'Notes Some emphasis, <script>alert(1)</script> and a link.')
+        self.assertEqual(rendered['word_count'], 14)
+        self.assertEqual((rendered['reading_minutes'], rendered['render_version']), (1, RENDER_VERSION))
+
+    def test_encoded_and_mixed_case_schemes_are_dropped(self):
+        for url in ('&#106;avascript:alert(1)', '&#x6A;avascript&#58;alert(1)', '&#106avascript:alert(1)',
+                    'JaVaScRiPt:alert(1)', 'java&#09;script:alert(1)', '&#1;javascript:alert(1)',
+                    ' &#32;javascript:alert(1)', 'jav&Tab;ascript:alert(1)', 'vbscript:msgbox(1)'):
+            html = render_post(f'[a]({url}) ![i]({url})')['content_html']
+            self.assertEqual(html.count('="#"'), 2, url)
+        html = render_post('![i](&#100;ata:image/svg+xml,x) [b](DATA:text/html,x)')['content_html']
+        self.assertNotIn('ata:', html)
+
+    def test_safe_links_are_kept(self):
+        for url in ('https://example.com/a?b=1&amp;c=2', 'HTTP://example.com', 'mailto:a@example.com',
+                    '/blogs/1', '#top', '?page=2', 'notes/a:b', 'img.png'):
+            html = render_post(f'[a]({url})')['content_html']
+            self.assertNotIn('href="#"', html.replace('href="#top"', ''), url)
+
+    def test_long_excerpts_end_at_a_word(self):
+        rendered = render_post('word ' * 2000)
+        self.assertLessEqual(len(rendered['excerpt']), 201)
+        self.assertTrue(rendered['excerpt'].endswith('word…'))
+        self.assertEqual(rendered['reading_minutes'], 9)
+
+
+class RenderedPostsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'portfolio.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_store_the_rendered_fields(self):
+        posts = SQLiteBlogRepo(SQLiteDatabase(self.path))
+        created = posts.create_post('Notes', 'First *draft*')
+        self.assertEqual(created['content_html'], '<p>First <em>draft</em></p>')
+        self.assertTrue(posts.update_post(created['id'], 'Notes', 'Second **draft**'))
+        stored = posts.get_post(created['id'])
+        self.assertEqual((stored['content_html'], stored['excerpt']), ('<p>Second <strong>draft</strong></p>',
+                                                                       'Second draft'))
+        rows, _ = posts.list_posts_page()
+        self.assertEqual((rows[0]['excerpt'], rows[0]['reading_minutes']), ('Second draft', 1))
+        self.assertNotIn('content', rows[0])
+
+    def test_files_with_the_generated_excerpt_are_upgraded_and_backfilled(self):
+        conn = sqlite3.connect(self.path)
+        conn.executescript("""
+            create table blog_posts (
+              id integer primary key autoincrement, title text not null, content text not null,
+              excerpt text generated always as (substr(content, 1, 200)) stored,
+              created_at text not null default '2020-01-01T00:00:00+00:00');
+            insert into blog_posts (id, title, content) values (3, 'A', 'Old *post*'), (7, 'B', 'Older');
+        """)
+        conn.close()
+        posts = SQLiteBlogRepo(SQLiteDatabase(self.path))
+        self.assertEqual(posts.get_post(3)['excerpt'], 'Old *post*')
+        self.assertIsNone(posts.get_post(3)['content_html'])
+
+        report = backfill_posts(posts, batch_size=1, workers=2)
+        self.assertEqual((report.scanned, report.rendered, report.failed_batches), (2, 2, 0))
+        self.assertEqual(posts.get_post(3)['content_html'], '<p>Old <em>post</em></p>')
+        self.assertEqual(posts.create_post('C', 'New')['id'], 8)
+        # Posts at the current version are skipped unless forced
+        self.assertEqual(backfill_posts(posts, workers=1).rendered, 0)
+        self.assertEqual(backfill_posts(posts, workers=1, force=True).rendered, 3)
+
+    def test_supabase_backfill_upserts_batches(self):
+        fake = FakeSupabase()
+        for i in range(5):
+            fake.insert('blog_posts', {'title': f'Post {i}', 'content': f'Body **{i}**'})
+        fake.install()
+        posts = BlogRepo(SupabaseContext(URL, ANON_KEY, SERVICE_KEY), cache=None)
+        report = backfill_posts(posts, batch_size=2, workers=1)
+        self.assertEqual((report.rendered, report.failed_batches), (5, 0))
+        self.assertEqual(fake.tables['blog_posts'][4]['content_html'], '<p>Body <strong>4</strong></p>')
+        self.assertEqual(fake.tables['blog_posts'][4]['title'], 'Post 4')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_supabase import ANON_KEY, URL, FakeSupabase, sign_token
+from portfolio import replica as replica_module
+from portfolio.replica import Replica, ReplicatedBlogRepo, ReplicatedProjectRepo
+from portfolio.sqlite_repo import SQLiteDatabase
+from portfolio.supabase_repo import BlogRepo, ProjectRepo, SupabaseContext
+
+
+class ReplicaTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fake = FakeSupabase()
+        self.fake.seed_posts(30)
+        self.fake.seed_projects(3)
+        self.fake.install()
+        self.ctx = SupabaseContext(URL, ANON_KEY)
+        self.replica = Replica(SQLiteDatabase(os.path.join(self.tmp.name, 'replica.db')), self.ctx,
+                               reconcile_every=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def local_count(self, table):
+        return self.replica.db.query_one(f'select count(*) as n from {table}')['n']
+
+    def test_incremental_sync_pulls_only_new_rows(self):
+        self.assertIsNone(self.replica.lag())
+        self.assertEqual(self.replica.sync(), 33)
+        self.assertEqual(self.local_count('blog_posts'), 30)
+        self.assertTrue(self.replica.usable())
+        self.fake.insert('blog_posts', {'title': 'Fresh', 'content': 'New post'})
+        self.assertEqual(self.replica.sync(), 1)
+        self.assertEqual(self.replica.db.query_one('select title from blog_posts order by id desc limit 1')['title'],
+                         'Fresh')
+
+    def test_reconcile_removes_deleted_rows(self):
+        self.replica.sync()
+        self.fake.tables['blog_posts'] = self.fake.tables['blog_posts'][5:]
+        self.replica.sync()
+        self.assertEqual(self.local_count('blog_posts'), 30)
+        self.replica.sync()
+        self.assertEqual(self.local_count('blog_posts'), 25)
+        self.assertEqual(self.replica.stats()['rows_deleted'], 5)
+
+    def test_reconcile_pages_past_max_rows(self):
+        # Supabase caps every response at max-rows; the sweep must not take the first page for all of it
+        self.fake.max_rows = 7
+        with mock.patch.object(replica_module, 'SYNC_BATCH_SIZE', 7):
+            self.replica.sync()
+            self.assertEqual(self.local_count('blog_posts'), 30)
+            self.fake.tables['blog_posts'] = [r for r in self.fake.tables['blog_posts']
+                                              if r['id'] not in (3, 7, 8, 21, 30)]
+            self.replica.sync()
+            self.replica.sync()
+        self.assertEqual(self.local_count('blog_posts'), 25)
+        remaining = {r['id'] for r in self.replica.db.query('select id from blog_posts')}
+        self.assertEqual(remaining, {r['id'] for r in self.fake.tables['blog_posts']})
+        self.assertEqual(self.replica.stats()['rows_deleted'], 5)
+
+    def test_updates_copy_the_written_row_without_rerunning_write_hooks(self):
+        self.replica.sync()
+        token = sign_token('admin-id')
+        projects = ReplicatedProjectRepo(ProjectRepo(self.ctx, cache=None), self.replica)
+        posts = ReplicatedBlogRepo(BlogRepo(self.ctx, cache=None), self.replica)
+        with mock.patch('portfolio.sqlite_repo.render_post') as render, \
+                mock.patch('portfolio.sqlite_repo.retag_project') as retag, \
+                mock.patch('portfolio.sqlite_repo.index_document') as index:
+            self.assertTrue(projects.update_project(1, {'title': 'Renamed'}, token=token))
+            self.assertTrue(posts.update_post(2, 'New title', 'Some **bold** text', token=token))
+        self.assertEqual((render.call_count, retag.call_count, index.call_count), (0, 0, 0))
+        project = self.replica.db.query_one('select * from projects where id = 1')
+        self.assertEqual(project['title'], 'Renamed')
+        self.assertIsNotNone(project['created_at'])
+        post = self.replica.db.query_one('select * from blog_posts where id = 2')
+        self.assertEqual(post['title'], 'New title')
+        self.assertIn('<strong>bold</strong>', post['content_html'])
+
+    def test_reads_fall_back_to_replica_when_supabase_fails(self):
+        self.replica.sync()
+        self.replica.max_lag = 0
+        repo = ReplicatedBlogRepo(BlogRepo(self.ctx, cache=None), self.replica)
+        self.fake.fail_next = 100
+        with self.assertRaises(Exception):
+            self.replica.sync()
+        self.assertFalse(self.replica.healthy)
+        self.assertEqual(len(repo.list_posts()), 30)
+        self.assertEqual(repo.get_post(1)['title'], 'Post 0')
+        stats = self.replica.stats()
+        self.assertEqual(stats['healthy'], 0)
+        self.assertIn('lag_seconds', stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_supabase import ANON_KEY, URL, FakeSupabase, sign_token
+from portfolio.aio import run_concurrently
+from portfolio.resilience import CLOSED, OPEN, policy
+from portfolio.supabase_repo import BlogRepo, ProjectRepo, SupabaseContext
+
+
+class CallPolicyTestCase(unittest.TestCase):
+    def setUp(self):
+        policy.configure()
+        self.fake = FakeSupabase()
+        self.fake.seed_posts(3)
+        self.fake.seed_projects(2)
+        self.fake.install()
+        ctx = SupabaseContext(URL, ANON_KEY)
+        self.projects, self.posts = ProjectRepo(ctx, cache=None), BlogRepo(ctx, cache=None)
+
+    def tearDown(self):
+        policy.configure()
+
+    def test_reads_retry_transient_failures(self):
+        self.fake.fail_next = 2
+        self.assertEqual(len(self.projects.list_projects()), 2)
+        self.assertEqual(self.fake.requests, 3)
+        self.fake.fail_next = 1
+        self.assertEqual(len(run_concurrently(self.posts.alist_posts())[0]), 3)
+        self.assertEqual(policy.stats()['retries'], 3)
+        self.assertEqual(policy.breaker.state, CLOSED)
+
+    def test_writes_and_client_errors_are_tried_once(self):
+        self.fake.fail_next = 1
+        self.assertFalse(self.projects.update_project(1, {'title': 'New'}, token=sign_token('admin-id')))
+        self.assertEqual(self.fake.requests, 1)
+        # A missing row is a 406 from PostgREST: Supabase is up, nothing to retry
+        self.assertIsNone(self.posts.get_post(999))
+        self.assertEqual(self.fake.requests, 2)
+        self.assertEqual(policy.stats()['failures'], 1)
+
+    def test_breaker_fails_fast_then_recovers(self):
+        policy.configure(read_retries=0, breaker_threshold=2, breaker_cooldown=0.05)
+        self.fake.fail_next = 2
+        self.assertEqual(self.projects.list_projects(), [])
+        self.assertEqual(self.projects.list_projects(), [])
+        self.assertEqual(policy.breaker.state, OPEN)
+        self.assertEqual(self.posts.list_posts(), [])
+        self.assertEqual(self.fake.requests, 2)
+        time.sleep(0.06)
+        self.assertEqual(len(self.posts.list_posts()), 3)
+        stats = policy.stats()
+        self.assertEqual((stats['breaker_state'], stats['breaker_opens'], stats['breaker_rejections']), (0, 1, 1))
+
+    def test_deadline_cuts_a_stalled_read_short(self):
+        policy.configure(read_timeout=0.2)
+        self.fake.stall_next, self.fake.stall = 1, 5.0
+        started = time.perf_counter()
+        self.assertEqual(self.projects.list_projects(), [])
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(policy.stats()['deadline_exceeded'], 1)
+
+    def test_hedged_read_answers_before_the_stalled_one(self):
+        policy.configure(hedge_after=0.05)
+        self.fake.stall_next, self.fake.stall = 1, 0.5
+        started = time.perf_counter()
+        self.assertEqual(len(self.projects.list_projects()), 2)
+        self.assertLess(time.perf_counter() - started, 0.4)
+        stats = policy.stats()
+        self.assertEqual((stats['hedges'], stats['hedge_wins']), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
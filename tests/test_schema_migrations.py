@@ -0,0 +1,138 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from postgrest.exceptions import APIError
+
+from portfolio.schema_migrations import (
+    MIGRATIONS_DIR, RpcExecutor, SchemaError, apply_pending, discover, main, plan,
+)
+
+
+class SQLiteExecutor:
+    """Same contract as RpcExecutor, one transaction per file, on a local database."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', isolation_level=None)
+        self.conn.execute('create table schema_migrations (version integer primary key, name text, checksum text, sql text)')
+        self.applied = []
+
+    def ledger(self, with_sql=False):
+        rows = self.conn.execute('select version, name, checksum, sql from schema_migrations').fetchall()
+        return {v: {'version': v, 'name': n, 'checksum': c, 'sql': s} for v, n, c, s in rows}
+
+    def apply(self, migration):
+        self.conn.execute('begin')
+        try:
+            for statement in migration.sql.split(';'):
+                self.conn.execute(statement)
+            self.conn.execute('insert into schema_migrations values (?, ?, ?, ?)',
+                              (migration.version, migration.name, migration.checksum, migration.sql))
+        except sqlite3.Error:
+            self.conn.execute('rollback')
+            raise
+        self.conn.execute('commit')
+        self.applied.append(migration.version)
+
+
+class NoLedgerClient:
+    """Supabase client stand-in for a project without the ledger table; records every RPC."""
+
+    def __init__(self):
+        self.rpcs = []
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        return self
+
+    def rpc(self, name, params):
+        self.rpcs.append((name, params))
+        return self
+
+    def execute(self):
+        if self.rpcs:
+            return None
+        raise APIError({'code': '42P01', 'message': 'relation "public.schema_migrations" does not exist'})
+
+
+class SchemaMigrationsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.executor = SQLiteExecutor()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, filename, sql):
+        with open(os.path.join(self.tmp.name, filename), 'w') as fh:
+            fh.write(sql)
+
+    def test_repository_migrations_are_well_formed(self):
+        migrations = discover(MIGRATIONS_DIR)
+        self.assertEqual(migrations[0].label, '0001_baseline')
+        self.assertEqual([m.version for m in migrations], sorted({m.version for m in migrations}))
+
+    def test_only_pending_files_run(self):
+        self.write('0001_posts.sql', 'create table posts (id integer)')
+        self.write('0002_title.sql', 'alter table posts add column title text')
+        self.write('README.md', 'not a migration')
+        applied = apply_pending(self.executor, discover(self.tmp.name), target=1)
+        self.assertEqual([r['migration'].version for r in applied], [1])
+        self.assertEqual(len(apply_pending(self.executor, discover(self.tmp.name))), 1)
+        self.assertEqual(apply_pending(self.executor, discover(self.tmp.name)), [])
+        self.assertEqual(self.executor.applied, [1, 2])
+
+    def test_failed_file_rolls_back_and_stops(self):
+        self.write('0001_posts.sql', 'create table posts (id integer); create table broken (')
+        self.write('0002_title.sql', 'alter table posts add column title text')
+        with self.assertRaises(SchemaError):
+            apply_pending(self.executor, discover(self.tmp.name))
+        self.assertEqual(self.executor.ledger(), {})
+        self.assertEqual(self.executor.conn.execute("select count(*) from sqlite_master where name = 'posts'")
+                         .fetchone()[0], 0)
+
+    def test_edited_applied_file_blocks_the_run(self):
+        self.write('0001_posts.sql', 'create table posts (id integer)')
+        apply_pending(self.executor, discover(self.tmp.name))
+        self.write('0001_posts.sql', 'create table posts (id integer, title text)')
+        self.write('0002_more.sql', 'create table more (id integer)')
+        todo = plan(discover(self.tmp.name), self.executor.ledger())
+        self.assertEqual([m.version for m, _ in todo.changed], [1])
+        self.assertEqual([m.version for m in todo.pending], [2])
+        with self.assertRaises(SchemaError):
+            apply_pending(self.executor, discover(self.tmp.name))
+        self.assertEqual(self.executor.applied, [1])
+
+    def test_read_only_modes_leave_a_missing_ledger_alone(self):
+        self.write('0001_posts.sql', 'create table posts (id integer)')
+        client = NoLedgerClient()
+        ctx = mock.Mock(**{'admin_client.return_value': client})
+        with mock.patch('portfolio.supabase_repo.get_supabase_context_from_env', return_value=ctx), \
+                mock.patch('builtins.print'):
+            self.assertEqual(main(['--dir', self.tmp.name, '--dry-run']), 0)
+            self.assertEqual(main(['--dir', self.tmp.name, '--diff']), 0)
+        self.assertEqual(client.rpcs, [])
+        # A real run creates it
+        self.assertEqual(RpcExecutor(client).ledger(), {})
+        self.assertEqual([name for name, _ in client.rpcs], ['execute_sql'])
+
+    def test_duplicate_versions_are_rejected(self):
+        self.write('0001_a.sql', 'select 1')
+        self.write('001_b.sql', 'select 2')
+        with self.assertRaises(SchemaError):
+            discover(self.tmp.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
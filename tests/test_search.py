@@ -0,0 +1,94 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.app import create_app
+from portfolio.search import SearchIndex, stem, tokenize
+
+
+class TokenizerTestCase(unittest.TestCase):
+    def test_porter_stems(self):
+        for word, expected in [('caresses', 'caress'), ('ponies', 'poni'), ('running', 'run'),
+                               ('relational', 'relat'), ('hopeful', 'hope'), ('generalization', 'gener')]:
+            self.assertEqual(stem(word), expected, word)
+
+    def test_stopwords_dropped_and_languages_kept(self):
+        self.assertEqual(tokenize('The Caching of C++ and C# apps'), ['cach', 'c++', 'c#', 'app'])
+
+
+class SearchIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'index.pickle')
+        self.index = SearchIndex(self.path)
+        self.index.build('test', [
+            {'id': 1, 'title': 'Portfolio', 'description': 'A personal site', 'tech_stack': 'python, flask'},
+        ], [
+            {'id': 1, 'title': 'Caching databases', 'content': 'Notes on caching and more caching.'},
+            {'id': 2, 'title': 'Gardening', 'content': 'Tomatoes need sun. A cache of seeds helps.'},
+        ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def keys(self, query, **kwargs):
+        return [(hit['kind'], hit['id']) for hit in self.index.search(query, **kwargs)]
+
+    def test_bm25_ranks_by_relevance(self):
+        self.assertEqual(self.keys('cached'), [('post', 1), ('post', 2)])
+        self.assertEqual(self.keys('flask'), [('project', 1)])
+        self.assertEqual(self.keys('cache', kind='project'), [])
+        self.assertEqual(self.keys('the'), [])
+
+    def test_incremental_writes(self):
+        self.index.add('post', {'id': 3, 'title': 'Flask tips', 'content': 'Blueprints'})
+        self.assertEqual(self.keys('flask'), [('post', 3), ('project', 1)])
+        self.index.update_project(1, {'tech_stack': 'rust'})
+        self.assertEqual(self.keys('flask'), [('post', 3)])
+        self.assertEqual(self.keys('rust'), [('project', 1)])
+        self.index.remove('post', 1)
+        self.assertEqual(self.keys('caching'), [('post', 2)])
+
+    def test_other_workers_load_the_saved_index(self):
+        self.index.add('post', {'id': 3, 'title': 'Tomatoes', 'content': 'Late harvest'})
+        worker = SearchIndex(self.path)
+        self.assertTrue(worker.load())
+        self.assertEqual([h['id'] for h in worker.search('tomato')], [3, 2])
+        self.index.remove('post', 3)
+        worker.reload_if_changed()
+        self.assertEqual([h['id'] for h in worker.search('tomato')], [2])
+
+
+class SearchRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['RATELIMIT_STORAGE_URI'] = 'memory://'
+        os.environ['DATA_BACKEND'] = 'sqlite'
+        os.environ['SQLITE_PATH'] = os.path.join(self.tmp.name, 'portfolio.db')
+        os.environ['SEARCH_INDEX_PATH'] = os.path.join(self.tmp.name, 'index.pickle')
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        for key in ('RATELIMIT_STORAGE_URI', 'DATA_BACKEND', 'SQLITE_PATH', 'SEARCH_INDEX_PATH'):
+            os.environ.pop(key, None)
+        self.tmp.cleanup()
+
+    def test_repo_writes_reach_search(self):
+        settings = self.app.extensions['settings'].settings
+        self.assertIn(b'No results', self.client.get('/search?q=indexing').data)
+        with self.app.test_request_context():
+            post = settings.blog_repo().create_post('Inverted indexes', 'How indexing works')
+        self.assertIn(b'Inverted indexes', self.client.get('/search?q=indexing').data)
+        with self.app.test_request_context():
+            settings.blog_repo().delete_post(post['id'])
+        self.assertNotIn(b'Inverted indexes', self.client.get('/search?q=indexing').data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import signal
+import tempfile
+import subprocess
+import importlib.util
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.app import create_app
+from portfolio.settings import ConfigError, Settings
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+URL = 'http://supabase.local'
+KEY = 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.YW5vbg'
+
+
+class SettingsTestCase(unittest.TestCase):
+    def test_backend_autodetect(self):
+        self.assertEqual(Settings.from_env({}).backend, 'sqlite')
+        settings = Settings.from_env({'SUPABASE_URL': URL, 'SUPABASE_KEY': KEY})
+        self.assertEqual(settings.backend, 'supabase')
+        self.assertEqual(settings.supabase.url, URL)
+
+    def test_invalid_configuration_is_rejected(self):
+        with self.assertRaises(ConfigError):
+            Settings.from_env({'DATA_BACKEND': 'postgres'})
+        with self.assertRaises(ConfigError):
+            Settings.from_env({'DATA_BACKEND': 'supabase'})
+        with self.assertRaises(ConfigError):
+            Settings.from_env({'SUPABASE_URL': 'supabase.local', 'SUPABASE_KEY': KEY})
+
+
+@unittest.skipUnless(hasattr(signal, 'SIGHUP'), 'SIGHUP is POSIX only')
+class SettingsReloadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dotenv = os.path.join(self.tmp.name, '.env')
+        self._write('MAIL_RECIPIENT=first@example.com\n')
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['RATELIMIT_STORAGE_URI'] = 'memory://'
+        os.environ['SETTINGS_DOTENV'] = self.dotenv
+        self.previous_handler = signal.getsignal(signal.SIGHUP)
+        self.app = create_app()
+        self.manager = self.app.extensions['settings']
+
+    def tearDown(self):
+        signal.signal(signal.SIGHUP, self.previous_handler)
+        for key in ('RATELIMIT_STORAGE_URI', 'SETTINGS_DOTENV', 'MAIL_RECIPIENT'):
+            os.environ.pop(key, None)
+        self.tmp.cleanup()
+
+    def _write(self, text):
+        with open(self.dotenv, 'w') as fh:
+            fh.write(text)
+
+    def test_sighup_reloads_on_next_request(self):
+        self.assertEqual(self.manager.settings.mail_recipient, 'first@example.com')
+        self._write('MAIL_RECIPIENT=second@example.com\n')
+        os.kill(os.getpid(), signal.SIGHUP)
+        self.app.test_client().get('/test')
+        self.assertEqual(self.manager.settings.mail_recipient, 'second@example.com')
+        self.assertEqual(self.manager.reloads, 1)
+
+    def test_sighup_reaches_the_app_in_a_fresh_process(self):
+        # The first create_app() of a process is the one gunicorn serves
+        script = (
+            'import os, signal\n'
+            'from portfolio.app import create_app\n'
+            'app = create_app()\n'
+            'open(os.environ["SETTINGS_DOTENV"], "w").write("MAIL_RECIPIENT=second@example.com\\n")\n'
+            'os.kill(os.getpid(), signal.SIGHUP)\n'
+            'app.test_client().get("/test")\n'
+            'open(os.environ["RESULT_PATH"], "w").write(app.extensions["settings"].settings.mail_recipient)\n'
+        )
+        result_path = os.path.join(self.tmp.name, 'result')
+        env = dict(os.environ, PYTHONPATH=ROOT, MAIL_QUEUE_AUTOSTART='off', RESULT_PATH=result_path)
+        result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, capture_output=True,
+                                text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        with open(result_path) as fh:
+            self.assertEqual(fh.read(), 'second@example.com')
+        self.assertEqual((result.stdout + result.stderr).count('Portfolio startup'), 1)
+
+    def test_gunicorn_worker_reinstalls_the_handler(self):
+        spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(ROOT, 'gunicorn.conf.py'))
+        conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(conf)
+        # What a gunicorn worker does to every signal after the fork
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        conf.post_worker_init(SimpleNamespace(wsgi=self.app))
+        self._write('MAIL_RECIPIENT=second@example.com\n')
+        os.kill(os.getpid(), signal.SIGHUP)
+        self.app.test_client().get('/test')
+        self.assertEqual(self.manager.settings.mail_recipient, 'second@example.com')
+
+    def test_invalid_reload_keeps_previous_settings(self):
+        self._write('DATA_BACKEND=postgres\n')
+        self.assertFalse(self.manager.reload())
+        self.assertEqual(self.manager.settings.mail_recipient, 'first@example.com')
+
+
+if __name__ == '__main__':
+    unittest.main()
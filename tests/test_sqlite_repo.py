@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.app import create_app
+from portfolio.sqlite_repo import SQLiteBlogRepo, SQLiteDatabase, SQLiteProjectRepo
+
+
+class SQLiteRepoTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = SQLiteDatabase(os.path.join(self.tmp.name, 'portfolio.db'))
+        self.projects = SQLiteProjectRepo(self.db, os.path.join(self.tmp.name, 'uploads'))
+        self.posts = SQLiteBlogRepo(self.db)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_project_crud(self):
+        created = self.projects.create_project('Site', 'A site', None, None, 'python, flask')
+        self.assertEqual(created['github_url'], '')
+        self.assertTrue(self.projects.update_project(created['id'], {'image_variants': {'webp': {'320': '/x.webp'}}}))
+        self.assertEqual(self.projects.get_project(created['id'])['image_variants'], {'webp': {'320': '/x.webp'}})
+        self.assertTrue(self.projects.delete_project(created['id']))
+        self.assertIsNone(self.projects.get_project(created['id']))
+
+    def test_post_pages_walk_every_row_once(self):
+        for i in range(45):
+            self.posts.create_post(f'Post {i}', 'body ' * 100)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = self.posts.list_posts_page(cursor)
+            seen.extend(r['id'] for r in rows)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+        self.assertNotIn('content', rows[0])
+        self.assertTrue(rows[0]['excerpt'].endswith('…'))
+
+    def test_full_text_index_follows_writes(self):
+        post = self.posts.create_post('Caching', 'Notes on running databases')
+        if not self.db.fts:
+            self.skipTest('SQLite build lacks FTS5')
+        hits = self.db.query("select rowid from blog_posts_fts where blog_posts_fts match 'database'")
+        self.assertEqual([h['rowid'] for h in hits], [post['id']])
+        self.posts.delete_post(post['id'])
+        self.assertEqual(self.db.query("select rowid from blog_posts_fts where blog_posts_fts match 'database'"), [])
+
+    def test_connection_per_thread(self):
+        conns = []
+        thread = threading.Thread(target=lambda: conns.append(self.db.connect()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(conns[0], self.db.connect())
+
+
+class SQLiteBackendAppTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['RATELIMIT_STORAGE_URI'] = 'memory://'
+        os.environ['DATA_BACKEND'] = 'sqlite'
+        os.environ['SQLITE_PATH'] = os.path.join(self.tmp.name, 'portfolio.db')
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        for key in ('RATELIMIT_STORAGE_URI', 'DATA_BACKEND', 'SQLITE_PATH'):
+            os.environ.pop(key, None)
+        self.tmp.cleanup()
+
+    def test_views_read_from_sqlite(self):
+        settings = self.app.extensions['settings'].settings
+        self.assertEqual(settings.backend, 'sqlite')
+        post = settings.blog_repo().create_post('Hello SQLite', 'Local reads')
+        self.assertIn(b'Hello SQLite', self.client.get('/blogs').data)
+        self.assertIn(b'Local reads', self.client.get(f"/blogs/{post['id']}").data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import re
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_supabase import ANON_KEY, JWT_SECRET, URL, FakeSupabase, sign_token
+from portfolio.app import create_app
+from portfolio.sqlite_repo import SQLiteBlogRepo, SQLiteDatabase
+from portfolio.streaming import DeferredPage
+
+
+class StreamedListingsTestCase(unittest.TestCase):
+    ENV = {'SECRET_KEY': 'test-secret-key', 'SUPABASE_URL': URL, 'SUPABASE_KEY': ANON_KEY,
+           'SUPABASE_JWT_SECRET': JWT_SECRET, 'REPO_CACHE_BACKEND': 'off', 'PAGE_CACHE': 'off',
+           'RATELIMIT_STORAGE_URI': 'memory://'}
+
+    def setUp(self):
+        self.saved = {name: os.environ.get(name) for name in self.ENV}
+        os.environ.update(self.ENV)
+        self.fake = FakeSupabase()
+        self.fake.insert('admins', {'user_id': 'admin-id'})
+        self.fake.seed_posts(30)
+        self.fake.seed_projects(3)
+        self.fake.install()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = 'admin-id'
+            sess['user_details'] = {'id': 'admin-id', 'username': 'admin@example.com', 'role': 'admin'}
+            sess['supabase_token'] = sign_token('admin-id', ttl=3600)
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    def test_dashboard_streams_every_row_after_the_head(self):
+        response = self.client.get('/admin', buffered=False)
+        self.assertIsNone(response.headers.get('Content-Length'))
+        chunks = list(response.response)
+        self.assertGreater(len(chunks), 1)
+        self.assertIn(b'</head>', chunks[0])
+        self.assertIn(b'Admin Overview', chunks[0])
+        self.assertNotIn(b'<td>', chunks[0])
+        body = b''.join(chunks)
+        self.assertEqual(body.count(b'href="/blogs/'), 30)
+        self.assertEqual(body.count(b'/edit_project/'), 3)
+
+    def test_buffered_mode_renders_the_same_page(self):
+        streamed = self.client.get('/admin/blogs').get_data()
+        self.app.config['STREAM_TEMPLATES'] = 'off'
+        response = self.client.get('/admin/blogs')
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        strip = lambda body: re.sub(rb'value="[^"]+"', b'', body)
+        self.assertEqual(strip(response.data), strip(streamed))
+        self.assertIn(b'>Older</a>', response.data)
+
+    def test_csrf_token_and_flashes_survive_streaming(self):
+        self.app.config['WTF_CSRF_ENABLED'] = True
+        page = self.client.get('/admin/blogs').get_data(as_text=True)
+        token = re.search(r'name="csrf_token" value="([^"]+)"', page).group(1)
+        response = self.client.post('/admin/blogs', data={'csrf_token': token, 'title': 'T', 'content': 'Body'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('Blog post created', self.client.get('/admin/blogs').get_data(as_text=True))
+        self.assertNotIn('Blog post created', self.client.get('/admin/blogs').get_data(as_text=True))
+
+
+class RowSourcesTestCase(unittest.TestCase):
+    def test_deferred_page_loads_on_first_use(self):
+        calls = []
+        page = DeferredPage(lambda: calls.append(1) or ([1, 2], 'next'))
+        self.assertEqual(calls, [])
+        self.assertEqual((list(page), page.next_cursor, list(page)), ([1, 2], 'next', [1, 2]))
+        self.assertEqual(calls, [1])
+
+    def test_sqlite_iter_posts_crosses_batches_in_list_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            posts = SQLiteBlogRepo(SQLiteDatabase(os.path.join(tmp, 'portfolio.db')))
+            for i in range(7):
+                posts.create_post(f'Post {i}', 'Body')
+            rows, _ = posts.list_posts_page(limit=100)
+            self.assertEqual([r['id'] for r in posts.iter_posts(batch_size=3)], [r['id'] for r in rows])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import sys
+import os
+import json
+import time
+import base64
+from unittest import mock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_supabase import ANON_KEY, JWT_SECRET, URL, FakeSupabase, sign_token
+from portfolio.app import create_app
+from portfolio.tokens import TokenError, TokenVerifier
+
+try:
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+except ImportError:
+    ec = None
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+class TokenVerifierTestCase(unittest.TestCase):
+    def test_hs256_tokens_are_checked_locally(self):
+        verifier = TokenVerifier(JWT_SECRET)
+        token = sign_token('user-1')
+        self.assertEqual(verifier.verify(token)['sub'], 'user-1')
+        self.assertEqual(verifier.verify(token)['sub'], 'user-1')
+        self.assertEqual((verifier.verified, verifier.memo_hits), (1, 1))
+        for bad in (sign_token('user-1', secret='other'), sign_token('user-1', ttl=-60),
+                    sign_token('user-1', aud='other'), 'not-a-jwt'):
+            with self.assertRaises(TokenError):
+                verifier.verify(bad)
+
+    @unittest.skipIf(ec is None, 'cryptography is not installed')
+    def test_es256_tokens_use_the_cached_signing_keys(self):
+        key = ec.generate_private_key(ec.SECP256R1())
+        numbers = key.public_key().public_numbers()
+        jwk = {'kty': 'EC', 'crv': 'P-256', 'kid': 'k1',
+               'x': _b64(numbers.x.to_bytes(32, 'big')), 'y': _b64(numbers.y.to_bytes(32, 'big'))}
+        fetches = []
+
+        def jwks():
+            fetches.append(1)
+            return {'keys': [jwk]}
+
+        def es256(kid):
+            header = _b64(json.dumps({'alg': 'ES256', 'kid': kid}).encode())
+            claims = _b64(json.dumps({'sub': 'user-2', 'aud': 'authenticated', 'exp': time.time() + 60}).encode())
+            r, s = decode_dss_signature(key.sign(f'{header}.{claims}'.encode(), ec.ECDSA(hashes.SHA256())))
+            return f'{header}.{claims}.{_b64(r.to_bytes(32, "big") + s.to_bytes(32, "big"))}'
+
+        verifier = TokenVerifier(jwks_loader=jwks)
+        self.assertEqual(verifier.verify(es256('k1'))['sub'], 'user-2')
+        self.assertEqual(verifier.verify(es256('k1'))['sub'], 'user-2')
+        with self.assertRaises(TokenError):
+            verifier.verify(es256('rotated'))
+        # Keys were fetched once; an unknown kid refetches only after JWKS_RETRY seconds
+        self.assertEqual(len(fetches), 1)
+
+    def test_asymmetric_tokens_fall_back_to_claims_without_cryptography(self):
+        header = _b64(json.dumps({'alg': 'RS256', 'kid': 'k1'}).encode())
+        claims = _b64(json.dumps({'sub': 'user-3', 'aud': 'authenticated', 'exp': time.time() + 60}).encode())
+        token = f'{header}.{claims}.{_b64(b"signature")}'
+        verifier = TokenVerifier(jwks_loader=lambda: {'keys': []})
+        with mock.patch('portfolio.tokens.hashes', None):
+            self.assertEqual(verifier.verify(token)['sub'], 'user-3')
+        self.assertEqual(verifier.unverified, 1)
+
+
+class SessionTokenTestCase(unittest.TestCase):
+    ENV = {'SECRET_KEY': 'test-secret-key', 'SUPABASE_URL': URL, 'SUPABASE_KEY': ANON_KEY,
+           'SUPABASE_JWT_SECRET': JWT_SECRET, 'REPO_CACHE_BACKEND': 'off'}
+
+    def setUp(self):
+        self.saved = {name: os.environ.get(name) for name in self.ENV}
+        os.environ.update(self.ENV)
+        self.fake = FakeSupabase()
+        self.fake.insert('admins', {'user_id': 'admin-id'})
+        self.fake.install()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.manager = self.app.extensions['tokens']
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    def login(self, access_token, refresh_token=None):
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = 'admin-id'
+            sess['user_details'] = {'id': 'admin-id', 'username': 'admin@example.com', 'role': 'admin'}
+            sess['supabase_token'] = access_token
+            if refresh_token:
+                sess['supabase_refresh_token'] = refresh_token
+
+    def test_admin_decision_is_cached_per_user(self):
+        access, refresh = self.fake.issue_session('admin-id')
+        self.login(access, refresh)
+        self.assertEqual(self.client.get('/admin/blogs').status_code, 200)
+        # Later checks come from the cache until ADMIN_CACHE_TTL runs out
+        self.fake.tables['admins'].clear()
+        self.assertEqual(self.client.get('/admin/blogs').status_code, 200)
+        self.assertEqual((self.manager.stats()['admin_cache_misses'], self.manager.stats()['admin_cache_hits']), (1, 1))
+        self.manager.admins.forget('admin-id')
+        self.assertEqual(self.client.get('/admin/blogs').status_code, 403)
+
+    def test_token_near_expiry_is_refreshed_in_the_background(self):
+        access, refresh = self.fake.issue_session('admin-id')
+        self.login(sign_token('admin-id', ttl=120), refresh)
+        self.assertEqual(self.client.get('/admin/blogs').status_code, 200)
+        self.assertIn(self.manager.refresh(refresh, wait=True)[1], self.fake.refresh_tokens)
+        self.client.get('/admin/blogs')
+        with self.client.session_transaction() as sess:
+            self.assertNotEqual(sess['supabase_refresh_token'], refresh)
+            self.assertGreater(self.manager.verifier.verify(sess['supabase_token'])['exp'], time.time() + 3000)
+
+    def test_expired_session_without_a_valid_refresh_token_is_logged_out(self):
+        self.login(sign_token('admin-id', ttl=-120), 'revoked')
+        response = self.client.get('/admin/blogs')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login', response.headers['Location'])
+        with self.client.session_transaction() as sess:
+            self.assertNotIn('supabase_token', sess)
+            self.assertNotIn('user_details', sess)
+
+
+if __name__ == '__main__':
+    unittest.main()
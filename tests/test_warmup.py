@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+import gc
+import signal
+import tempfile
+import importlib.util
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from portfolio.app import create_app
+from portfolio.asgi import WsgiToAsgi
+from portfolio.mail_queue import get_worker
+from portfolio.warmup import flask_app_of, warm_templates
+
+
+class WarmupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ['SECRET_KEY'] = 'test-secret-key'
+        os.environ['TEMPLATE_CACHE_DIR'] = self.tmp.name
+        self.app = create_app()
+
+    def tearDown(self):
+        os.environ.pop('TEMPLATE_CACHE_DIR', None)
+        self.tmp.cleanup()
+
+    def test_templates_compile_into_the_bytecode_cache(self):
+        self.assertFalse(self.app.jinja_env.auto_reload)
+        count = warm_templates(self.app)
+        self.assertEqual(count, len(self.app.jinja_env.list_templates()))
+        self.assertEqual(len(os.listdir(self.tmp.name)), count)
+        # A fresh process (here: a fresh app) loads the code instead of compiling it
+        fresh = create_app()
+        self.assertEqual(warm_templates(fresh), count)
+        self.assertEqual(len(os.listdir(self.tmp.name)), count)
+
+    def test_cli_builds_the_cache(self):
+        result = self.app.test_cli_runner().invoke(args=['build-templates'])
+        self.assertIn('Compiled', result.output)
+        self.assertTrue(os.listdir(self.tmp.name))
+
+    def test_flask_app_behind_the_asgi_adapter(self):
+        self.assertIs(flask_app_of(self.app), self.app)
+        self.assertIs(flask_app_of(WsgiToAsgi(self.app, threads=1)), self.app)
+        self.assertIsNone(flask_app_of(object()))
+
+    def test_gunicorn_hooks_move_the_mail_worker_into_each_worker(self):
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(root, 'gunicorn.conf.py'))
+        conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(conf)
+        master_worker = get_worker(self.app)
+        previous_handler = signal.getsignal(signal.SIGHUP) if hasattr(signal, 'SIGHUP') else None
+        try:
+            conf.when_ready(SimpleNamespace(cfg=SimpleNamespace(preload_app=True),
+                                            app=SimpleNamespace(wsgi=lambda: self.app)))
+            self.assertTrue(master_worker._stopping.is_set())
+            conf.post_worker_init(SimpleNamespace(wsgi=self.app))
+            worker = get_worker(self.app)
+            self.assertIsNot(worker, master_worker)
+            self.assertTrue(worker.is_alive())
+            worker.stop()
+        finally:
+            gc.unfreeze()
+            if previous_handler is not None:
+                signal.signal(signal.SIGHUP, previous_handler)
+
+
+if __name__ == '__main__':
+    unittest.main()